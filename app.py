@@ -1,53 +1,43 @@
 import os
+import re
+import json
 import sqlite3
 import secrets
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
-from functools import wraps
-from werkzeug.security import generate_password_hash, check_password_hash
+import threading
+import queue
+import time
+import atexit
+import csv
+import gzip
+import mimetypes
+import hashlib
+import tempfile
+import zipfile
+import click
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, g, Response, stream_with_context
+from functools import partial, wraps
+from itertools import chain
 from werkzeug.utils import secure_filename
 from datetime import datetime, timezone, timedelta
 import pytz
-from io import BytesIO
-from openpyxl import Workbook
-from flask import send_file
-import smtplib
-from email.message import EmailMessage
+import migrations
+from migrations import rebuild_tallies
+from passwords import password_hasher_from_env
+from io import BytesIO, StringIO, TextIOWrapper
+from flask import send_file, send_from_directory, abort
+from jinja2 import FileSystemBytecodeCache
+from jinja2.ext import Extension
 try:
     from flask_wtf.csrf import CSRFProtect
 except ImportError:
     CSRFProtect = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 
-def send_email(to_addr, subject, body):
-    """Send email via SMTP. Reads SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASS from env.
-    Falls back to printing the message if SMTP is not configured."""
-    smtp_host = os.environ.get('SMTP_HOST')
-    smtp_port = int(os.environ.get('SMTP_PORT', 587)) if os.environ.get('SMTP_PORT') else None
-    smtp_user = os.environ.get('SMTP_USER')
-    smtp_pass = os.environ.get('SMTP_PASS')
-    msg = EmailMessage()
-    msg['Subject'] = subject
-    msg['From'] = os.environ.get('SMTP_FROM', 'no-reply@example.com')
-    msg['To'] = to_addr
-    msg.set_content(body)
-    if smtp_host and smtp_port and smtp_user and smtp_pass:
-        try:
-            with smtplib.SMTP(smtp_host, smtp_port, timeout=10) as s:
-                s.starttls()
-                s.login(smtp_user, smtp_pass)
-                s.send_message(msg)
-        except Exception as e:
-            print('⚠️ send_email failed:', e)
-    else:
-        print('Email (not sent - SMTP not configured) ->', to_addr, subject)
-
-
-def send_notification(user_id, message):
-    try:
-        created_at = datetime.now(timezone.utc).isoformat()
-        execute('INSERT INTO notifications (user_id,message,created_at,read) VALUES (?,?,?,?)', (user_id, message, created_at, 0))
-    except Exception as e:
-        print('⚠️ send_notification failed:', e)
 # timezone helpers
 IST = pytz.timezone("Asia/Kolkata")
 
@@ -87,10 +77,134 @@ if DB_ADAPTER:
         pass
 
 
+DB_PATH = os.environ.get('SQLITE_PATH', 'voting.db')
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 8))
+
+# applied once to every new connection; journal_mode=WAL lets readers run while a vote is being written
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA cache_size=-8000',
+    'PRAGMA mmap_size=67108864',
+    'PRAGMA temp_store=MEMORY',
+)
+
+
+class SQLitePool:
+    """Bounded pool of sqlite3 connections shared by the threads of one gunicorn worker.
+    Connections are opened lazily up to `size`; once all are checked out, callers wait
+    up to `timeout` seconds for one to be released. `prepare`, if given, runs on the
+    first connection opened successfully."""
+
+    def __init__(self, path, size=8, timeout=30, prepare=None):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._prepare = prepare
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        self._peak = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._timeouts = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for pragma in SQLITE_PRAGMAS:
+            conn.execute(pragma)
+        if self._prepare:
+            try:
+                self._prepare(conn)
+            except Exception:
+                conn.close()
+                raise
+            self._prepare = None
+        return conn
+
+    def acquire(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_open = self._created < self.size
+                if can_open:
+                    self._created += 1
+                else:
+                    self._waits += 1
+            if can_open:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    with self._lock:
+                        self._timeouts += 1
+                    raise sqlite3.OperationalError('database connection pool exhausted')
+        with self._lock:
+            self._checkouts += 1
+            self._in_use += 1
+            self._peak = max(self._peak, self._in_use)
+        return conn
+
+    def release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # broken connection: drop it so a fresh one is opened next time
+            with self._lock:
+                self._created -= 1
+                self._in_use -= 1
+            return
+        with self._lock:
+            self._in_use -= 1
+        self._idle.put(conn)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': self.size,
+                'open': self._created,
+                'in_use': self._in_use,
+                'peak_in_use': self._peak,
+                'checkouts': self._checkouts,
+                'waits': self._waits,
+                'timeouts': self._timeouts,
+            }
+
+
+def migrate_if_behind(conn):
+    """Apply pending migrations to a database the gunicorn hook has not migrated, as under
+    `flask run` or `python app.py`. Under gunicorn this is one schema_version read."""
+    if DB_ADAPTER:
+        return      # PostgreSQL is migrated by db_pg (RUN_MIGRATE)
+    if migrations.schema_version(conn) < len(migrations.MIGRATIONS):
+        migrations.migrate(conn, password_hasher.hash_inline)
+
+
+db_pool = SQLitePool(DB_PATH, size=DB_POOL_SIZE, prepare=migrate_if_behind)
+
+
 def get_db():
-    conn = sqlite3.connect('voting.db', timeout=30)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Return the connection bound to the current app context, checking one out of
+    the pool on first use. It is returned to the pool by close_db at teardown."""
+    if 'db' not in g:
+        g.db = db_pool.acquire()
+    return g.db
+
+
+def close_db(exc=None):
+    conn = g.pop('db', None)
+    if conn is not None:
+        db_pool.release(conn)
 
 # application directory
 APP_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -118,6 +232,33 @@ def parse_utc_or_local_as_ist(utc_str, local_str):
             return None
     return None
 
+# -------------- Time helpers --------------
+def parse_iso(s):
+    try:
+        dt = datetime.fromisoformat((s or "").replace("Z", ""))
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return dt.astimezone(timezone.utc)
+    except Exception:
+        pass
+        return None
+
+
+def to_epoch(dt):
+    """UTC epoch seconds for an aware datetime, as stored in elections.start_ts/end_ts."""
+    return int(dt.timestamp()) if dt else None
+
+
+# to_ist is defined later after helpers; remove this duplicate to avoid confusion
+
+def now_utc():
+    return datetime.now(timezone.utc)
+
+
+def now_ts():
+    return int(time.time())
+
+
 def exec_sql(sql, args=(), fetch=False, one=False):
     db = get_db()
     cur = db.execute(sql, args)
@@ -142,6 +283,30 @@ def execute(sql, args=()):
 app = Flask(__name__)
 # Generate a secure random key if no SECRET_KEY is set
 app.secret_key = os.environ.get('SECRET_KEY', secrets.token_hex(32))
+app.teardown_appcontext(close_db)
+
+
+@app.before_request
+def start_background_workers():
+    # picks up mail queued by a worker that has since exited
+    outbox.ensure_started()
+
+class StripPasswordToggle(Extension):
+    """Defensive: drop any stray pw-toggle button from login.html. Runs when the template
+    is compiled rather than over the rendered page on every request."""
+
+    PATTERN = re.compile(r"<button[^>]*id=[\"']pw-toggle[\"'][^>]*>.*?</button>", re.S)
+
+    def preprocess(self, source, name, filename=None):
+        return self.PATTERN.sub('', source) if name == 'login.html' else source
+
+
+app.jinja_env.add_extension(StripPasswordToggle)
+# compiled templates are shared between workers and restarts; JINJA_CACHE_DIR defaults to a temp dir
+JINJA_CACHE_DIR = os.environ.get('JINJA_CACHE_DIR')
+if JINJA_CACHE_DIR:
+    os.makedirs(JINJA_CACHE_DIR, exist_ok=True)
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache(JINJA_CACHE_DIR)
 
 # Enable CSRF protection
 try:
@@ -152,178 +317,525 @@ except ImportError:
     csrf = None
     print("⚠️ Flask-WTF not installed - CSRF protection disabled")
 
-# Database initialization function
-def init_database():
-    """Initialize database tables if they don't exist"""
-    try:
+
+@app.cli.command('migrate')
+def migrate_command():
+    """Apply pending schema migrations (see migrations.py)."""
+    for name in migrations.migrate(get_db(), password_hasher.hash):
+        click.echo(f'applied {name}')
+    click.echo(f'✅ Database schema at version {len(migrations.MIGRATIONS)}')
+
+
+def tally_mismatches():
+    """Return candidates whose materialized tally differs from a COUNT over votes."""
+    return query('''
+        SELECT c.id AS candidate_id, c.election_id, COALESCE(t.votes, 0) AS tallied, COUNT(v.id) AS counted
+        FROM candidates c
+        LEFT JOIN votes v ON v.candidate_id = c.id
+        LEFT JOIN candidate_tallies t ON t.candidate_id = c.id
+        GROUP BY c.id
+        HAVING tallied != counted
+    ''')
+
+
+def total_mismatches():
+    """Return elections whose election_totals row differs from a COUNT over votes."""
+    return query('''
+        SELECT e.id AS election_id, COALESCE(t.votes, 0) AS tallied, COALESCE(v.counted, 0) AS counted
+        FROM elections e
+        LEFT JOIN election_totals t ON t.election_id = e.id
+        LEFT JOIN (SELECT election_id, COUNT(*) AS counted FROM votes GROUP BY election_id) v
+            ON v.election_id = e.id
+        WHERE t.election_id IS NULL OR COALESCE(t.votes, 0) != COALESCE(v.counted, 0)
+    ''')
+
+
+@app.cli.command('reconcile-tallies')
+@click.option('--fix', is_flag=True, help='Rebuild candidate_tallies and election_totals from votes when they disagree.')
+def reconcile_tallies_command(fix):
+    """Verify candidate_tallies and election_totals against the votes table."""
+    bad = tally_mismatches()
+    for r in bad:
+        click.echo(f"candidate {r['candidate_id']} (election {r['election_id']}): tallied {r['tallied']}, counted {r['counted']}")
+    bad_totals = total_mismatches()
+    for r in bad_totals:
+        click.echo(f"election {r['election_id']}: total {r['tallied']}, counted {r['counted']}")
+    if not bad and not bad_totals:
+        click.echo('✅ candidate_tallies and election_totals match votes')
+    elif fix:
         db = get_db()
-        
-        # Create users table
-        db.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                email TEXT UNIQUE,
-                username TEXT UNIQUE NOT NULL,
-                password TEXT NOT NULL,
-                role TEXT NOT NULL DEFAULT 'voter',
-                id_number TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Create elections table
-        db.execute('''
-            CREATE TABLE IF NOT EXISTS elections (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT,
-                category TEXT,
-                start_time TEXT NOT NULL,
-                end_time TEXT NOT NULL,
-                created_by INTEGER,
-                candidate_limit INTEGER DEFAULT 10,
-                status TEXT DEFAULT 'active',
-                cancelled_at TEXT,
-                cancelled_by INTEGER,
-                paused_at TEXT,
-                paused_by INTEGER,
-                resumed_at TEXT,
-                resumed_by INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (created_by) REFERENCES users (id)
-            )
-        ''')
-        
-        # Add new columns for pause/resume functionality if they don't exist
+        # one write transaction for both tables; rebuild_tallies also bumps every election
+        # version so ETags cached against the wrong totals stop matching
+        db.execute('BEGIN IMMEDIATE')
         try:
-            db.execute('ALTER TABLE elections ADD COLUMN paused_at TEXT')
-        except:
-            pass
+            rebuild_tallies(db)
+        except Exception:
+            db.rollback()
+            raise
+        db.commit()
+        click.echo(f'✅ Rebuilt counters ({len(bad)} candidates, {len(bad_totals)} elections corrected)')
+    else:
+        raise SystemExit(1)
+
+
+# Rate limiting: sliding-window counters, in memory per worker (the default) or shared through
+# SQLite. The SQLite backend takes the database write lock on every check, so logins and votes
+# queue behind each other's limiter writes; use it only where per-worker limits are not enough.
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory')
+
+
+def slide_window(bucket, now, limit, window):
+    """Advance bucket = [window_start, count, prev_count] to `now` in place and try to take one
+    slot. The previous window's count is weighted by how much of it still overlaps the last
+    `window` seconds."""
+    start = int(now) // window * window
+    if bucket[0] != start:
+        bucket[2] = bucket[1] if start - bucket[0] == window else 0
+        bucket[0] = start
+        bucket[1] = 0
+    if bucket[2] * (1 - (now - start) / window) + bucket[1] >= limit:
+        return False
+    bucket[1] += 1
+    return True
+
+
+class RateLimiter:
+    """Per-process limiter keeping three integers per key. Keys idle for two full windows are
+    swept every `sweep_interval` seconds so memory tracks active keys only."""
+
+    def __init__(self, sweep_interval=60):
+        self.sweep_interval = sweep_interval
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._next_sweep = time.time() + sweep_interval
+
+    def is_allowed(self, key, limit=10, window=300):  # 10 requests per 5 minutes
+        now = time.time()
+        with self._lock:
+            if now >= self._next_sweep:
+                self._sweep(now)
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [0, 0, 0, window]
+            bucket[3] = window
+            return slide_window(bucket, now, limit, window)
+
+    def _sweep(self, now):
+        self._buckets = {k: b for k, b in self._buckets.items() if b[0] + 2 * b[3] > now}
+        self._next_sweep = now + self.sweep_interval
+
+
+class SQLiteRateLimiter:
+    """Limiter whose buckets live in the rate_limits table, so the limit holds across all
+    gunicorn workers. Fails open if the database cannot be reached. Every check is a
+    BEGIN IMMEDIATE write transaction, serialized with ballot and other writes."""
+
+    def __init__(self, pool, sweep_interval=60):
+        self.pool = pool
+        self.sweep_interval = sweep_interval
+        self._next_sweep = time.time() + sweep_interval
+
+    def is_allowed(self, key, limit=10, window=300):
+        now = time.time()
         try:
-            db.execute('ALTER TABLE elections ADD COLUMN paused_by INTEGER')
-        except:
-            pass
+            conn = self.pool.acquire()
+        except sqlite3.Error as e:
+            print('⚠️ rate limiter unavailable:', e)
+            return True
         try:
-            db.execute('ALTER TABLE elections ADD COLUMN resumed_at TEXT')
-        except:
-            pass
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('SELECT window_start, count, prev_count FROM rate_limits WHERE key=?', (key,)).fetchone()
+            bucket = list(row) if row else [0, 0, 0]
+            allowed = slide_window(bucket, now, limit, window)
+            ws, count, prev = bucket
+            conn.execute('''INSERT INTO rate_limits (key, window_start, window_seconds, count, prev_count) VALUES (?,?,?,?,?)
+                            ON CONFLICT(key) DO UPDATE SET window_start=excluded.window_start, window_seconds=excluded.window_seconds,
+                            count=excluded.count, prev_count=excluded.prev_count''', (key, ws, window, count, prev))
+            if now >= self._next_sweep:
+                conn.execute('DELETE FROM rate_limits WHERE window_start + 2 * window_seconds <= ?', (now,))
+                self._next_sweep = now + self.sweep_interval
+            conn.commit()
+            return allowed
+        except sqlite3.Error as e:
+            conn.rollback()
+            print('⚠️ rate limiter unavailable:', e)
+            return True
+        finally:
+            self.pool.release(conn)
+
+
+rate_limiter = SQLiteRateLimiter(db_pool) if RATE_LIMIT_BACKEND == 'sqlite' else RateLimiter()
+
+
+@app.cli.command('bench-rate-limit')
+@click.option('--keys', default=200_000, show_default=True, help='Distinct keys to check, then check again.')
+@click.option('--backend', type=click.Choice(['memory', 'sqlite', 'all']), default='all', show_default=True)
+def bench_rate_limit_command(keys, backend):
+    """Measure is_allowed calls per second on one thread: every key once, then every key again.
+    The sqlite backend runs against a scratch database, never SQLITE_PATH."""
+    import tracemalloc
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        conn = migrations.connect(path)
+        migrations.migrate(conn, password_hasher.hash_inline)
+        conn.close()
+        limiters = {'memory': RateLimiter, 'sqlite': partial(SQLiteRateLimiter, SQLitePool(path, size=1))}
+        for name, make in limiters.items():
+            if backend not in (name, 'all'):
+                continue
+            limiter = make()
+            began = time.perf_counter()
+            for _ in range(2):
+                for i in range(keys):
+                    limiter.is_allowed(f'login_10.0.{i >> 8}.{i & 255}')
+            elapsed = time.perf_counter() - began
+            # traced separately: tracemalloc slows every allocation down
+            tracemalloc.start()
+            limiter = make()
+            for i in range(keys):
+                limiter.is_allowed(f'login_10.0.{i >> 8}.{i & 255}')
+            retained = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            click.echo(f'{type(limiter).__name__}: {2 * keys / elapsed:.0f} calls/s, '
+                       f'{retained / 2**20:.1f} MB retained in process')
+
+
+# -------------- Email & notifications --------------
+def smtp_config():
+    """SMTP settings from the environment, or None when SMTP_HOST/SMTP_PORT are not set.
+    SMTP_USER/SMTP_PASS are optional so a local relay or debugging server can be used."""
+    host = os.environ.get('SMTP_HOST')
+    port = os.environ.get('SMTP_PORT')
+    if not host or not port:
+        return None
+    return {
+        'host': host,
+        'port': int(port),
+        'user': os.environ.get('SMTP_USER'),
+        'password': os.environ.get('SMTP_PASS'),
+        'starttls': os.environ.get('SMTP_STARTTLS', 'true').lower() in ('1', 'true', 'yes'),
+        'from': os.environ.get('SMTP_FROM', 'no-reply@example.com'),
+    }
+
+
+NOTIFICATION_TTL_DAYS = int(os.environ.get('NOTIFICATION_TTL_DAYS', 90))
+NOTIFICATION_PRUNE_BATCH = 1000
+
+
+def prune_notifications(conn, ttl_days=NOTIFICATION_TTL_DAYS):
+    """Delete read notifications older than ttl_days, in short write transactions.
+    Unread notifications are kept. Returns the number deleted."""
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=ttl_days)).isoformat()
+    deleted = 0
+    while True:
+        cur = conn.execute('DELETE FROM notifications WHERE id IN '
+                           '(SELECT id FROM notifications WHERE read = 1 AND created_at < ? LIMIT ?)',
+                           (cutoff, NOTIFICATION_PRUNE_BATCH))
+        conn.commit()
+        deleted += cur.rowcount
+        if cur.rowcount < NOTIFICATION_PRUNE_BATCH:
+            return deleted
+
+
+@app.cli.command('prune-notifications')
+@click.option('--days', default=NOTIFICATION_TTL_DAYS, show_default=True, help='Delete read notifications older than this.')
+def prune_notifications_command(days):
+    """Delete old read notifications."""
+    click.echo(f'✅ Pruned {prune_notifications(get_db(), days)} notifications')
+
+
+OUTBOX_DUE_SQL = "SELECT 1 FROM email_outbox WHERE status='pending' AND next_attempt_at <= ? LIMIT 1"
+
+
+class OutboxDispatcher:
+    """Background thread (one per worker) that delivers the email_outbox table over a single
+    reused SMTP connection.
+
+    Due messages are claimed by pushing next_attempt_at past a lease inside a write
+    transaction, so dispatchers in other workers skip them. Failed sends are retried with
+    exponential backoff until max_attempts, then marked failed. Old read notifications are
+    pruned every PRUNE_EVERY seconds, and closed elections are finalized every FINALIZE_EVERY."""
+
+    LEASE = 300
+    SMTP_IDLE = 60
+    PRUNE_EVERY = 3600
+    FINALIZE_EVERY = 60
+
+    def __init__(self, pool, interval=2.0, batch_size=50, max_attempts=5):
+        self.pool = pool
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._smtp = None
+        self._smtp_used = 0
+        self._pruned_at = 0
+        self._finalized_at = 0
+
+    def ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='outbox', daemon=True)
+                self._thread.start()
+
+    def wake(self):
+        self.ensure_started()
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                while self.deliver_due() == self.batch_size:
+                    pass
+                if NOTIFICATION_TTL_DAYS and time.monotonic() - self._pruned_at > self.PRUNE_EVERY:
+                    self._pruned_at = time.monotonic()
+                    self.prune()
+                if time.monotonic() - self._finalized_at > self.FINALIZE_EVERY:
+                    self._finalized_at = time.monotonic()
+                    self.finalize()
+            except Exception as e:
+                print('⚠️ outbox dispatch failed:', e)
+            if self._smtp is not None and time.monotonic() - self._smtp_used > self.SMTP_IDLE:
+                self._close_smtp()
+
+    def prune(self):
+        conn = self.pool.acquire()
+        try:
+            return prune_notifications(conn)
+        finally:
+            self.pool.release(conn)
+
+    def finalize(self):
+        conn = self.pool.acquire()
+        try:
+            return finalize_closed_elections(conn, limit=FINALIZE_BATCH)
+        finally:
+            self.pool.release(conn)
+
+    def deliver_due(self):
+        """Send one batch of due messages; returns how many were claimed."""
+        now = now_ts()
+        conn = self.pool.acquire()
         try:
-            db.execute('ALTER TABLE elections ADD COLUMN resumed_by INTEGER')
-        except:
+            # most ticks find nothing due: check with a plain read (idx_outbox_due) before
+            # taking the write lock that ballots are waiting on. A leased message is not due,
+            # since claiming it pushed next_attempt_at past the lease.
+            if not conn.execute(OUTBOX_DUE_SQL, (now,)).fetchone():
+                return 0
+            conn.execute('BEGIN IMMEDIATE')
+            due = conn.execute("""SELECT id, to_addr, subject, body, attempts FROM email_outbox
+                                  WHERE status='pending' AND next_attempt_at <= ? ORDER BY id LIMIT ?""",
+                               (now, self.batch_size)).fetchall()
+            conn.executemany('UPDATE email_outbox SET next_attempt_at=? WHERE id=?', [(now + self.LEASE, m['id']) for m in due])
+            conn.commit()
+            for m in due:
+                self._deliver(conn, m)
+            return len(due)
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self.pool.release(conn)
+
+    def _deliver(self, conn, m):
+        cfg = smtp_config()
+        try:
+            if cfg is None:
+                print('Email (not sent - SMTP not configured) ->', m['to_addr'], m['subject'])
+                conn.execute("UPDATE email_outbox SET status='skipped' WHERE id=?", (m['id'],))
+            else:
+                from email.message import EmailMessage
+                msg = EmailMessage()
+                msg['Subject'] = m['subject']
+                msg['From'] = cfg['from']
+                msg['To'] = m['to_addr']
+                msg.set_content(m['body'])
+                self._send(cfg, msg)
+                conn.execute("UPDATE email_outbox SET status='sent', attempts=attempts+1, sent_at=? WHERE id=?",
+                             (datetime.now(timezone.utc).isoformat(), m['id']))
+        except Exception as e:
+            attempts = m['attempts'] + 1
+            status = 'failed' if attempts >= self.max_attempts else 'pending'
+            print(f"⚠️ send_email to {m['to_addr']} failed (attempt {attempts}):", e)
+            conn.execute('UPDATE email_outbox SET status=?, attempts=?, next_attempt_at=?, last_error=? WHERE id=?',
+                         (status, attempts, now_ts() + min(30 * 2 ** attempts, 3600), str(e)[:500], m['id']))
+        conn.commit()
+
+    def _send(self, cfg, msg):
+        import smtplib
+        for retry in (True, False):
+            if self._smtp is None:
+                s = smtplib.SMTP(cfg['host'], cfg['port'], timeout=10)
+                try:
+                    if cfg['starttls']:
+                        s.starttls()
+                    if cfg['user'] and cfg['password']:
+                        s.login(cfg['user'], cfg['password'])
+                except Exception:
+                    s.close()
+                    raise
+                self._smtp = s
+            try:
+                self._smtp.send_message(msg)
+                self._smtp_used = time.monotonic()
+                return
+            except smtplib.SMTPServerDisconnected:
+                # the server dropped our idle connection; reconnect once
+                self._smtp = None
+                if not retry:
+                    raise
+
+    def _close_smtp(self):
+        try:
+            self._smtp.quit()
+        except Exception:
             pass
-        
-        # Create candidates table
-        db.execute('''
-            CREATE TABLE IF NOT EXISTS candidates (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                election_id INTEGER NOT NULL,
-                category TEXT DEFAULT 'General',
-                photo TEXT,
-                user_id INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (election_id) REFERENCES elections (id),
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-        
-        # Create votes table
-        db.execute('''
-            CREATE TABLE IF NOT EXISTS votes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                candidate_id INTEGER NOT NULL,
-                election_id INTEGER NOT NULL,
-                voted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (id),
-                FOREIGN KEY (candidate_id) REFERENCES candidates (id),
-                FOREIGN KEY (election_id) REFERENCES elections (id),
-                UNIQUE(user_id, election_id)
-            )
-        ''')
-        
-        # Create candidate_applications table
-        db.execute('''
-            CREATE TABLE IF NOT EXISTS candidate_applications (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                election_id INTEGER NOT NULL,
-                name TEXT NOT NULL,
-                category TEXT DEFAULT 'General',
-                photo TEXT,
-                status TEXT DEFAULT 'pending',
-                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                reviewed_at TIMESTAMP,
-                reviewed_by INTEGER,
-                FOREIGN KEY (user_id) REFERENCES users (id),
-                FOREIGN KEY (election_id) REFERENCES elections (id),
-                FOREIGN KEY (reviewed_by) REFERENCES users (id)
-            )
-        ''')
-        
-        # Create notifications table (if needed)
-        db.execute('''
-            CREATE TABLE IF NOT EXISTS notifications (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                message TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                read INTEGER DEFAULT 0,
-                FOREIGN KEY (user_id) REFERENCES users (id)
-            )
-        ''')
-        
-        # Create performance indexes for common queries
-        db.execute('CREATE INDEX IF NOT EXISTS idx_elections_status ON elections(status)')
-        db.execute('CREATE INDEX IF NOT EXISTS idx_elections_start_time ON elections(start_time)')
-        db.execute('CREATE INDEX IF NOT EXISTS idx_candidates_election ON candidates(election_id)')
-        db.execute('CREATE INDEX IF NOT EXISTS idx_votes_election ON votes(election_id)')
-        db.execute('CREATE INDEX IF NOT EXISTS idx_votes_user_election ON votes(user_id, election_id)')
-        db.execute('CREATE INDEX IF NOT EXISTS idx_applications_election ON candidate_applications(election_id)')
-        db.execute('CREATE INDEX IF NOT EXISTS idx_applications_status ON candidate_applications(status)')
-        db.execute('CREATE INDEX IF NOT EXISTS idx_notifications_user ON notifications(user_id)')
-        
-        # Create default admin user if it doesn't exist
-        admin_exists = db.execute('SELECT COUNT(*) FROM users WHERE username = ?', ('admin',)).fetchone()[0]
-        if not admin_exists:
-            admin_password = generate_password_hash('admin123')
-            db.execute('''
-                INSERT INTO users (name, username, password, role)
-                VALUES (?, ?, ?, ?)
-            ''', ('Administrator', 'admin', admin_password, 'admin'))
-            print("✅ Default admin user created (username: admin, password: admin123)")
-        
-        db.commit()
-        db.close()
-        print("✅ Database initialized successfully")
-        
-    except Exception as e:
-        print(f"❌ Database initialization error: {e}")
+        self._smtp = None
 
-# Initialize database on startup
-init_database()
 
-# Simple rate limiting storage (in-memory for demo)
-from collections import defaultdict, deque
-import time
+outbox = OutboxDispatcher(db_pool)
 
-class SimpleRateLimiter:
-    def __init__(self):
-        self.requests = defaultdict(deque)
 
-    def is_allowed(self, key, limit=10, window=300):  # 10 requests per 5 minutes
-        now = time.time()
-        # Clean old requests
-        while self.requests[key] and self.requests[key][0] < now - window:
-            self.requests[key].popleft()
-        
-        if len(self.requests[key]) >= limit:
-            return False
-        
-        self.requests[key].append(now)
-        return True
+OUTBOX_INSERT_SQL = ('INSERT INTO email_outbox (to_addr,subject,body,status,attempts,next_attempt_at,created_at) '
+                     "VALUES (?,?,?,'pending',0,?,?)")
+
+
+def queue_emails(messages, db=None):
+    """Add (to_addr, subject, body) messages to the outbox.
+
+    With ``db`` the rows join the caller's open transaction and the caller commits
+    (and wakes the dispatcher); otherwise they are committed here.
+    """
+    due, created = now_ts(), datetime.now(timezone.utc).isoformat()
+    rows = [(to_addr, subject, body, due, created) for to_addr, subject, body in messages]
+    if not rows:
+        return
+    if db is not None:
+        db.executemany(OUTBOX_INSERT_SQL, rows)
+        return
+    db = get_db()
+    db.executemany(OUTBOX_INSERT_SQL, rows)
+    db.commit()
+    outbox.wake()
+
+
+def queue_email(to_addr, subject, body):
+    """Add a message to the outbox; the dispatcher thread sends it outside the request."""
+    queue_emails([(to_addr, subject, body)])
+
+
+class UnreadCounts:
+    """Per-process cache of notification_counts for the navbar badge.
+
+    Notifications sent or read through this process drop the cached value once
+    their transaction has committed, so the next read sees the new count; changes
+    made by other workers show up once an entry's ttl lapses.
+    """
+
+    def __init__(self, ttl=30, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        now = time.monotonic()
+        hit = self._counts.get(user_id)
+        if hit and hit[1] > now:
+            return hit[0]
+        row = query('SELECT unread FROM notification_counts WHERE user_id=?', (user_id,), one=True)
+        count = max(row['unread'], 0) if row else 0
+        with self._lock:
+            if len(self._counts) >= self.max_entries:
+                self._counts = {k: v for k, v in self._counts.items() if v[1] > now}
+            self._counts[user_id] = (count, now + self.ttl)
+        return count
+
+    def invalidate(self, *user_ids):
+        with self._lock:
+            for uid in user_ids:
+                self._counts.pop(uid, None)
+
+
+unread_counts = UnreadCounts(int(os.environ.get('NOTIFICATION_COUNT_TTL', 30)))
+
+
+NOTIFICATION_INSERT_SQL = 'INSERT INTO notifications (user_id,message,created_at,read) VALUES (?,?,?,0)'
 
-rate_limiter = SimpleRateLimiter()
+
+def send_notifications(rows, db=None):
+    """Insert in-app notifications given as (user_id, message) pairs.
+
+    With ``db`` the rows join the caller's open transaction and the caller commits
+    (and then invalidates unread_counts); otherwise they are committed here.
+    """
+    created = datetime.now(timezone.utc).isoformat()
+    rows = [(uid, msg, created) for uid, msg in rows]
+    if not rows:
+        return
+    conn = get_db() if db is None else db
+    conn.executemany(NOTIFICATION_INSERT_SQL, rows)
+    if db is None:
+        conn.commit()
+        unread_counts.invalidate(*{uid for uid, _, _ in rows})
+
+
+NOTIFICATION_PAGE_SIZE = 20
+
+
+def notification_page(user_id, before=None, limit=NOTIFICATION_PAGE_SIZE):
+    """A page of a user's notifications, newest first, keyed on id.
+
+    Returns (rows, next_before); pass next_before back as ``before`` for the
+    following page. It is None on the last page.
+    """
+    sql = 'SELECT id, message, created_at, read FROM notifications WHERE user_id=:user_id'
+    if before:
+        sql += ' AND id < :before'
+    rows = query(sql + ' ORDER BY id DESC LIMIT :limit', {'user_id': user_id, 'before': before, 'limit': limit + 1})
+    if len(rows) > limit:
+        return rows[:limit], rows[limit - 1]['id']
+    return rows, None
+
+
+def mark_notifications_read(user_id, rows):
+    """Mark the displayed notifications read; no write when none of them were unread."""
+    ids = [r['id'] for r in rows if not r['read']]
+    if ids:
+        execute('UPDATE notifications SET read=1 WHERE user_id=? AND read=0 AND id IN (SELECT value FROM json_each(?))',
+                (user_id, json.dumps(ids)))
+        unread_counts.invalidate(user_id)
+
+
+def send_notification(user_id, message):
+    send_notifications([(user_id, message)])
+
+
+password_hasher = password_hasher_from_env()
+atexit.register(password_hasher.shutdown)
+
+
+@app.cli.command('bench-passwords')
+@click.option('--logins', default=200, show_default=True, help='Number of password checks to time.')
+@click.option('--threads', default=8, show_default=True, help='Concurrent request threads to simulate.')
+def bench_passwords_command(logins, threads):
+    """Measure password checks per second through the hashing pool."""
+    password = 'benchmark-password1'
+    pwhash = password_hasher.hash(password)
+    with ThreadPoolExecutor(threads) as pool:
+        # start every worker process before timing
+        list(pool.map(lambda _: password_hasher.verify(pwhash, password), range(password_hasher.workers)))
+        start = time.perf_counter()
+        list(pool.map(lambda _: password_hasher.verify(pwhash, password), range(logins)))
+        elapsed = time.perf_counter() - start
+    rate = logins / elapsed
+    click.echo(f'{password_hasher.method_prefix()}: {rate:.1f} logins/s with {password_hasher.workers} worker(s), '
+               f'{rate / password_hasher.workers:.1f} per worker ({os.cpu_count()} CPUs)')
 
 # Optional startup migration for Postgres when running on Render.
 # Set RUN_MIGRATE=true in the environment to run migrations once at startup.
@@ -335,15 +847,6 @@ if DB_ADAPTER and os.environ.get('RUN_MIGRATE', '').lower() in ('1', 'true', 'ye
     except Exception as e:
         print('⚠️ DB migration failed at startup:', e)
 
-# Ensure unique constraint on votes table to prevent double voting
-try:
-    db = get_db()
-    # Try to create unique index if it doesn't exist (SQLite safe)
-    db.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_votes_unique ON votes(voter_id, election_id)")
-    db.commit()
-except Exception:
-    pass  # Index might already exist
-
 # -------------- Auth helpers --------------
 def login_required(role=None):
     def deco(f):
@@ -359,38 +862,141 @@ def login_required(role=None):
         return wrap
     return deco
 
-# -------------- Time helpers --------------
-def parse_iso(s):
-    try:
-        dt = datetime.fromisoformat((s or "").replace("Z", ""))
-        if dt.tzinfo is None:
-            dt = dt.replace(tzinfo=timezone.utc)
-        return dt.astimezone(timezone.utc)
-    except Exception:
-        pass
-        return None
-
-
-# to_ist is defined later after helpers; remove this duplicate to avoid confusion
-
-def now_utc():
-    return datetime.now(timezone.utc)
-
 @app.context_processor
 def inject_unread_notifications():
     try:
         uid = session.get('user_id')
         if not uid:
             return {}
-        row = query('SELECT COUNT(*) AS c FROM notifications WHERE user_id=? AND read=0', (uid,), one=True)
-        return {'unread_notifications': row['c'] if row else 0}
+        return {'unread_notifications': unread_counts.get(uid)}
     except Exception:
         return {'unread_notifications': 0}
 
 
 @app.route('/health')
 def health():
-    return {'status': 'ok'}, 200
+    stats = {'status': 'ok', 'db_pool': db_pool.stats()}
+    if vote_batcher:
+        stats['vote_batcher'] = vote_batcher.stats()
+    return stats, 200
+
+
+# ----------- Static assets & compression -----------
+ASSET_MAX_AGE = 365 * 86400
+ASSET_STALE_MAX_AGE = 300       # a link carrying an old fingerprint, e.g. from a cached page
+COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+COMPRESS_LEVEL = 6
+COMPRESS_MIMETYPES = {'text/html', 'application/json'}
+# text assets worth precompressing; images are already compressed
+ASSET_TEXT_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+
+
+class StaticAssets:
+    """Fingerprinted copies of the static folder, read once at startup.
+
+    Each file is held with its content hash and, for text types, gzip and
+    (when the brotli module is installed) br encodings that are kept only if
+    they are smaller. Candidate uploads are excluded; they are served by
+    candidate_photo().
+    """
+
+    def __init__(self, root, exclude=('uploads',)):
+        self.root = root
+        self.exclude = exclude
+        self.files = {}
+        self.load()
+
+    def load(self):
+        files = {}
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            if dirpath == self.root:
+                dirnames[:] = [d for d in dirnames if d not in self.exclude]
+            for fn in filenames:
+                path = os.path.join(dirpath, fn)
+                name = os.path.relpath(path, self.root).replace(os.sep, '/')
+                with open(path, 'rb') as fh:
+                    body = fh.read()
+                mimetype = mimetypes.guess_type(fn)[0] or 'application/octet-stream'
+                bodies = {'identity': body}
+                if mimetype.startswith(ASSET_TEXT_TYPES):
+                    encoded = {'gzip': gzip.compress(body, 9, mtime=0)}
+                    if brotli:
+                        encoded['br'] = brotli.compress(body)
+                    bodies.update((enc, data) for enc, data in encoded.items() if len(data) < len(body))
+                files[name] = {'digest': hashlib.sha256(body).hexdigest()[:12], 'mimetype': mimetype, 'bodies': bodies}
+        self.files = files
+
+    def get(self, name):
+        return self.files.get(name)
+
+
+static_assets = StaticAssets(app.static_folder)
+
+
+def accepted_encoding(available):
+    """The best of br/gzip that both the client accepts and we have, else 'identity'."""
+    for enc in ('br', 'gzip'):
+        if enc in available and request.accept_encodings[enc]:
+            return enc
+    return 'identity'
+
+
+@app.template_global()
+def static_url(filename):
+    """URL of a static file with its content hash in the path, so it can be cached for good."""
+    asset = static_assets.get(filename)
+    if asset is None:
+        return url_for('static', filename=filename)
+    return url_for('static_asset', fingerprint=asset['digest'], filename=filename)
+
+
+@app.route('/assets/<fingerprint>/<path:filename>')
+def static_asset(fingerprint, filename):
+    asset = static_assets.get(filename)
+    if asset is None:
+        abort(404)
+    enc = accepted_encoding(asset['bodies'])
+    resp = Response(asset['bodies'][enc], mimetype=asset['mimetype'])
+    if enc != 'identity':
+        resp.headers['Content-Encoding'] = enc
+    resp.vary.add('Accept-Encoding')
+    resp.set_etag(f"{asset['digest']}-{enc}")
+    if fingerprint == asset['digest']:
+        resp.headers['Cache-Control'] = f'public, max-age={ASSET_MAX_AGE}, immutable'
+    else:
+        resp.headers['Cache-Control'] = f'public, max-age={ASSET_STALE_MAX_AGE}'
+    return resp.make_conditional(request)
+
+
+def etag_matches(etag):
+    """If-None-Match check for a handler's own ETag that also accepts the tag
+    compress_response gives the gzip encoding of the same body."""
+    return request.if_none_match.contains(etag) or request.if_none_match.contains(f'{etag}-gzip')
+
+
+@app.after_request
+def compress_response(resp):
+    """gzip HTML and JSON bodies larger than COMPRESS_MIN_SIZE. Streamed and file
+    responses (exports, SSE, photos) are left alone.
+
+    The gzip body gets its own strong ETag, the handler's with a '-gzip' suffix as
+    on /assets; handlers compare with etag_matches() so both tags revalidate."""
+    etag, weak = resp.get_etag()
+    if resp.status_code == 304 and etag and not weak and request.if_none_match.contains(f'{etag}-gzip'):
+        resp.set_etag(f'{etag}-gzip')
+        return resp
+    if (resp.status_code != 200 or resp.direct_passthrough or resp.is_streamed
+            or resp.mimetype not in COMPRESS_MIMETYPES or 'Content-Encoding' in resp.headers):
+        return resp
+    resp.vary.add('Accept-Encoding')
+    data = resp.get_data()
+    if len(data) < COMPRESS_MIN_SIZE or accepted_encoding({'gzip'}) != 'gzip':
+        return resp
+    resp.set_data(gzip.compress(data, COMPRESS_LEVEL))
+    resp.headers['Content-Encoding'] = 'gzip'
+    if etag and not weak:
+        resp.set_etag(f'{etag}-gzip')
+    return resp
 
 @app.route('/debug_role')
 def debug_role():
@@ -404,25 +1010,157 @@ def debug_role():
         'user_id': session.get('user_id')
     }
 
+PAGE_CACHE_TTL = int(os.environ.get('PAGE_CACHE_TTL', 30))
+
+
+class PageCache:
+    """Per-process cache of public pages as rendered for logged-out visitors, keyed by
+    path and the query values the page is rendered from (see cached_for_anonymous).
+
+    An entry lives for `ttl` seconds but never past the next election start/end, when
+    the page would change. Routes that schedule, pause, resume or cancel an election
+    clear() it; `ttl` bounds how long such a change made in another gunicorn worker,
+    or a new vote count, can go unseen.
+
+    Entries hold a page's bodies by content encoding (see page_bodies), so a hit is
+    sent as stored without compressing it again."""
+
+    def __init__(self, ttl=30, max_entries=500):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        hit = self._entries.get(key)
+        if hit and hit[0] > now_ts():
+            return hit[1]
+        return None
+
+    def put(self, key, bodies, next_boundary=None):
+        now = now_ts()
+        expires = min(now + self.ttl, next_boundary or now + self.ttl)
+        if expires <= now:
+            return
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries = {k: v for k, v in self._entries.items() if v[0] > now}
+                if len(self._entries) >= self.max_entries:
+                    return
+            self._entries[key] = (expires, bodies)
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+
+
+page_cache = PageCache(PAGE_CACHE_TTL)
+
+
+def page_bodies(body):
+    """A page body by content encoding: identity, plus gzip when compress_response would use it."""
+    bodies = {'identity': body}
+    if len(body) >= COMPRESS_MIN_SIZE:
+        bodies['gzip'] = gzip.compress(body, COMPRESS_LEVEL)
+    return bodies
+
+
+def send_encoded(resp, bodies):
+    """Give resp the body of `bodies` in the best encoding the client accepts."""
+    enc = accepted_encoding(bodies)
+    resp.set_data(bodies[enc])
+    if enc != 'identity':
+        resp.headers['Content-Encoding'] = enc
+    resp.vary.add('Accept-Encoding')
+    return resp
+
+
+def cached_for_anonymous(page_key=None):
+    """Serve a logged-out GET from page_cache. Pages rendered for the cache leave out the
+    per-session CSRF token (see base.html), so nothing visitor-specific is shared.
+
+    The cache key is the path plus page_key(request.args): the cleaned query values the
+    view renders from, or None to skip the cache. Without a page_key the query string is
+    ignored, so made-up query strings cannot fill the cache with copies of one page.
+    """
+    def deco(view):
+        @wraps(view)
+        def wrap(*args, **kwargs):
+            if request.method != 'GET' or 'user_id' in session or session.get('_flashes'):
+                return view(*args, **kwargs)
+            variant = page_key(request.args) if page_key else ()
+            if variant is None:
+                return view(*args, **kwargs)
+            key = (request.path,) + variant
+            bodies = page_cache.get(key)
+            if bodies is not None:
+                return send_encoded(Response(mimetype='text/html'), bodies)
+            g.page_cache = True
+            resp = app.make_response(view(*args, **kwargs))
+            if resp.status_code == 200 and not session.modified:
+                bodies = page_bodies(resp.get_data())
+                page_cache.put(key, bodies, election_catalog.get().next_boundary)
+                send_encoded(resp, bodies)
+            return resp
+        return wrap
+    return deco
+
+
+ELECTION_LISTING_ARGS = {'state', 'category', 'date_from', 'date_to', 'before'}
+
+
+def listing_page_key(args):
+    """The election listing variant named by the query args, or None for args the listing
+    does not read and categories no election has."""
+    if not ELECTION_LISTING_ARGS.issuperset(args):
+        return None
+    filters, _, _ = parse_election_filters(args)
+    if filters['category'] and filters['category'] not in election_catalog.get().categories:
+        return None
+    return (listing_state(args), filters['category'], filters['date_from'], filters['date_to'],
+            parse_keyset(args.get('before')))
+
+
 # -------------- Routes --------------
 @app.route("/")
+@cached_for_anonymous()
 def index():
     user = query("SELECT * FROM users WHERE id=?", (session["user_id"],), one=True) if "user_id" in session else None
-    # Show recent elections from all categories (let classify_elections handle the filtering)
-    all_elections = query("SELECT * FROM elections ORDER BY start_time DESC LIMIT 10")
-    ongoing, scheduled, ended = classify_elections(all_elections)
+    catalog = election_catalog.get()
     # Show mix of recent elections: ongoing + scheduled + recent ended
-    recent_elections = ongoing + scheduled + ended[:3]  # Show up to 3 recent ended elections
+    recent_elections = catalog.ongoing + catalog.scheduled + recent_ended(3)  # Show up to 3 recent ended elections
     return render_template("index.html", user=user, elections=recent_elections[:5])
 
 @app.route("/all_elections")
+@cached_for_anonymous(listing_page_key)
 def all_elections():
-    """Public page showing all elections"""
-    elections = query("SELECT * FROM elections ORDER BY start_time DESC")
-    ongoing, scheduled, ended = classify_elections(elections)
-    # Show all non-cancelled elections
-    all_elections = ongoing + scheduled + ended
-    return render_template("all_elections.html", elections=all_elections)
+    """Public page listing elections a page at a time, filterable by state, category and start date"""
+    filters, elections, next_before = election_listing(request.args)
+    catalog = election_catalog.get()
+    return render_template("all_elections.html", elections=elections, counts=catalog.counts,
+                           filters=filters, filter_args={k: v for k, v in filters.items() if v},
+                           categories=catalog.categories, next_before=next_before,
+                           paged=parse_keyset(request.args.get('before')) is not None)
+
+
+@app.route("/api/elections")
+def api_elections():
+    """JSON variant of /all_elections; follow `next` as ?before= for the following page."""
+    limit = min(max(request.args.get('limit', ELECTION_LIST_PAGE, type=int), 1), ELECTION_LIST_MAX)
+    filters, elections, next_before = election_listing(request.args, limit)
+    fields = ('id', 'title', 'category', 'state', 'start_time', 'end_time', 'candidate_limit',
+              'candidate_count', 'vote_count')
+    return jsonify({'elections': [{k: e[k] for k in fields} for e in elections], 'next': next_before,
+                    'filters': {k: v for k, v in filters.items() if v}})
+
+def password_problem(password):
+    """Why a new password is too weak, or None."""
+    if len(password) < 8:
+        return "Password must be at least 8 characters long."
+    if not any(c.isdigit() for c in password):
+        return "Password must contain at least one number."
+    return None
+
 
 @app.route("/signup", methods=["GET","POST"])
 def signup():
@@ -436,30 +1174,20 @@ def signup():
             flash("All fields except email are required.", "error"); return redirect(url_for("signup"))
         
         # Password strength validation
-        if len(password) < 8:
-            flash("Password must be at least 8 characters long.", "error")
-            return redirect(url_for("signup"))
-        if not any(c.isdigit() for c in password):
-            flash("Password must contain at least one number.", "error")
+        problem = password_problem(password)
+        if problem:
+            flash(problem, "error")
             return redirect(url_for("signup"))
         if query("SELECT 1 FROM users WHERE lower(username)=?", (username,), one=True):
             flash("Username already taken.", "error"); return redirect(url_for("signup"))
         if email and query("SELECT 1 FROM users WHERE lower(email)=?", (email.lower(),), one=True):
             flash("Email already registered.", "error"); return redirect(url_for("signup"))
         execute("INSERT INTO users (name,email,username,password,role,id_number) VALUES (?,?,?,?,?,?)",
-                (name, email.lower() if email else None, username, generate_password_hash(password), "voter", id_number))
+                (name, email.lower() if email else None, username, password_hasher.hash(password), "voter", id_number))
         flash("Account created. Please login.", "ok"); return redirect(url_for("login"))
     
     # Pass only scheduled elections data for candidate signup option
-    all_elections = query("SELECT * FROM elections WHERE status != 'cancelled' OR status IS NULL ORDER BY start_time DESC")
-    now = now_utc()
-    scheduled_elections = []
-    for e in all_elections:
-        start_time = parse_iso(e['start_time'])
-        if start_time and start_time > now:
-            scheduled_elections.append(e)
-    
-    return render_template("signup.html", elections=scheduled_elections)
+    return render_template("signup.html", elections=election_catalog.get().scheduled)
 
 @app.route("/login", methods=["GET","POST"])
 def login():
@@ -473,7 +1201,11 @@ def login():
         username = request.form.get("username","" ).strip().lower()
         password = request.form.get("password","" )
         user = query("SELECT * FROM users WHERE lower(username)=?", (username,), one=True)
-        if user and check_password_hash(user["password"], password):
+        ok, new_hash = password_hasher.verify(user["password"], password) if user else (False, None)
+        if ok:
+            if new_hash:
+                # hashing parameters changed since this hash was made
+                execute("UPDATE users SET password=? WHERE id=? AND password=?", (new_hash, user["id"], user["password"]))
             session["user_id"] = user["id"]
             session["role"] = user["role"]
             session["username"] = user["username"]
@@ -481,14 +1213,125 @@ def login():
             flash("Welcome back!", "ok")
             return redirect(url_for("index"))
         flash("Invalid credentials.", "error")
-    # Defensive: render template and strip any stray pw-toggle button server-side
-    html = render_template("login.html")
+    return render_template("login.html")
+
+
+# ----------- Candidate photos -----------
+UPLOADS_DIR = os.path.join(APP_DIR, 'static', 'uploads')
+PHOTO_MAX_BYTES = 5 * 1024 * 1024
+PHOTO_CHUNK = 64 * 1024
+PHOTO_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+# the stored extension comes from the file signature, not from the uploaded name
+PHOTO_SIGNATURES = ((b'\x89PNG\r\n\x1a\n', 'png'), (b'\xff\xd8\xff', 'jpg'), (b'GIF87a', 'gif'), (b'GIF89a', 'gif'))
+PHOTO_VARIANTS = {'thumb': 96, 'medium': 480}   # longest side in pixels
+PHOTO_NAME = re.compile(r'^([0-9a-f]{64})(?:_(thumb|medium))?\.(png|jpg|gif)$')
+PHOTO_MAX_AGE = 365 * 86400
+
+
+class PhotoError(ValueError):
+    pass
+
+
+def save_photo(f):
+    """Stream an uploaded image into UPLOADS_DIR, named by the SHA-256 of its content.
+
+    Reading stops as soon as the upload passes PHOTO_MAX_BYTES, and identical
+    uploads share one file. Resized variants are made by photo_worker, or by
+    candidate_photo if one is requested first.
+    Returns the stored 'uploads/<hash>.<ext>' path; raises PhotoError.
+    """
+    invalid = PhotoError('Invalid photo file. Allowed: png,jpg,jpeg,gif')
+    name_parts = secure_filename(f.filename).rsplit('.', 1)
+    if len(name_parts) < 2 or name_parts[1].lower() not in PHOTO_EXTENSIONS:
+        raise invalid
+    os.makedirs(UPLOADS_DIR, exist_ok=True)
+    digest, size, ext = hashlib.sha256(), 0, None
+    tmp = tempfile.NamedTemporaryFile(dir=UPLOADS_DIR, prefix='.upload-', delete=False)
     try:
-        import re
-        html = re.sub(r"<button[^>]*id=[\"']pw-toggle[\"'][^>]*>.*?</button>", "", html, flags=re.S)
-    except Exception:
-        pass
-    return html
+        with tmp:
+            for chunk in iter(partial(f.stream.read, PHOTO_CHUNK), b''):
+                if ext is None:
+                    ext = next((e for sig, e in PHOTO_SIGNATURES if chunk.startswith(sig)), None)
+                    if ext is None:
+                        raise invalid
+                size += len(chunk)
+                if size > PHOTO_MAX_BYTES:
+                    raise PhotoError('Photo too large (max 5MB).')
+                digest.update(chunk)
+                tmp.write(chunk)
+        if ext is None:
+            raise invalid
+        name = f'{digest.hexdigest()}.{ext}'
+        if os.path.exists(os.path.join(UPLOADS_DIR, name)):
+            os.unlink(tmp.name)
+        else:
+            os.replace(tmp.name, os.path.join(UPLOADS_DIR, name))
+    except BaseException:
+        if os.path.exists(tmp.name):
+            os.unlink(tmp.name)
+        raise
+    photo_worker.submit(make_photo_variants, name)
+    return f'uploads/{name}'
+
+
+def photo_variant_name(name, size):
+    stem, ext = name.rsplit('.', 1)
+    return f'{stem}_{size}.{ext}'
+
+
+def make_photo_variants(name):
+    """Write the PHOTO_VARIANTS of a stored photo that do not exist yet. Needs Pillow;
+    without it candidate_photo serves the original for every variant."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return
+    try:
+        with Image.open(os.path.join(UPLOADS_DIR, name)) as img:
+            for size, px in PHOTO_VARIANTS.items():
+                dest = os.path.join(UPLOADS_DIR, photo_variant_name(name, size))
+                if os.path.exists(dest):
+                    continue
+                variant = img.copy()
+                variant.thumbnail((px, px))
+                options = {'quality': 85, 'optimize': True} if img.format == 'JPEG' else {}
+                # the worker and a request may race on the same variant; each writes its own file
+                with tempfile.NamedTemporaryFile(dir=UPLOADS_DIR, prefix='.variant-', delete=False) as tmp:
+                    variant.save(tmp, format=img.format, **options)
+                os.replace(tmp.name, dest)
+    except Exception as e:
+        print('⚠️ photo variants failed:', name, e)
+
+
+photo_worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix='photos')
+
+
+@app.template_global()
+def photo_url(photo, size='thumb'):
+    """URL of a candidate photo's resized variant. Built from the name alone: every
+    content-addressed photo has its variants, made on upload or by candidate_photo."""
+    name = photo.rsplit('/', 1)[-1]
+    if not PHOTO_NAME.match(name):
+        # uploaded before photos were content-addressed
+        return url_for('static', filename=f'uploads/{name}')
+    return url_for('candidate_photo', name=photo_variant_name(name, size))
+
+
+@app.route('/media/photos/<name>')
+def candidate_photo(name):
+    """Content-addressed photos never change, so browsers may keep them for good. A variant
+    photo_worker has not made yet is made here; one that cannot be made is the original."""
+    m = PHOTO_NAME.match(name)
+    if not m:
+        abort(404)
+    if m[2] and not os.path.exists(os.path.join(UPLOADS_DIR, name)):
+        original = f'{m[1]}.{m[3]}'
+        make_photo_variants(original)
+        if not os.path.exists(os.path.join(UPLOADS_DIR, name)):
+            name = original
+    resp = send_from_directory(UPLOADS_DIR, name)
+    resp.headers['Cache-Control'] = f'public, max-age={PHOTO_MAX_AGE}, immutable'
+    return resp
 
 
 @app.route('/candidate_signup', methods=['GET','POST'])
@@ -506,16 +1349,14 @@ def candidate_signup():
             flash('Username already taken.', 'error'); return redirect(url_for('candidate_signup'))
         # create user as candidate
         execute('INSERT INTO users (name,email,username,password,role) VALUES (?,?,?,?,?)',
-                (name, email.lower() if email else None, username, generate_password_hash(password), 'candidate'))
+                (name, email.lower() if email else None, username, password_hasher.hash(password), 'candidate'))
         user = query('SELECT * FROM users WHERE lower(username)=?', (username,), one=True)
         user_id = user['id']
         # Check if election has started (prevent registration for ongoing/ended elections)
         if election_id:
             election = query('SELECT * FROM elections WHERE id=?', (election_id,), one=True)
             if election:
-                now = now_utc()
-                start_time = parse_iso(election['start_time'])
-                if start_time and start_time <= now:
+                if election['start_ts'] is not None and election['start_ts'] <= now_ts():
                     flash('Registration closed! This election has already started. You can only register for scheduled elections.', 'error')
                     return redirect(url_for('candidate_signup'))
             
@@ -526,100 +1367,168 @@ def candidate_signup():
         # handle photo
         photo_path=None; f=request.files.get('photo')
         if f and f.filename:
-            # Enhanced validation: extension, mimetype, and magic bytes check, size limit 5MB
-            allowed_ext = {'png','jpg','jpeg','gif'}
-            name_parts = secure_filename(f.filename).rsplit('.', 1)
-            ext = name_parts[1].lower() if len(name_parts) > 1 else ''
-            # Check file extension and mimetype
-            if ext not in allowed_ext or not f.mimetype or not f.mimetype.startswith('image'):
-                flash('Invalid photo file. Allowed: png,jpg,jpeg,gif', 'error'); return redirect(url_for('candidate_signup'))
-            data = f.read()
-            if len(data) > 5*1024*1024:
-                flash('Photo too large (max 5MB).', 'error'); return redirect(url_for('candidate_signup'))
-            # persist file
-            filename = secure_filename(f.filename)
-            uploads_dir = os.path.join(APP_DIR, 'static', 'uploads'); os.makedirs(uploads_dir, exist_ok=True)
-            with open(os.path.join(uploads_dir, filename), 'wb') as out:
-                out.write(data)
-            photo_path=f'uploads/{filename}'
+            # extension, file signature and size (5MB) are checked while streaming to disk
+            try:
+                photo_path = save_photo(f)
+            except PhotoError as exc:
+                flash(str(exc), 'error'); return redirect(url_for('candidate_signup'))
         applied_at = datetime.now(timezone.utc).isoformat()
         execute('INSERT INTO candidate_applications (user_id,election_id,name,category,photo,status,applied_at) VALUES (?,?,?,?,?,?,?)',
                 (user_id, election_id, name, category, photo_path, 'pending', applied_at))
         flash('Application submitted. Awaiting admin approval.', 'ok'); return redirect(url_for('login'))
     # Only show scheduled elections (not started yet)
-    all_elections = query("SELECT * FROM elections WHERE status != 'cancelled' OR status IS NULL ORDER BY start_time DESC")
-    now = now_utc()
-    scheduled_elections = []
-    for e in all_elections:
-        start_time = parse_iso(e['start_time'])
-        if start_time and start_time > now:
-            scheduled_elections.append(e)
-    
-    return render_template('candidate_signup.html', elections=scheduled_elections)
+    return render_template('candidate_signup.html', elections=election_catalog.get().scheduled)
 
 
 @app.route('/candidate/profile')
 @login_required(role='candidate')
 def candidate_profile():
     user_id = session.get('user_id')
-    # mark notifications read
+    notes, more_notes = notification_page(user_id, limit=10)
     try:
-        execute('UPDATE notifications SET read=1 WHERE user_id=?', (user_id,))
+        mark_notifications_read(user_id, notes)
     except Exception:
         pass
     apps = query('SELECT a.*, e.title AS election_title FROM candidate_applications a LEFT JOIN elections e ON e.id=a.election_id WHERE a.user_id=? ORDER BY a.applied_at DESC', (user_id,))
     approved = query('SELECT c.*, e.title AS election_title FROM candidates c LEFT JOIN elections e ON e.id=c.election_id WHERE c.user_id=?', (user_id,))
-    return render_template('candidate_profile.html', apps=apps, approved=approved)
+    return render_template('candidate_profile.html', apps=apps, approved=approved, notifications=notes, more_notifications=more_notes)
 
 
-@app.route('/profile')
+@app.route('/notifications')
 @login_required()
-def user_profile():
+def notifications():
     user_id = session.get('user_id')
-    role = session.get('role')
-    
-    # Get user information
-    user = query('SELECT * FROM users WHERE id=?', (user_id,), one=True)
-    if not user:
-        flash('User not found.', 'error')
-        return redirect(url_for('index'))
-    
-    # Mark notifications as read
+    before = request.args.get('before', type=int)
+    notes, next_before = notification_page(user_id, before)
     try:
-        execute('UPDATE notifications SET read=1 WHERE user_id=?', (user_id,))
+        mark_notifications_read(user_id, notes)
     except Exception:
         pass
-    
-    # Calculate stats
-    total_votes = query('SELECT COUNT(*) as count FROM votes WHERE user_id=?', (user_id,), one=True)['count']
-    total_applications = query('SELECT COUNT(*) as count FROM candidate_applications WHERE user_id=?', (user_id,), one=True)['count']
-    approved_candidacies = query('SELECT COUNT(*) as count FROM candidates WHERE user_id=?', (user_id,), one=True)['count']
-    
-    # Calculate account age in days
+    return render_template('notifications.html', notifications=notes, next_before=next_before, before=before)
+
+
+PROFILE_CACHE_TTL = int(os.environ.get('PROFILE_CACHE_TTL', 60))
+PROFILE_HISTORY_PAGE = 10
+
+# The user row and the profile stats in one pass; each count is an index lookup on user_id
+PROFILE_SQL = """
+    SELECT u.id, u.name, u.email, u.username, u.role, u.id_number, u.created_at,
+           (SELECT COUNT(*) FROM votes v WHERE v.user_id = u.id) AS total_votes,
+           (SELECT COUNT(*) FROM candidate_applications a WHERE a.user_id = u.id) AS total_applications,
+           (SELECT COUNT(*) FROM candidates c WHERE c.user_id = u.id) AS approved_candidacies
+    FROM users u WHERE u.id = ?
+"""
+
+
+# What a cached profile is keyed on. Triggers bump users.profile_version on applications,
+# approvals and profile edits; ballots are covered by the user's ballot count and latest
+# ballot id, read from the votes(user_id, election_id) index, so voting writes nothing to users.
+PROFILE_VERSION_SQL = """
+    SELECT u.profile_version, COUNT(v.id) AS ballots, MAX(v.id) AS last_ballot
+    FROM users u LEFT JOIN votes v ON v.user_id = u.id
+    WHERE u.id = ?
+    GROUP BY u.id
+"""
+
+
+class ProfileCache:
+    """Per-process cache of profile page payloads.
+
+    An entry is reused only while the version read by PROFILE_VERSION_SQL matches
+    the one it was built at, so a change made through any worker shows on the next
+    view. The ttl bounds staleness of joined election titles and statuses.
+    """
+
+    def __init__(self, ttl=60, max_entries=5000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id, version):
+        hit = self._entries.get(user_id)
+        if hit and hit[0] == version and hit[1] > time.monotonic():
+            return hit[2]
+        return None
+
+    def put(self, user_id, version, payload):
+        now = time.monotonic()
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries = {k: v for k, v in self._entries.items() if v[1] > now}
+            self._entries[user_id] = (version, now + self.ttl, payload)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+profile_cache = ProfileCache(PROFILE_CACHE_TTL)
+
+
+def voting_history_page(user_id, before=None, limit=PROFILE_HISTORY_PAGE):
+    """A page of the user's ballots, newest first, keyed on vote id; returns (rows, next_before)."""
+    sql = ('SELECT v.id, v.voted_at, e.title AS election_title, e.status, c.name AS candidate_name FROM votes v '
+           'LEFT JOIN elections e ON e.id=v.election_id LEFT JOIN candidates c ON c.id=v.candidate_id '
+           'WHERE v.user_id=:user_id')
+    if before:
+        sql += ' AND v.id < :before'
+    rows = query(sql + ' ORDER BY v.id DESC LIMIT :limit', {'user_id': user_id, 'before': before, 'limit': limit + 1})
+    if len(rows) > limit:
+        return rows[:limit], rows[limit - 1]['id']
+    return rows, None
+
+
+def load_profile(user_id):
+    """Everything the profile page shows for a user, or None if the user is gone."""
+    user = query(PROFILE_SQL, (user_id,), one=True)
+    if not user:
+        return None
     account_age_days = 0
-    if user['created_at']:
-        try:
-            from datetime import datetime
-            created_date = datetime.fromisoformat(user['created_at'].replace('Z', '+00:00'))
-            account_age_days = (datetime.now().replace(tzinfo=created_date.tzinfo) - created_date).days
-        except:
-            account_age_days = 0
-    
-    # Get role-specific data
-    profile_data = {
+    created = parse_iso(user['created_at'])
+    if created:
+        account_age_days = (now_utc() - created).days
+    history, history_before = voting_history_page(user_id)
+    candidate_apps, approved_candidacies = [], []
+    if user['role'] in ('candidate', 'admin'):
+        candidate_apps = query('SELECT a.*, e.title AS election_title FROM candidate_applications a LEFT JOIN elections e ON e.id=a.election_id WHERE a.user_id=? ORDER BY a.applied_at DESC LIMIT 3', (user_id,))
+        approved_candidacies = query('SELECT c.*, e.title AS election_title, e.status AS election_status FROM candidates c LEFT JOIN elections e ON e.id=c.election_id WHERE c.user_id=? ORDER BY c.id DESC LIMIT 3', (user_id,))
+    return {
         'user': user,
-        'role': role,
         'stats': {
-            'total_votes': total_votes,
-            'total_applications': total_applications,
-            'approved_candidacies': approved_candidacies,
+            'total_votes': user['total_votes'],
+            'total_applications': user['total_applications'],
+            'approved_candidacies': user['approved_candidacies'],
             'account_age_days': account_age_days
         },
-        'voting_history': query('SELECT v.*, e.title AS election_title, e.status, c.name AS candidate_name FROM votes v LEFT JOIN elections e ON e.id=v.election_id LEFT JOIN candidates c ON c.id=v.candidate_id WHERE v.user_id=? ORDER BY v.voted_at DESC', (user_id,)),
-        'candidate_apps': query('SELECT a.*, e.title AS election_title FROM candidate_applications a LEFT JOIN elections e ON e.id=a.election_id WHERE a.user_id=? ORDER BY a.applied_at DESC', (user_id,)),
-        'approved_candidacies': query('SELECT c.*, e.title AS election_title, e.status AS election_status FROM candidates c LEFT JOIN elections e ON e.id=c.election_id WHERE c.user_id=?', (user_id,))
+        'voting_history': history,
+        'history_before': history_before,
+        'candidate_apps': candidate_apps,
+        'approved_candidacies': approved_candidacies,
     }
-    
+
+
+@app.route('/profile')
+@login_required()
+def user_profile():
+    user_id = session.get('user_id')
+    row = query(PROFILE_VERSION_SQL, (user_id,), one=True)
+    version = row and tuple(row)
+    profile = row and profile_cache.get(user_id, version)
+    if not profile and row:
+        profile = load_profile(user_id)
+        if profile:
+            profile_cache.put(user_id, version, profile)
+    if not profile:
+        flash('User not found.', 'error')
+        return redirect(url_for('index'))
+
+    profile_data = dict(profile, role=session.get('role'), history_from=None)
+    # older history pages are read directly; only the first page is cached
+    before = request.args.get('before', type=int)
+    if before:
+        profile_data['voting_history'], profile_data['history_before'] = voting_history_page(user_id, before)
+        profile_data['history_from'] = before
     return render_template('profile.html', **profile_data)
 
 
@@ -660,7 +1569,7 @@ def change_password():
         
         # Get current user
         user = query('SELECT * FROM users WHERE id=?', (user_id,), one=True)
-        if not user or not check_password_hash(user['password'], current_password):
+        if not user or not password_hasher.verify(user['password'], current_password)[0]:
             flash('Current password is incorrect', 'error')
             return redirect(url_for('user_profile'))
         
@@ -673,7 +1582,7 @@ def change_password():
             flash('New passwords do not match', 'error')
             return redirect(url_for('user_profile'))
         
-        hashed_password = generate_password_hash(new_password)
+        hashed_password = password_hasher.hash(new_password)
         execute('UPDATE users SET password=? WHERE id=?', (hashed_password, user_id))
         
         flash('Password changed successfully', 'ok')
@@ -695,7 +1604,7 @@ def change_password_ajax():
         if len(new_password) < 6:
             return jsonify({'success': False, 'message': 'Password must be at least 6 characters long'})
         
-        hashed_password = generate_password_hash(new_password)
+        hashed_password = password_hasher.hash(new_password)
         execute('UPDATE users SET password=? WHERE id=?', (hashed_password, user_id))
         
         return jsonify({'success': True, 'message': 'Password changed successfully'})
@@ -706,68 +1615,141 @@ def change_password_ajax():
 @app.route('/admin/candidate_applications')
 @login_required(role='admin')
 def admin_candidate_applications():
-    rows = query("SELECT a.*, u.username, u.email, e.title AS election_title FROM candidate_applications a JOIN users u ON u.id=a.user_id LEFT JOIN elections e ON e.id=a.election_id WHERE a.status='pending' ORDER BY a.applied_at ASC")
+    rows = query("SELECT a.*, u.username, u.email, e.title AS election_title FROM candidate_applications a LEFT JOIN users u ON u.id=a.user_id LEFT JOIN elections e ON e.id=a.election_id WHERE a.status='pending' ORDER BY a.applied_at ASC")
     return render_template('admin_candidate_applications.html', apps=rows)
 
 
+# (email subject, email body, in-app notification) per review outcome
+CANDIDACY_MESSAGES = {
+    'approved': ('Your candidacy has been approved',
+                 "Hello {user},\n\nYour application for '{name}' has been approved and you are now registered as a candidate for the election.\n\nRegards",
+                 "Your application for '{name}' was approved."),
+    'rejected': ('Your candidacy has been rejected',
+                 "Hello {user},\n\nYour application for '{name}' was rejected by the admin.\n\nRegards",
+                 "Your application for '{name}' was rejected by the admin."),
+}
+
+# Pending applications among a JSON array of ids, oldest first, with the
+# applicant's contact details and the election's limit and current candidate count.
+PENDING_APPLICATIONS_SQL = """
+    SELECT a.id, a.user_id, a.election_id, a.name, a.category, a.photo,
+           u.email, u.name AS user_name, e.candidate_limit,
+           u.id IS NULL OR e.id IS NULL AS orphaned,
+           (SELECT COUNT(*) FROM candidates c WHERE c.election_id = a.election_id) AS candidate_count
+    FROM candidate_applications a
+    LEFT JOIN users u ON u.id = a.user_id
+    LEFT JOIN elections e ON e.id = a.election_id
+    WHERE a.status = 'pending' AND a.id IN (SELECT value FROM json_each(?))
+    ORDER BY a.applied_at, a.id
+"""
+
+
+def review_applications(app_ids, status, reviewer_id):
+    """Approve or reject many pending applications in one transaction.
+
+    Approvals are taken oldest first and stop per election once its
+    candidate_limit is reached; those applications stay pending.
+    Applications whose user or election has been deleted are rejected
+    without any notification. Returns (reviewed, skipped, orphaned) counts.
+    """
+    db = get_db()
+    db.execute('BEGIN IMMEDIATE')
+    try:
+        apps = db.execute(PENDING_APPLICATIONS_SQL, (json.dumps(sorted(app_ids)),)).fetchall()
+        counts, reviewed, orphaned, skipped = {}, [], [], 0
+        for a in apps:
+            if a['orphaned']:
+                orphaned.append(a)
+                continue
+            if status == 'approved':
+                count = counts.get(a['election_id'], a['candidate_count'])
+                if a['candidate_limit'] is not None and count >= a['candidate_limit']:
+                    skipped += 1
+                    continue
+                counts[a['election_id']] = count + 1
+            reviewed.append(a)
+        reviewed_at = datetime.now(timezone.utc).isoformat()
+        if status == 'approved':
+            db.executemany('INSERT INTO candidates (name,category,photo,election_id,user_id) VALUES (?,?,?,?,?)',
+                           [(a['name'], a['category'], a['photo'], a['election_id'], a['user_id']) for a in reviewed])
+        db.executemany('UPDATE candidate_applications SET status=?, reviewed_by=?, reviewed_at=? WHERE id=?',
+                       [(status, reviewer_id, reviewed_at, a['id']) for a in reviewed]
+                       + [('rejected', reviewer_id, reviewed_at, a['id']) for a in orphaned])
+        subject, body, note = CANDIDACY_MESSAGES[status]
+        queue_emails([(a['email'], subject, body.format(user=a['user_name'], name=a['name']))
+                      for a in reviewed if a['email']], db=db)
+        send_notifications([(a['user_id'], note.format(name=a['name'])) for a in reviewed], db=db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    if reviewed:
+        if status == 'approved':
+            candidate_cache.invalidate({a['election_id'] for a in reviewed})
+        unread_counts.invalidate(*{a['user_id'] for a in reviewed})
+        outbox.wake()
+    return len(reviewed), skipped, len(orphaned)
+
+
+ORPHANED_APPLICATIONS = '{count} application(s) rejected: the applicant or the election no longer exists.'
+
+
+def application_ids(values):
+    ids = set()
+    for v in values:
+        try:
+            ids.add(int(v))
+        except (TypeError, ValueError):
+            pass
+    return ids
+
+
 @app.route('/admin/approve_candidate', methods=['POST'])
 @login_required(role='admin')
 def admin_approve_candidate():
-    app_id = request.form.get('application_id')
-    if not app_id:
+    app_ids = application_ids([request.form.get('application_id')])
+    if not app_ids:
         flash('Invalid request.', 'error'); return redirect(url_for('admin_candidate_applications'))
-    a = query('SELECT * FROM candidate_applications WHERE id=?', (app_id,), one=True)
-    if not a:
-        flash('Application not found.', 'error'); return redirect(url_for('admin_candidate_applications'))
-    # create candidate row
-    photo = a['photo']
-    election_id = a['election_id']
-    name = a['name']
-    category = a['category']
-    user_id = a['user_id']
-    execute('INSERT INTO candidates (name,category,photo,election_id,user_id) VALUES (?,?,?,?,?)', (name, category, photo, election_id, user_id))
-    candidate_id = query('SELECT id FROM candidates WHERE user_id=? ORDER BY id DESC', (user_id,), one=True)['id']
-    # update application
-    reviewed_at = datetime.now(timezone.utc).isoformat()
-    execute('UPDATE candidate_applications SET status=?, reviewed_by=?, reviewed_at=? WHERE id=?', ('approved', session.get('user_id'), reviewed_at, app_id))
-    # notify candidate if email available
-    try:
-        user = query('SELECT * FROM users WHERE id=?', (user_id,), one=True)
-        if user:
-            if user.get('email'):
-                send_email(user.get('email'), 'Your candidacy has been approved', f"Hello {user.get('name')},\n\nYour application for '{name}' has been approved and you are now registered as a candidate for the election.\n\nRegards")
-            # create in-app notification
-            try:
-                send_notification(user['id'], f"Your application for '{name}' was approved.")
-            except Exception:
-                pass
-    except Exception:
-        pass
-    flash('Candidate approved and registered for election.', 'ok'); return redirect(url_for('admin_candidate_applications'))
+    approved, skipped, orphaned = review_applications(app_ids, 'approved', session.get('user_id'))
+    if orphaned:
+        flash(ORPHANED_APPLICATIONS.format(count=orphaned), 'warn')
+    elif skipped:
+        flash('Candidate limit reached for this election.', 'warn')
+    elif not approved:
+        flash('Application not found.', 'error')
+    else:
+        flash('Candidate approved and registered for election.', 'ok')
+    return redirect(url_for('admin_candidate_applications'))
 
 
 @app.route('/admin/reject_candidate', methods=['POST'])
 @login_required(role='admin')
 def admin_reject_candidate():
-    app_id = request.form.get('application_id')
-    if not app_id:
+    app_ids = application_ids([request.form.get('application_id')])
+    if not app_ids:
         flash('Invalid request.', 'error'); return redirect(url_for('admin_candidate_applications'))
-    execute('UPDATE candidate_applications SET status=? WHERE id=?', ('rejected', app_id))
-    try:
-        a = query('SELECT * FROM candidate_applications WHERE id=?', (app_id,), one=True)
-        if a:
-            user = query('SELECT * FROM users WHERE id=?', (a['user_id'],), one=True)
-            if user:
-                if user.get('email'):
-                    send_email(user.get('email'), 'Your candidacy has been rejected', f"Hello {user.get('name')},\n\nYour application for '{a['name']}' was rejected by the admin.\n\nRegards")
-                try:
-                    send_notification(user['id'], f"Your application for '{a['name']}' was rejected by the admin.")
-                except Exception:
-                    pass
-    except Exception:
-        pass
+    _, _, orphaned = review_applications(app_ids, 'rejected', session.get('user_id'))
+    if orphaned:
+        flash(ORPHANED_APPLICATIONS.format(count=orphaned), 'warn'); return redirect(url_for('admin_candidate_applications'))
     flash('Application rejected.', 'ok'); return redirect(url_for('admin_candidate_applications'))
 
+
+@app.route('/admin/candidate_applications/bulk', methods=['POST'])
+@login_required(role='admin')
+def admin_bulk_review_candidates():
+    app_ids = application_ids(request.form.getlist('application_id'))
+    action = request.form.get('action')
+    if not app_ids or action not in ('approve', 'reject'):
+        flash('Select at least one application.', 'error'); return redirect(url_for('admin_candidate_applications'))
+    status = 'approved' if action == 'approve' else 'rejected'
+    reviewed, skipped, orphaned = review_applications(app_ids, status, session.get('user_id'))
+    flash(f'{reviewed} application(s) {status}.', 'ok')
+    if orphaned:
+        flash(ORPHANED_APPLICATIONS.format(count=orphaned), 'warn')
+    if skipped:
+        flash(f'{skipped} application(s) left pending: candidate limit reached for their election.', 'warn')
+    return redirect(url_for('admin_candidate_applications'))
+
 @app.route("/logout")
 def logout():
     session.clear(); flash("Logged out.", "ok"); return redirect(url_for("index"))
@@ -776,29 +1758,25 @@ def logout():
 @app.route("/admin")
 @login_required(role="admin")
 def admin():
-    rows = query("SELECT * FROM elections ORDER BY start_time DESC")
-    ongoing, scheduled, ended = classify_elections(rows)
-    return render_template("admin.html", ongoing=ongoing, scheduled=scheduled, ended=ended, elections=rows)
+    catalog = election_catalog.get()
+    # only the soonest scheduled and newest ended elections are shown; the full lists are paged
+    # on /all_elections and /admin/past-elections
+    return render_template("admin.html", ongoing=catalog.ongoing, scheduled=catalog.scheduled[:-6:-1],
+                           ended=recent_ended(3), counts=catalog.counts,
+                           open_elections=catalog.ongoing + catalog.scheduled)
 
 @app.route("/admin/past-elections")
 @login_required(role="admin")
 def past_elections():
-    """Show all past elections with full details"""
-    rows = query("SELECT * FROM elections ORDER BY start_time DESC")
-    ongoing, scheduled, ended = classify_elections(rows)
-    
-    # Get candidate count for each election
-    elections_with_stats = []
-    for e in ended:
-        candidate_count = query("SELECT COUNT(*) as count FROM candidates WHERE election_id=?", (e['id'],), one=True)
-        vote_count = query("SELECT COUNT(*) as count FROM votes WHERE election_id=?", (e['id'],), one=True)
-        
-        election_data = dict(e)
-        election_data['candidate_count'] = candidate_count['count'] if candidate_count else 0
-        election_data['vote_count'] = vote_count['count'] if vote_count else 0
-        elections_with_stats.append(election_data)
-    
-    return render_template("past_elections.html", elections=elections_with_stats, total_count=len(ended))
+    """Show past elections with full details, a page at a time"""
+    filters, clauses, params = parse_election_filters(request.args)
+    cursor = parse_keyset(request.args.get('before'))
+    elections, next_before = election_page('ended', clauses, params, cursor)
+    summary = past_elections_summary(clauses, params)
+    return render_template("past_elections.html", elections=elections, total_count=summary['total'], summary=summary,
+                           filters=filters, filter_args={k: v for k, v in filters.items() if v},
+                           categories=election_catalog.get().categories,
+                           next_before=next_before, paged=cursor is not None)
 
 @app.route("/add_candidate", methods=["POST"])
 @login_required(role="admin")
@@ -822,36 +1800,35 @@ def add_candidate():
             flash("Candidate limit reached for this election.", "warn"); return redirect(url_for("admin"))
     photo_path=None; f=request.files.get("photo")
     if f and f.filename:
-        # Security validation: extension and mimetype, size limit 5MB
-        allowed_ext = {'png','jpg','jpeg','gif'}
-        name_parts = secure_filename(f.filename).rsplit('.', 1)
-        ext = name_parts[1].lower() if len(name_parts) > 1 else ''
-        if ext not in allowed_ext or (f.mimetype and not f.mimetype.startswith('image')):
-            flash('Invalid photo file. Allowed: png,jpg,jpeg,gif', 'error'); return redirect(url_for('admin'))
-        data = f.read()
-        if len(data) > 5*1024*1024:
-            flash('Photo too large (max 5MB).', 'error'); return redirect(url_for('admin'))
-        # persist file
-        filename = secure_filename(f.filename)
-        uploads_dir = os.path.join(APP_DIR, "static", "uploads"); os.makedirs(uploads_dir, exist_ok=True)
-        with open(os.path.join(uploads_dir, filename), 'wb') as out:
-            out.write(data)
-        photo_path=f"uploads/{filename}"
+        try:
+            photo_path = save_photo(f)
+        except PhotoError as exc:
+            flash(str(exc), 'error'); return redirect(url_for('admin'))
     execute("INSERT INTO candidates (name,category,photo,election_id) VALUES (?,?,?,?)",
             (name, category, photo_path, election_id))
+    candidate_cache.invalidate([election_id])
     flash("Candidate added to election.", "ok"); return redirect(url_for("admin"))
 
 # Removed duplicate/obsolete schedule_election route - using /schedule instead
 
 # ----------- Voting & Results -----------
+ELECTION_TALLIES_SQL = """
+    SELECT c.id, c.name, c.category, c.photo, COALESCE(t.votes, 0) AS votes
+    FROM candidates c
+    LEFT JOIN candidate_tallies t ON t.candidate_id = c.id
+    WHERE c.election_id = ?
+    ORDER BY votes DESC, c.name ASC
+"""
+
+
+def election_tallies(election_id):
+    """Candidates of an election with their vote counts, most votes first."""
+    return query(ELECTION_TALLIES_SQL, (election_id,))
+
+
 def current_active_election():
-    rows = query("SELECT * FROM elections WHERE status != 'cancelled' OR status IS NULL ORDER BY start_time DESC")
-    now = now_utc()
-    for e in rows:
-        s = parse_iso(e["start_time"]); t = parse_iso(e["end_time"])
-        if s and t and s <= now <= t:
-            return e
-    return None
+    ongoing = election_catalog.get().ongoing
+    return ongoing[0] if ongoing else None
 
 
 def to_ist(dt):
@@ -864,6 +1841,260 @@ def to_ist(dt):
         return dt
 
 
+# One statement validates and records a ballot: it inserts nothing unless the election is open
+# (not paused/cancelled, inside its time window), the candidate belongs to it and the user has
+# not voted in it yet. UNIQUE(user_id, election_id) still backs up the NOT EXISTS under races.
+VOTE_INSERT_SQL = """
+    INSERT INTO votes (user_id, candidate_id, election_id, voted_at)
+    SELECT :user_id, c.id, e.id, :voted_at
+    FROM elections e
+    JOIN candidates c ON c.id = :candidate_id AND c.election_id = e.id
+    WHERE e.id = :election_id
+      AND (e.status IS NULL OR e.status NOT IN ('paused', 'cancelled'))
+      AND e.start_ts <= :now AND :now < e.end_ts
+      AND NOT EXISTS (SELECT 1 FROM votes WHERE user_id = :user_id AND election_id = :election_id)
+"""
+
+VOTE_REJECTIONS = {
+    'no_election': ("No election is scheduled right now.", "warn"),
+    'paused': ("This election is currently paused. Please wait for the admin to resume voting.", "warn"),
+    'cancelled': ("This election has been cancelled.", "warn"),
+    'inactive': ("This election is not active.", "warn"),
+    'duplicate': ("You have already voted in this election.", "warn"),
+    'bad_candidate': ("Invalid candidate selection.", "error"),
+    'busy': ("Voting is busy right now and your vote was not recorded. Please try again.", "warn"),
+    'pending': ("Your vote is still being recorded. Please wait a moment before trying again.", "warn"),
+}
+
+
+def insert_ballot(db, user_id, election_id, candidate_id, voted_at):
+    """Run VOTE_INSERT_SQL on db without committing. Returns 'ok' or a VOTE_REJECTIONS key."""
+    args = {'user_id': user_id, 'election_id': election_id, 'candidate_id': candidate_id,
+            'voted_at': voted_at.isoformat(), 'now': to_epoch(voted_at)}
+    try:
+        if db.execute(VOTE_INSERT_SQL, args).rowcount == 1:
+            return 'ok'
+    except sqlite3.IntegrityError:
+        return 'duplicate'
+    # rejected: one more lookup, only on this path, to say why
+    r = db.execute("""
+        SELECT e.status, e.start_ts, e.end_ts,
+               EXISTS (SELECT 1 FROM votes WHERE user_id = :user_id AND election_id = :election_id) AS voted,
+               EXISTS (SELECT 1 FROM candidates WHERE id = :candidate_id AND election_id = :election_id) AS valid_candidate
+        FROM elections e WHERE e.id = :election_id
+    """, args).fetchone()
+    if not r:
+        return 'no_election'
+    if r['status'] in ('paused', 'cancelled'):
+        return r['status']
+    if r['start_ts'] is None or r['end_ts'] is None or not (r['start_ts'] <= args['now'] < r['end_ts']):
+        return 'inactive'
+    if r['voted']:
+        return 'duplicate'
+    return 'bad_candidate'
+
+
+class VoteTicket:
+    __slots__ = ('args', 'done', 'outcome', 'error', 'claimed', 'cancelled')
+
+    def __init__(self, args):
+        self.args = args
+        self.done = threading.Event()
+        self.outcome = None
+        self.error = None
+        self.claimed = False     # the writer holds the write lock and will commit it
+        self.cancelled = False   # the request gave up first; the writer skips it
+
+
+class VoteBatcher:
+    """Group commit for ballots. Request threads queue their ballot and block; one writer thread
+    per worker commits up to `max_batch` queued ballots in a single transaction, waiting at most
+    `max_wait` seconds for more to arrive, then wakes each request with its own outcome. A
+    ballot is reported as recorded only after the transaction holding it has committed.
+
+    A request that times out before the writer has claimed its ballot cancels it ('busy': not
+    recorded, safe to retry); once claimed the ballot is in the transaction being committed
+    and the request can only report it as 'pending'."""
+
+    def __init__(self, pool, max_batch=64, max_wait=0.0):
+        self.pool = pool
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._batches = 0
+        self._ballots = 0
+        self._largest = 0
+
+    def submit(self, user_id, election_id, candidate_id, voted_at, timeout=30):
+        self._ensure_started()
+        ticket = VoteTicket((user_id, election_id, candidate_id, voted_at))
+        self._queue.put(ticket)
+        if not ticket.done.wait(timeout):
+            with self._lock:
+                if not ticket.claimed:
+                    ticket.cancelled = True
+                    return 'busy'
+            if not ticket.done.wait(timeout):
+                return 'pending'
+        if ticket.error:
+            raise ticket.error
+        return ticket.outcome
+
+    def _ensure_started(self):
+        # started lazily so a preloaded app does not fork a dead thread into each worker
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='vote-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                # take everything already queued (it piled up during the last commit), then
+                # linger up to max_wait for stragglers
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except queue.Empty:
+                    pass
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._commit(batch)
+
+    def _commit(self, batch):
+        try:
+            conn = self.pool.acquire()
+        except Exception as e:
+            for t in batch:
+                t.error = e
+                t.done.set()
+            return
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            with self._lock:
+                batch = [t for t in batch if not t.cancelled]
+                for t in batch:
+                    t.claimed = True
+            for t in batch:
+                # a duplicate or invalid ballot only fails its own statement, not the batch
+                t.outcome = insert_ballot(conn, *t.args)
+            conn.commit()
+            with self._lock:
+                self._batches += 1
+                self._ballots += len(batch)
+                self._largest = max(self._largest, len(batch))
+        except Exception as e:
+            print(f"❌ Vote batch of {len(batch)} failed: {e}")
+            conn.rollback()
+            for t in batch:
+                t.error = e
+        finally:
+            self.pool.release(conn)
+            for t in batch:
+                t.done.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'batches': self._batches,
+                'ballots': self._ballots,
+                'largest_batch': self._largest,
+                'queued': self._queue.qsize(),
+            }
+
+
+VOTE_BATCHING = os.environ.get('VOTE_BATCHING', '').lower() in ('1', 'true', 'yes')
+vote_batcher = VoteBatcher(db_pool,
+                           max_batch=int(os.environ.get('VOTE_BATCH_SIZE', 64)),
+                           max_wait=float(os.environ.get('VOTE_BATCH_WAIT_MS', 0)) / 1000) if VOTE_BATCHING else None
+
+
+def cast_vote(user_id, election_id, candidate_id, voted_at):
+    """Record one ballot, through the group-commit writer when VOTE_BATCHING is on or in its
+    own transaction otherwise. Returns 'ok' or a VOTE_REJECTIONS key."""
+    if vote_batcher:
+        return vote_batcher.submit(user_id, election_id, candidate_id, voted_at)
+    db = get_db()
+    try:
+        outcome = insert_ballot(db, user_id, election_id, candidate_id, voted_at)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return outcome
+
+
+def legacy_ballot(path, user_id, election_id, candidate_id, voted_at):
+    """The pre-VOTE_INSERT_SQL path, kept only as the bench-votes baseline: a new connection
+    per request, then election, duplicate and candidate lookups before the INSERT."""
+    db = migrations.connect(path)
+    try:
+        e = db.execute("SELECT * FROM elections WHERE id=?", (election_id,)).fetchone()
+        if not e or e['status'] in ('paused', 'cancelled'):
+            return 'no_election' if not e else e['status']
+        if db.execute("SELECT 1 FROM votes WHERE user_id=? AND election_id=?", (user_id, election_id)).fetchone():
+            return 'duplicate'
+        if not db.execute("SELECT * FROM candidates WHERE id=? AND election_id=?", (candidate_id, election_id)).fetchone():
+            return 'bad_candidate'
+        db.execute("INSERT INTO votes (user_id,candidate_id,election_id,voted_at) VALUES (?,?,?,?)",
+                   (user_id, candidate_id, election_id, voted_at.isoformat()))
+        db.commit()
+        return 'ok'
+    finally:
+        db.close()
+
+
+@app.cli.command('bench-votes')
+@click.option('--ballots', default=3000, show_default=True, help='Ballots to cast per run.')
+def bench_votes_command(ballots):
+    """Measure sequential ballots per second, old lookups-then-INSERT path against VOTE_INSERT_SQL
+    on a pooled connection. Runs against a scratch database, never SQLITE_PATH."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        conn = migrations.connect(path)
+        migrations.migrate(conn, password_hasher.hash_inline)
+        conn.execute('PRAGMA journal_mode=WAL')
+        voted_at = now_utc()
+        start = to_epoch(voted_at) - 3600
+        elections = []
+        for run in ('legacy', 'pooled'):
+            eid = conn.execute('INSERT INTO elections (title, start_time, end_time, start_ts, end_ts) '
+                               'VALUES (?, ?, ?, ?, ?)', (f'bench {run}', 'x', 'y', start, start + 7200)).lastrowid
+            cid = conn.execute('INSERT INTO candidates (name, election_id) VALUES (?, ?)', ('bench', eid)).lastrowid
+            elections.append((eid, cid))
+        conn.commit()
+        conn.close()
+
+        db = SQLitePool(path, size=1).acquire()
+
+        def pooled(user_id, election_id, candidate_id, voted_at):
+            outcome = insert_ballot(db, user_id, election_id, candidate_id, voted_at)
+            db.commit()
+            return outcome
+
+        runs = (('3 SELECTs + INSERT, fresh connection', partial(legacy_ballot, path)),
+                ('VOTE_INSERT_SQL, pooled connection', pooled))
+        try:
+            for (label, cast), (eid, cid) in zip(runs, elections):
+                began = time.perf_counter()
+                outcomes = {cast(user_id, eid, cid, voted_at) for user_id in range(1, ballots + 1)}
+                elapsed = time.perf_counter() - began
+                if outcomes != {'ok'}:
+                    raise click.ClickException(f'{label}: unexpected outcomes {sorted(outcomes)}')
+                click.echo(f'{label}: {ballots / elapsed:.0f} votes/s')
+        finally:
+            db.close()
+
+
 @app.route("/vote", methods=["POST"])
 @login_required(role="voter")
 def vote():
@@ -877,111 +2108,682 @@ def vote():
         candidate_id = int(request.form.get("candidate_id","0"))
     except ValueError:
         flash("Invalid vote submission.", "error"); return redirect(url_for("voter_panel"))
-    e = query("SELECT * FROM elections WHERE id=?", (election_id,), one=True)
-    if not e: flash("No election is scheduled right now.", "warn"); return redirect(url_for("voter_panel"))
-    
-    # Check if election is paused or cancelled
-    if e.get("status") == "paused":
-        flash("This election is currently paused. Please wait for the admin to resume voting.", "warn"); return redirect(url_for("voter_panel"))
-    if e.get("status") == "cancelled":
-        flash("This election has been cancelled.", "warn"); return redirect(url_for("voter_panel"))
-    
-    now = now_utc(); s = parse_iso(e["start_time"]); t = parse_iso(e["end_time"])
-    if not s or not t or not (s <= now <= t):
-        flash("This election is not active.", "warn"); return redirect(url_for("voter_panel"))
-    # Use database transaction to prevent race condition
-    db = get_db()
     try:
-        # Check for existing vote within transaction
-        if query("SELECT 1 FROM votes WHERE user_id=? AND election_id=?", (session["user_id"], election_id), one=True):
-            flash("You have already voted in this election.", "warn"); return redirect(url_for("voter_panel"))
-        c = query("SELECT * FROM candidates WHERE id=? AND election_id=?", (candidate_id, election_id), one=True)
-        if not c: flash("Invalid candidate selection.", "error"); return redirect(url_for("voter_panel"))
-        
-        # Insert vote with unique constraint protection
-        try:
-            execute("INSERT INTO votes (user_id,candidate_id,election_id,voted_at) VALUES (?,?,?,?)",
-                    (session["user_id"], candidate_id, election_id, now.isoformat()))
-        except Exception as e:
-            # Catch unique constraint violation (double vote attempt)
-            if "UNIQUE constraint failed" in str(e) or "duplicate" in str(e).lower():
-                flash("You have already voted in this election.", "warn"); return redirect(url_for("voter_panel"))
-            print(f"❌ Vote INSERT error: {str(e)}")
-            raise e
+        outcome = cast_vote(session["user_id"], election_id, candidate_id, now_utc())
     except Exception as e:
         print(f"❌ Vote recording error: {str(e)}")
         print(f"❌ Error type: {type(e).__name__}")
-        db.rollback()
         flash("Error recording vote. Please try again.", "error"); return redirect(url_for("voter_panel"))
+    if outcome != 'ok':
+        flash(*VOTE_REJECTIONS[outcome]); return redirect(url_for("voter_panel"))
+    live_results.publish(election_id)
     flash("Vote recorded. Thank you!", "ok"); return redirect(url_for("voter_panel"))
 
+def election_state(e, now=None):
+    """'cancelled', 'paused', 'scheduled', 'ongoing' or 'ended' for an elections row."""
+    if e['status'] == 'cancelled':
+        return 'cancelled'
+    now = now_ts() if now is None else now
+    if e['start_ts'] is None or e['end_ts'] is None or e['end_ts'] <= now:
+        return 'ended'
+    if now < e['start_ts']:
+        return 'scheduled'
+    return 'paused' if e['status'] == 'paused' else 'ongoing'
+
+
+LIVE_STATUS_SQL = '''
+    SELECT e.id, e.status, e.start_ts, e.end_ts, COALESCE(t.version, 0) AS version
+    FROM elections e
+    LEFT JOIN election_totals t ON t.election_id = e.id
+    WHERE e.id = ?
+'''
+
+
+def election_live_status(election_id, is_admin=True):
+    """Vote version, state and results ETag of one election, or None if it does not exist.
+    Non-admins get an ETag that ignores the vote version since they are only shown the state."""
+    e = query(LIVE_STATUS_SQL, (election_id,), one=True)
+    if not e:
+        return None
+    state = election_state(e)
+    etag = f"{election_id}-{e['version']}-{state}" if is_admin else f"{election_id}-{state}"
+    return {'version': e['version'], 'state': state, 'etag': etag}
+
+
+@app.route('/api/elections/<int:election_id>/results')
+@login_required()
+def api_election_results(election_id):
+    """Live tallies as JSON for the polling results pages. Answers 304 while the ETag still
+    matches, i.e. until a vote is cast or the election changes state."""
+    is_admin = session.get('role') == 'admin'
+    snap = election_snapshot(election_id)
+    if snap:
+        etag = snap['etag'] if is_admin else f"{election_id}-{snap['state']}"
+        if etag_matches(etag):
+            resp = app.response_class(status=304)
+        elif is_admin:
+            resp = app.response_class(snap['results_json'], mimetype='application/json')
+        else:
+            resp = jsonify({'election_id': election_id, 'state': snap['state']})
+        resp.vary.add('Cookie')
+        return frozen(resp, etag)
+    live = election_live_status(election_id, is_admin)
+    if not live:
+        return jsonify({'success': False, 'message': 'Election not found'}), 404
+    if etag_matches(live['etag']):
+        resp = app.response_class(status=304)
+    elif is_admin:
+        resp = jsonify(results_payload(election_id, live['state'], live['version'], election_tallies(election_id)))
+    else:
+        resp = jsonify({'election_id': election_id, 'state': live['state']})
+    resp.set_etag(live['etag'])
+    resp.headers['Cache-Control'] = 'private, no-cache'
+    resp.vary.add('Cookie')
+    return resp
+
+
+# per worker; each stream pins one of the worker's --threads for up to SSE_STREAM_LIFETIME
+SSE_MAX_STREAMS = int(os.environ.get('SSE_MAX_STREAMS', 1))
+SSE_MAX_RATE = float(os.environ.get('SSE_MAX_RATE', 2))        # updates per second per stream
+SSE_POLL_INTERVAL = 5       # seconds; re-check the DB for writes made by other workers
+SSE_HEARTBEAT = 15
+SSE_STREAM_LIFETIME = 300   # close after this long and let EventSource reconnect, freeing the thread
+
+
+class LiveResultsHub:
+    """Wakes the SSE streams of this worker when an election's votes or status change, and
+    reads each election's status and tallies once for all of its streams.
+
+    Streams hold no DB connection between pushes: read() checks one out of the pool and
+    hands it straight back. A read is shared by every stream of the election until
+    publish() reports a change or `min_interval` seconds pass (for writes made in other
+    workers, which are only seen by polling)."""
+
+    def __init__(self, max_streams, min_interval=1.0):
+        self.max_streams = max_streams
+        self.min_interval = min_interval
+        self._cond = threading.Condition()
+        self._changes = {}
+        self._streams = 0
+        self._read_lock = threading.Lock()
+        self._reads = {}
+
+    def publish(self, election_id):
+        with self._cond:
+            self._changes[election_id] = self._changes.get(election_id, 0) + 1
+            self._cond.notify_all()
+
+    def changes(self, election_id):
+        with self._cond:
+            return self._changes.get(election_id, 0)
+
+    def wait(self, election_id, seen, timeout):
+        """Block until election_id has changed since `seen` or timeout passes; return the new counter."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._changes.get(election_id, 0) != seen, timeout)
+            return self._changes.get(election_id, 0)
+
+    def read(self, election_id):
+        """{'state', 'version', 'counts'} of an election, or None once it no longer exists."""
+        changes = self.changes(election_id)
+        with self._read_lock:
+            hit = self._reads.get(election_id)
+            if hit and hit[0] == changes and time.monotonic() - hit[1] < self.min_interval:
+                return hit[2]
+            conn = db_pool.acquire()
+            try:
+                e = conn.execute(LIVE_STATUS_SQL, (election_id,)).fetchone()
+                data = e and {'state': election_state(e), 'version': e['version'],
+                              'counts': {r['id']: r['votes'] for r in conn.execute(ELECTION_TALLIES_SQL, (election_id,))}}
+            finally:
+                db_pool.release(conn)
+            self._reads[election_id] = (changes, time.monotonic(), data)
+            return data
+
+    def open_stream(self):
+        with self._cond:
+            if self._streams >= self.max_streams:
+                return False
+            self._streams += 1
+            return True
+
+    def close_stream(self):
+        with self._cond:
+            self._streams -= 1
+            idle = not self._streams
+        if idle:
+            with self._read_lock:
+                self._reads.clear()
+
+
+live_results = LiveResultsHub(SSE_MAX_STREAMS)
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.route('/admin/election/<int:election_id>/stream')
+@login_required(role="admin")
+def election_stream(election_id):
+    """Server-Sent Events feed of one election: a snapshot on connect, then `tally` events with
+    the candidates whose counts moved and `status` events when the election changes state.
+    Bursts are coalesced to at most SSE_MAX_RATE events per second."""
+    live = election_live_status(election_id)
+    if not live:
+        return jsonify({'success': False, 'message': 'Election not found'}), 404
+    if not live_results.open_stream():
+        return Response('Too many live streams, poll /api/elections/<id>/results instead\n', status=503,
+                        headers={'Retry-After': str(SSE_STREAM_LIFETIME)}, mimetype='text/plain')
+
+    # not stream_with_context: the request's pooled connection goes back when this view returns
+    def generate():
+        try:
+            seen = live_results.changes(election_id)
+            sent = live_results.read(election_id)
+            if not sent:
+                return
+            counts = sent['counts']
+            yield f"retry: {SSE_POLL_INTERVAL * 1000}\n"
+            yield sse_event('snapshot', {'state': sent['state'], 'version': sent['version'],
+                                         'total_votes': sum(counts.values()), 'candidates': counts})
+            last_write = time.monotonic()
+            deadline = last_write + SSE_STREAM_LIFETIME
+            while time.monotonic() < deadline:
+                seen = live_results.wait(election_id, seen, SSE_POLL_INTERVAL)
+                # coalesce: let further votes in the same burst land before reading
+                pause = last_write + 1 / SSE_MAX_RATE - time.monotonic()
+                if pause > 0:
+                    time.sleep(pause)
+                cur = live_results.read(election_id)
+                if not cur:
+                    yield sse_event('status', {'state': 'deleted'})
+                    return
+                out = []
+                if cur['state'] != sent['state']:
+                    out.append(sse_event('status', {'state': cur['state']}))
+                if cur['version'] != sent['version']:
+                    fresh = cur['counts']
+                    changes = [{'id': cid, 'votes': v, 'delta': v - counts.get(cid, 0)}
+                               for cid, v in fresh.items() if v != counts.get(cid)]
+                    counts = fresh
+                    out.append(sse_event('tally', {'version': cur['version'], 'total_votes': sum(fresh.values()),
+                                                   'changes': changes}))
+                sent = cur
+                if out:
+                    yield ''.join(out)
+                    last_write = time.monotonic()
+                elif time.monotonic() - last_write >= SSE_HEARTBEAT:
+                    yield ': keepalive\n\n'
+                    last_write = time.monotonic()
+        finally:
+            live_results.close_stream()
+
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
 @app.route("/results")
 @login_required(role="admin")
 def results():
-    election_id = request.args.get("election_id")
-    e = query("SELECT * FROM elections WHERE id=?", (election_id,), one=True) if election_id else current_active_election()
+    election_id = request.args.get("election_id", type=int)
+    e = election_catalog.lookup(election_id) if election_id else current_active_election()
     if not e: flash("No election selected/active.", "warn"); return redirect(url_for("admin"))
-    rows = query("""
-        SELECT c.name, COUNT(v.id) as votes
-        FROM candidates c
-        LEFT JOIN votes v ON v.candidate_id=c.id AND v.election_id=?
-        WHERE c.election_id=?
-        GROUP BY c.id
-        ORDER BY votes DESC, c.name ASC
-    """, (e["id"], e["id"]))
+    snap = election_snapshot(e["id"])
+    rows = snap['tallies'] if snap else election_tallies(e["id"])
     results = [{"name": r["name"], "votes": r["votes"]} for r in rows]
     total_votes = sum(result["votes"] for result in results)
     winner = results[0] if results and results[0]["votes"] > 0 else None
-    return render_template("result.html", election=e, results=results, total_votes=total_votes, winner=winner, elections=query("SELECT * FROM elections WHERE status != 'cancelled' OR status IS NULL ORDER BY start_time DESC"))
+    live_etag = snap['etag'] if snap else election_live_status(e["id"])["etag"]
+    return render_template("result.html", election=e, results=results, total_votes=total_votes, winner=winner, live_etag=live_etag,
+                           turnout=snap['turnout'] if snap else None)
+
+
+# ----------- Frozen results -----------
+# Ballots still being committed (e.g. by the vote batcher) get this long after end_ts to land
+RESULTS_FINALIZE_GRACE = 30
+# browsers reuse a snapshot response this long, then revalidate it with its ETag
+RESULTS_MAX_AGE = int(os.environ.get('RESULTS_MAX_AGE', 300))
+FINALIZE_BATCH = 20
+
+FINAL_TALLY_SQL = """
+    SELECT c.id, c.name, c.category, c.photo, COUNT(v.id) AS votes
+    FROM candidates c
+    LEFT JOIN votes v ON v.candidate_id = c.id AND v.election_id = c.election_id
+    WHERE c.election_id = ?
+    GROUP BY c.id
+    ORDER BY votes DESC, c.name ASC
+"""
+
+
+def election_closed(e, now=None):
+    """True once an election's tallies can no longer change."""
+    if e['status'] == 'cancelled':
+        return True
+    now = now_ts() if now is None else now
+    return e['end_ts'] is None or e['end_ts'] <= now - RESULTS_FINALIZE_GRACE
+
+
+def results_payload(election_id, state, version, rows):
+    """The admin body of /api/elections/<id>/results."""
+    total = sum(r['votes'] for r in rows)
+    candidates = [{'id': r['id'], 'name': r['name'], 'category': r['category'], 'votes': r['votes'],
+                   'percentage': round(r['votes'] * 100 / total, 1) if total else 0} for r in rows]
+    return {'election_id': election_id, 'state': state, 'version': version, 'total_votes': total,
+            'candidates': candidates, 'winner': candidates[0] if candidates and candidates[0]['votes'] > 0 else None}
+
+
+def results_sheet(e, rows):
+    return ([["Election", e["title"] or e["category"]],
+             ["Start", e["start_time"], "End", e["end_time"]],
+             [], ["Candidate", "Votes"]]
+            + [[r["name"], r["votes"]] for r in rows])
+
+
+def finalize_election(db, e):
+    """Recount a closed election from votes and store its results, with their XLSX and JSON
+    renderings, in election_results, replacing any snapshot taken at an older vote version.
+    Caller commits.
+
+    eligible_voters counts the accounts with the voter role that were registered by the
+    close. Roles are not historised, so voters deleted or promoted since then are missing."""
+    rows = [dict(r) for r in db.execute(FINAL_TALLY_SQL, (e['id'],))]
+    version = db.execute('SELECT COALESCE(MAX(version), 0) FROM election_totals WHERE election_id=?',
+                         (e['id'],)).fetchone()[0]
+    voters = db.execute('SELECT COUNT(DISTINCT user_id) FROM votes WHERE election_id=?', (e['id'],)).fetchone()[0]
+    closed_at = min(e['end_ts'] or now_ts(), now_ts())
+    eligible = db.execute("SELECT COUNT(*) FROM users WHERE role='voter' "
+                          "AND (created_at IS NULL OR created_at <= datetime(?, 'unixepoch'))", (closed_at,)).fetchone()[0]
+    state = election_state(e)
+    out = BytesIO()
+    write_xlsx([("Results", results_sheet(e, rows))], out)
+    db.execute("""
+        INSERT OR REPLACE INTO election_results (election_id, state, version, total_votes, voters, eligible_voters,
+                                                tallies, results_json, results_xlsx, finalized_at)
+        VALUES (?,?,?,?,?,?,?,?,?,?)
+    """, (e['id'], state, version, sum(r['votes'] for r in rows), voters, eligible, json.dumps(rows),
+          json.dumps(results_payload(e['id'], state, version, rows)), out.getvalue(),
+          datetime.now(timezone.utc).isoformat()))
+
+
+def finalize_closed_elections(conn, limit=None):
+    """Finalize closed elections that have no current snapshot yet, committing each; returns how many."""
+    sql = ("SELECT e.* FROM elections e LEFT JOIN election_totals t ON t.election_id = e.id "
+           "WHERE (e.status = 'cancelled' OR e.end_ts <= :cutoff) AND NOT EXISTS (SELECT 1 FROM election_results r "
+           "WHERE r.election_id = e.id AND r.version = COALESCE(t.version, 0)) ORDER BY e.end_ts")
+    if limit:
+        sql += f' LIMIT {int(limit)}'
+    done = 0
+    for e in conn.execute(sql, {'cutoff': now_ts() - RESULTS_FINALIZE_GRACE}).fetchall():
+        try:
+            finalize_election(conn, e)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        done += 1
+    return done
+
+
+@app.cli.command('finalize-elections')
+def finalize_elections_command():
+    """Freeze the results of every closed election that has no current snapshot yet."""
+    click.echo(f'✅ Finalized {finalize_closed_elections(get_db())} elections')
+
+
+# The snapshot with the election and vote version it must still match, read fresh per request
+SNAPSHOT_SQL = """
+    SELECT r.*, e.status, e.start_ts, e.end_ts, COALESCE(t.version, 0) AS live_version
+    FROM election_results r
+    JOIN elections e ON e.id = r.election_id
+    LEFT JOIN election_totals t ON t.election_id = r.election_id
+    WHERE r.election_id = ?
+"""
+
+
+def election_snapshot(election_id):
+    """Frozen results of a closed election, or None while it is open, not yet finalized (the
+    outbox thread and `flask finalize-elections` do that) or changed since it was frozen.
+    Callers fall back to the live tallies."""
+    row = query(SNAPSHOT_SQL, (election_id,), one=True)
+    if not row or not election_closed(row) or row['version'] != row['live_version'] or row['state'] != election_state(row):
+        return None
+    snap = dict(row)
+    snap['tallies'] = json.loads(row['tallies'])
+    snap['turnout'] = round(row['voters'] * 100 / row['eligible_voters'], 1) if row['eligible_voters'] else 0
+    # the ETag election_live_status gives a finished election, so pages opened before the close stop reloading
+    snap['etag'] = f"{election_id}-{row['version']}-{row['state']}"
+    return snap
+
+
+def frozen(resp, etag):
+    """Let the browser reuse a response built from a results snapshot for RESULTS_MAX_AGE,
+    then revalidate it: a snapshot is replaced if ballots or the election change later."""
+    resp.set_etag(etag)
+    resp.headers['Cache-Control'] = f'private, max-age={RESULTS_MAX_AGE}, must-revalidate'
+    return resp
+
+
+def frozen_not_modified(etag):
+    """The 304 for a snapshot download the client already holds, or None. Checked before the
+    file is built: send_file and streamed exports never see an ETag set afterwards."""
+    if etag_matches(etag):
+        return frozen(app.response_class(status=304), etag)
+    return None
+
 
 
+# ----------- Exports -----------
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+# finished workbooks are kept in memory up to this size, then spill to a temp file
+EXPORT_SPOOL_SIZE = int(os.environ.get('EXPORT_SPOOL_SIZE', 1024 * 1024))
+EXPORT_FLUSH_SIZE = 64 * 1024
+EXPORT_FORMATS = ('xlsx', 'csv', 'ndjson')
+
+
+def attachment(filename):
+    return {'Content-Disposition': f'attachment; filename={filename}'}
+
+
+def xlsx_response(sheets, filename):
+    """Send a write-only workbook built from (title, rows) pairs.
+
+    Rows may be DB cursors: write-only sheets stream each row to a temp file as
+    it is appended, and the zipped workbook goes to a spooled temp file, so
+    memory does not grow with the number of rows.
+    """
+    out = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_SIZE)
+    write_xlsx(sheets, out)
+    out.seek(0)
+    return send_file(out, as_attachment=True, download_name=filename, mimetype=XLSX_MIMETYPE)
+
+
+def write_xlsx(sheets, out):
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    for title, rows in sheets:
+        ws = wb.create_sheet(title=title)
+        for row in rows:
+            ws.append(list(row))
+    wb.save(out)
+
+
+def csv_response(header, rows, filename):
+    """Stream rows as CSV, flushing every EXPORT_FLUSH_SIZE characters."""
+    def generate():
+        buf = StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(header)
+        for row in rows:
+            writer.writerow(row)
+            if buf.tell() >= EXPORT_FLUSH_SIZE:
+                yield buf.getvalue()
+                buf.seek(0); buf.truncate()
+        yield buf.getvalue()
+    return Response(stream_with_context(generate()), mimetype='text/csv', headers=attachment(filename))
+
+
+def ndjson_response(header, rows, filename):
+    """Stream rows as one JSON object per line, keyed by header."""
+    keys = [re.sub(r'\W+', '_', h.lower()).strip('_') for h in header]
+
+    def generate():
+        lines = []
+        for row in rows:
+            lines.append(json.dumps(dict(zip(keys, row)), default=str))
+            if len(lines) >= 500:
+                yield '\n'.join(lines) + '\n'
+                lines = []
+        if lines:
+            yield '\n'.join(lines) + '\n'
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson', headers=attachment(filename))
+
+
+def export_response(fmt, name, header, rows, title='Export'):
+    """Send one table as name.xlsx, name.csv or name.ndjson."""
+    if fmt == 'xlsx':
+        return xlsx_response([(title, chain([header], rows))], f'{name}.xlsx')
+    if fmt == 'csv':
+        return csv_response(header, rows, f'{name}.csv')
+    return ndjson_response(header, rows, f'{name}.ndjson')
+
+
+ELECTION_EXPORT_HEADER = ['ID', 'Title', 'Category', 'Start (UTC)', 'End (UTC)', 'Candidate Limit']
+ELECTION_EXPORT_STATES = (('Ongoing', 'ongoing'), ('Scheduled', 'scheduled'), ('Ended', 'ended'))
+
+
+def election_export_rows(state, now):
+    return get_db().execute(
+        f"SELECT id, title, category, start_time, end_time, candidate_limit FROM {ELECTION_STATE_SQL[state]} "
+        "ORDER BY start_ts DESC", {'now': now})
+
 
 @app.route('/export.xlsx')
 def export_excel():
     if session.get('user_id') is None or session.get('role') != 'admin':
         return redirect(url_for('login'))
+    now = now_ts()
+    return xlsx_response([(title, chain([ELECTION_EXPORT_HEADER], election_export_rows(state, now)))
+                          for title, state in ELECTION_EXPORT_STATES], 'elections.xlsx')
+
+
+@app.route('/export.<any(csv, ndjson):fmt>')
+@login_required(role="admin")
+def export_elections(fmt):
+    """Every election as one table, with its state as the first column."""
+    now = now_ts()
+    rows = ((title,) + tuple(r) for title, state in ELECTION_EXPORT_STATES for r in election_export_rows(state, now))
+    return export_response(fmt, 'elections', ['State'] + ELECTION_EXPORT_HEADER, rows)
+
+
+@app.route('/admin/election/<int:eid>/results.<any(csv, ndjson):fmt>')
+@login_required(role="admin")
+def results_export(eid, fmt):
+    e = query("SELECT * FROM elections WHERE id=?", (eid,), one=True)
+    if not e:
+        flash("Election not found", "error"); return redirect(url_for("admin"))
+    snap = election_snapshot(eid)
+    not_modified = snap and frozen_not_modified(f"{snap['etag']}-{fmt}")
+    if not_modified:
+        return not_modified
+    tallies = snap['tallies'] if snap else election_tallies(eid)
+    rows = ((r['id'], r['name'], r['category'], r['votes']) for r in tallies)
+    resp = export_response(fmt, f'results_{eid}', ['Candidate ID', 'Candidate', 'Category', 'Votes'], rows)
+    return frozen(resp, f"{snap['etag']}-{fmt}") if snap else resp
+
+
+VOTE_AUDIT_HEADER = ['Vote ID', 'Voted At', 'Voter ID', 'Username', 'Candidate ID', 'Candidate']
+
+
+@app.route('/admin/election/<int:eid>/votes.<any(xlsx, csv, ndjson):fmt>')
+@login_required(role="admin")
+def votes_export(eid, fmt):
+    """Audit export of every ballot in an election, streamed from the votes table."""
+    if not query("SELECT 1 FROM elections WHERE id=?", (eid,), one=True):
+        flash("Election not found", "error"); return redirect(url_for("admin"))
+    rows = get_db().execute(
+        "SELECT v.id, v.voted_at, v.user_id, u.username, v.candidate_id, c.name FROM votes v "
+        "LEFT JOIN users u ON u.id = v.user_id LEFT JOIN candidates c ON c.id = v.candidate_id "
+        "WHERE v.election_id=? ORDER BY v.id", (eid,))
+    return export_response(fmt, f'votes_{eid}', VOTE_AUDIT_HEADER, rows, title='Votes')
+
+
+# ----------- Bulk voter import -----------
+VOTER_IMPORT_FIELDS = ('name', 'username', 'email', 'password', 'id_number')
+VOTER_IMPORT_REQUIRED = {'name', 'username', 'password', 'id_number'}
+VOTER_IMPORT_CHUNK = int(os.environ.get('VOTER_IMPORT_CHUNK', 1000))
+VOTER_IMPORT_MAX_ERRORS = 200
+# a username/email registered by /signup mid-import is skipped rather than failing the chunk
+VOTER_INSERT_SQL = ("INSERT INTO users (name,email,username,password,role,id_number) "
+                    "VALUES (?,?,?,?,'voter',?) ON CONFLICT DO NOTHING")
+
+
+def read_voter_rows(stream, filename):
+    """Iterate (line, row) pairs from a CSV or XLSX file without loading it whole.
+
+    The first row is the header; columns other than VOTER_IMPORT_FIELDS are ignored.
+    """
+    ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if ext == 'csv':
+        return _voter_rows(csv.reader(TextIOWrapper(stream, encoding='utf-8-sig', newline='')))
+    if ext == 'xlsx':
+        return _xlsx_voter_rows(stream)
+    raise ValueError('Upload a .csv or .xlsx file.')
+
+
+def _xlsx_voter_rows(stream):
+    # opened here rather than in the generator, so an unreadable file is a ValueError
+    # before the route starts streaming its 200 response
+    from openpyxl import load_workbook
+    from openpyxl.utils.exceptions import InvalidFileException
+    try:
+        wb = load_workbook(stream, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException, KeyError) as exc:
+        raise ValueError('The file is not a readable .xlsx workbook.') from exc
+
     try:
-        rows = exec_sql("SELECT * FROM elections ORDER BY start_time DESC", fetch=True)
+        rows = _voter_rows(wb.active.iter_rows(values_only=True))
     except Exception:
-        pass
-        rows = query("SELECT * FROM elections ORDER BY start_time DESC")
-    now = datetime.now(timezone.utc)
-    ongoing, scheduled, ended = [], [], []
-    for e in rows:
-        # Parse datetime strings if they are strings
+        wb.close()
+        raise
+
+    def closing_rows():
         try:
-            if isinstance(e['start_time'], str):
-                st = datetime.fromisoformat(e['start_time'].replace('Z', '+00:00'))
-            else:
-                st = e['start_time']
-            
-            if isinstance(e['end_time'], str):
-                en = datetime.fromisoformat(e['end_time'].replace('Z', '+00:00'))
-            else:
-                en = e['end_time']
-            
-            # Ensure timezone awareness
-            if st.tzinfo is None:
-                st = st.replace(tzinfo=timezone.utc)
-            if en.tzinfo is None:
-                en = en.replace(tzinfo=timezone.utc)
-            
-            if st <= now <= en: ongoing.append(e)
-            elif now < st: scheduled.append(e)
-            else: ended.append(e)
-        except (ValueError, TypeError):
-            # If datetime parsing fails, skip this election
-            ended.append(e)
-    wb = Workbook()
-    for name, data in (('Ongoing', ongoing), ('Scheduled', scheduled), ('Ended', ended)):
-        ws = wb.create_sheet(title=name)
-        ws.append(['ID','Title','Category','Start (UTC)','End (UTC)','Candidate Limit'])
-        for ee in data:
-            ws.append([ee['id'], ee['title'], ee['category'], ee['start_time'], ee['end_time'], ee['candidate_limit']])
-    if 'Sheet' in wb.sheetnames: del wb['Sheet']
-    bio = BytesIO(); wb.save(bio); bio.seek(0)
-    return send_file(bio, as_attachment=True, download_name='elections.xlsx',
-                     mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+            yield from rows
+        finally:
+            wb.close()
+    return closing_rows()
+
+
+def _voter_rows(rows):
+    """Check the header row now and return an iterator over the data rows."""
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None:
+        return iter(())
+    columns = [str(h or '').strip().lower().replace(' ', '_') for h in header]
+    missing = VOTER_IMPORT_REQUIRED - set(columns)
+    if missing:
+        raise ValueError('Missing column(s): ' + ', '.join(sorted(missing)))
+
+    def data_rows():
+        for line, values in enumerate(rows, start=2):
+            row = {c: ('' if v is None else str(v).strip()) for c, v in zip(columns, values) if c in VOTER_IMPORT_FIELDS}
+            if any(row.values()):
+                yield line, row
+    return data_rows()
+
+
+def clean_voter_row(row):
+    """Normalise an import row the way signup() does; returns (values, error)."""
+    values = {
+        'name': row.get('name', ''),
+        'username': row.get('username', '').lower(),
+        'email': row.get('email', '').lower() or None,
+        'password': row.get('password', ''),
+        'id_number': row.get('id_number', ''),
+    }
+    if not values['name'] or not values['username'] or not values['password'] or not values['id_number']:
+        return values, 'All fields except email are required.'
+    return values, password_problem(values['password'])
+
+
+def import_voters(rows, chunk_size=VOTER_IMPORT_CHUNK):
+    """Create voter accounts from (line, row) pairs, yielding the running report after each chunk.
+
+    Duplicates are checked against usernames/emails preloaded from users (plus
+    those accepted earlier in the file). A chunk's passwords are hashed in the
+    process pool while the next chunk is read, and each chunk is inserted with
+    one executemany and commit, so memory stays flat regardless of file size.
+    """
+    db = get_db()
+    usernames, emails = set(), set()
+    for username, email in db.execute('SELECT lower(username), lower(email) FROM users'):
+        usernames.add(username)
+        if email:
+            emails.add(email)
+    report = {'rows': 0, 'created': 0, 'rejected': 0, 'errors': [], 'error': None, 'done': False}
+
+    def reject(line, message):
+        report['rejected'] += 1
+        if len(report['errors']) < VOTER_IMPORT_MAX_ERRORS:
+            report['errors'].append({'line': line, 'error': message})
+
+    def insert(batch, hashes):
+        before = db.total_changes
+        db.executemany(VOTER_INSERT_SQL, [(v['name'], v['email'], v['username'], h, v['id_number'])
+                                          for (_, v), h in zip(batch, hashes)])
+        db.commit()
+        report['created'] += db.total_changes - before
+        report['rejected'] += len(batch) - (db.total_changes - before)
+
+    batch, in_flight = [], None
+    try:
+        for line, row in rows:
+            report['rows'] += 1
+            values, error = clean_voter_row(row)
+            if not error and values['username'] in usernames:
+                error = 'Username already taken.'
+            if not error and values['email'] and values['email'] in emails:
+                error = 'Email already registered.'
+            if error:
+                reject(line, error)
+                continue
+            usernames.add(values['username'])
+            if values['email']:
+                emails.add(values['email'])
+            batch.append((line, values))
+            if len(batch) >= chunk_size:
+                if in_flight:
+                    insert(*in_flight)
+                    yield report
+                in_flight = (batch, password_hasher.hash_many(v['password'] for _, v in batch))
+                batch = []
+    except (ValueError, csv.Error, zipfile.BadZipFile) as exc:
+        report['error'] = str(exc)
+    if in_flight:
+        insert(*in_flight)
+    if batch:
+        insert(batch, password_hasher.hash_many(v['password'] for _, v in batch))
+    report['done'] = True
+    yield report
+
+
+@app.route('/admin/voters/import', methods=['POST'])
+@login_required(role="admin")
+def admin_import_voters():
+    """Stream an NDJSON progress report while importing the uploaded voters file."""
+    f = request.files.get('voters_file')
+    if not f or not f.filename:
+        return jsonify(error='Choose a CSV or XLSX file to import.'), 400
+    try:
+        rows = read_voter_rows(f.stream, f.filename)
+    except ValueError as exc:
+        return jsonify(error=str(exc)), 400
+
+    def generate():
+        for report in import_voters(rows):
+            yield json.dumps(report) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+@app.cli.command('import-voters')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+def import_voters_command(path):
+    """Create voter accounts from a CSV or XLSX file."""
+    with open(path, 'rb') as fh:
+        try:
+            rows = read_voter_rows(fh, path)
+        except ValueError as exc:
+            raise click.BadParameter(str(exc), param_hint='PATH')
+        for report in import_voters(rows):
+            click.echo(f"{report['rows']} rows read, {report['created']} created, {report['rejected']} rejected")
+    for e in report['errors']:
+        click.echo(f"line {e['line']}: {e['error']}")
+    if report['error']:
+        click.echo(f"⚠️ Import stopped early: {report['error']}", err=True)
+        raise SystemExit(1)
 
 
 @app.route('/admin/voters')
@@ -1007,18 +2809,14 @@ def election_dashboard(election_id):
         flash("Election not found.", "error")
         return redirect(url_for("admin"))
     
-    # Get candidates with vote counts
-    cand = query("""
-        SELECT c.id, c.name, c.category, c.photo, COUNT(v.id) as votes
-        FROM candidates c
-        LEFT JOIN votes v ON v.candidate_id = c.id
-        WHERE c.election_id = ?
-        GROUP BY c.id, c.name, c.category, c.photo
-        ORDER BY votes DESC, c.name ASC
-    """, (election_id,))
+    # Candidates with vote counts, from the frozen snapshot once the election has closed
+    snap = election_snapshot(election_id)
+    cand = snap['tallies'] if snap else election_tallies(election_id)
     
     total = sum([c['votes'] if c['votes'] else 0 for c in cand]) if cand else 0
-    return render_template('election_dashboard.html', e=e, cand=cand, total=total)
+    live_etag = snap['etag'] if snap else election_live_status(election_id)['etag']
+    return render_template('election_dashboard.html', e=e, cand=cand, total=total, live_etag=live_etag,
+                           turnout=snap['turnout'] if snap else None)
 
 
 @app.route('/admin/cancel_election/<int:election_id>', methods=['POST'])
@@ -1034,6 +2832,9 @@ def cancel_election(election_id):
         # Check if election is already ended
         if election['status'] == 'cancelled':
             return jsonify({'success': False, 'message': 'Election is already cancelled'}), 400
+        # its results may already be frozen
+        if election['end_ts'] is not None and election['end_ts'] <= now_ts():
+            return jsonify({'success': False, 'message': 'Election has already ended'}), 400
             
         # Update election status to cancelled and set end time to now
         current_time = datetime.now(timezone.utc)
@@ -1041,15 +2842,18 @@ def cancel_election(election_id):
         exec_sql('''UPDATE elections 
                    SET status = 'cancelled', 
                        end_time = ?,
+                       end_ts = ?,
                        cancelled_at = ?,
                        cancelled_by = ?
                    WHERE id = ?''', 
-                (current_time, current_time, session.get('user_id'), election_id))
+                (current_time, to_epoch(current_time), current_time, session.get('user_id'), election_id))
         
         # Log the cancellation for audit trail
         election_title = election['title'] if election['title'] else (election['category'] if election['category'] else f'Election {election_id}')
         admin_name = session.get('user', {}).get('name', 'Unknown Admin')
         
+        page_cache.clear()
+        live_results.publish(election_id)
         print(f"ELECTION CANCELLED: {election_title} (ID: {election_id}) by Admin: {admin_name} at {current_time}")
         
         return jsonify({
@@ -1092,6 +2896,8 @@ def pause_election(election_id):
         election_title = election['title'] if election['title'] else (election['category'] if election['category'] else f'Election {election_id}')
         admin_name = session.get('user', {}).get('name', 'Unknown Admin')
         
+        page_cache.clear()
+        live_results.publish(election_id)
         print(f"ELECTION PAUSED: {election_title} (ID: {election_id}) by Admin: {admin_name} at {current_time}")
         
         return jsonify({
@@ -1134,6 +2940,8 @@ def resume_election(election_id):
         election_title = election['title'] if election['title'] else (election['category'] if election['category'] else f'Election {election_id}')
         admin_name = session.get('user', {}).get('name', 'Unknown Admin')
         
+        page_cache.clear()
+        live_results.publish(election_id)
         print(f"ELECTION RESUMED: {election_title} (ID: {election_id}) by Admin: {admin_name} at {current_time}")
         
         return jsonify({
@@ -1188,8 +2996,9 @@ def schedule():
                     return render_template('schedule.html', error="Invalid candidate limit")
             
             # Insert election without year column (not in schema)
-            execute('INSERT INTO elections(title,category,start_time,end_time,candidate_limit,created_by) VALUES (?,?,?,?,?,?)', 
-                   (title, category, st.isoformat(), en.isoformat(), limit, session.get('user_id')))
+            execute('INSERT INTO elections(title,category,start_time,end_time,start_ts,end_ts,candidate_limit,created_by) VALUES (?,?,?,?,?,?,?,?)', 
+                   (title, category, st.isoformat(), en.isoformat(), to_epoch(st), to_epoch(en), limit, session.get('user_id')))
+            page_cache.clear()
             
             flash(f"Election '{title}' scheduled successfully from {st.strftime('%Y-%m-%d %H:%M')} to {en.strftime('%Y-%m-%d %H:%M')} IST", "success")
             return redirect(url_for('admin'))
@@ -1222,8 +3031,8 @@ def istfmt(value):
         return value
 
 
-def classify_elections(rows):
-    now = now_utc()
+def classify_elections(rows, now=None):
+    now = now_ts() if now is None else now
     ongoing, scheduled, ended = [], [], []
     for e in rows:
         # Skip cancelled elections - they should not appear in ongoing or scheduled
@@ -1233,61 +3042,301 @@ def classify_elections(rows):
             ended.append(e)  # Cancelled elections go to "ended" section
             continue
             
-        s = parse_iso(e["start_time"]); t = parse_iso(e["end_time"])
-        if s and t:
-            if s <= now <= t: ongoing.append(e)
+        s = e["start_ts"]; t = e["end_ts"]
+        if s is not None and t is not None:
+            if s <= now < t: ongoing.append(e)
             elif now < s: scheduled.append(e)
             else: ended.append(e)
     return ongoing, scheduled, ended
 
 
+NOT_CANCELLED = "(status IS NULL OR status != 'cancelled')"
+
+# FROM/WHERE clauses matching the buckets of classify_elections. Ongoing is pinned to the
+# end_ts index so it only visits unfinished elections rather than every one that has started.
+ELECTION_STATE_SQL = {
+    'ongoing': f"elections INDEXED BY idx_elections_end_ts WHERE end_ts > :now AND start_ts <= :now AND {NOT_CANCELLED}",
+    'scheduled': f"elections WHERE start_ts > :now AND {NOT_CANCELLED}",
+    'ended': "elections WHERE (end_ts <= :now OR status = 'cancelled')",
+}
+
+# states a listing can be filtered on; 'ended' still includes cancelled elections
+ELECTION_LISTING_SQL = dict(ELECTION_STATE_SQL,
+                            cancelled="elections WHERE status = 'cancelled'",
+                            all="elections WHERE 1")
+# the names the listing UI shows for its states, accepted as ?state= too
+ELECTION_STATE_ALIASES = {'active': 'ongoing', 'completed': 'ended'}
+
+
+PAST_ELECTIONS_PAGE = int(os.environ.get('PAST_ELECTIONS_PAGE', 20))
+ELECTION_LIST_PAGE = int(os.environ.get('ELECTION_LIST_PAGE', 24))
+ELECTION_LIST_MAX = 100
+
+# per-election counts from the stored totals; the candidate count is an index lookup
+ELECTION_COUNTS_SQL = ("COALESCE((SELECT votes FROM election_totals t WHERE t.election_id = elections.id), 0) AS vote_count, "
+                       "(SELECT COUNT(*) FROM candidates c WHERE c.election_id = elections.id) AS candidate_count")
+
+
+def parse_election_filters(args):
+    """Category and date-range (IST days) filters for election listings.
+
+    Returns (filters, clauses, params): the cleaned values to echo back into the
+    form, plus SQL conditions on elections and their named parameters.
+    """
+    filters = {'category': (args.get('category') or '').strip(), 'date_from': '', 'date_to': ''}
+    clauses, params = [], {}
+    if filters['category']:
+        clauses.append('category = :category')
+        params['category'] = filters['category']
+    for key, op, shift in (('date_from', '>=', 0), ('date_to', '<', 86400)):
+        value = (args.get(key) or '').strip()
+        try:
+            day = IST.localize(datetime.strptime(value, '%Y-%m-%d'))
+        except ValueError:
+            continue
+        filters[key] = value
+        clauses.append(f'start_ts {op} :{key}')
+        params[key] = to_epoch(day) + shift
+    return filters, clauses, params
+
+
+# keyset pages walk (start_ts, id); a NULL start_ts would give an unparseable cursor
+DATED = 'start_ts IS NOT NULL'
+
+
+def parse_keyset(value):
+    """A 'start_ts:id' page cursor from the query string, or None."""
+    try:
+        start_ts, election_id = value.split(':')
+        return int(start_ts), int(election_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def keyset_token(row):
+    return f"{row['start_ts']}:{row['id']}"
+
+
+def election_page(state, clauses, params, cursor=None, limit=PAST_ELECTIONS_PAGE, now=None):
+    """Elections in one ELECTION_LISTING_SQL state, newest start first, with candidate and vote counts.
+
+    One query per page, keyed on (start_ts, id). Returns (rows, next_cursor). Elections
+    without a start_ts (unparseable start_time) have no place in that order and are left out.
+    """
+    sql = (f"SELECT *, {ELECTION_COUNTS_SQL} FROM {ELECTION_LISTING_SQL[state]} AND {DATED}"
+           + ''.join(f' AND {c}' for c in clauses))
+    args = dict(params, now=now_ts() if now is None else now, limit=limit + 1)
+    if cursor:
+        sql += ' AND (start_ts, id) < (:before_ts, :before_id)'
+        args.update(before_ts=cursor[0], before_id=cursor[1])
+    rows = query(sql + ' ORDER BY start_ts DESC, id DESC LIMIT :limit', args)
+    if len(rows) > limit:
+        return rows[:limit], keyset_token(rows[limit - 1])
+    return rows, None
+
+
+def past_elections_summary(clauses, params):
+    """Totals over every ended election matching the filters, not just the current page."""
+    return query(
+        "SELECT COUNT(*) AS total, COALESCE(SUM(status = 'cancelled'), 0) AS cancelled, "
+        "COALESCE(SUM((SELECT votes FROM election_totals t WHERE t.election_id = elections.id)), 0) AS votes "
+        f"FROM {ELECTION_STATE_SQL['ended']} AND {DATED}" + ''.join(f' AND {c}' for c in clauses),
+        dict(params, now=now_ts()), one=True)
+
+
+class ElectionSnapshot:
+    """The ongoing and scheduled elections (newest start first), plus the counts and
+    categories the listings show. Ended elections are paged from the DB instead, so the
+    snapshot does not grow with the election history."""
+
+    def __init__(self, ongoing, scheduled, total, cancelled, categories, version):
+        self.ongoing = ongoing
+        self.scheduled = scheduled
+        self.by_id = {e['id']: e for e in ongoing + scheduled}
+        self.counts = {'ongoing': len(ongoing), 'scheduled': len(scheduled),
+                       'ended': total - len(ongoing) - len(scheduled), 'cancelled': cancelled, 'total': total}
+        self.categories = categories
+        self.version = version
+        # the buckets stay correct until the next election starts or ends
+        boundaries = [e['end_ts'] for e in ongoing] + [e['start_ts'] for e in scheduled]
+        self.next_boundary = min(boundaries) if boundaries else None
+
+
+class ElectionCatalog:
+    """In-process cache of the ongoing and scheduled elections.
+
+    Loaded with the indexed ELECTION_STATE_SQL range queries and reused until the next
+    start/end boundary or until the elections row of cache_versions changes. Triggers bump
+    that row on every write to elections, so an edit made through any gunicorn worker (or
+    by hand) is seen by all of them on their next request."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+    def get(self):
+        now = now_ts()
+        version = query("SELECT version FROM cache_versions WHERE name = 'elections'", one=True)['version']
+        with self._lock:
+            snap = self._snapshot
+            if snap is None or snap.version != version or (snap.next_boundary is not None and now >= snap.next_boundary):
+                snap = self._snapshot = self._load(now, version)
+            return snap
+
+    def _load(self, now, version):
+        ongoing, scheduled = (
+            [catalog_entry(r) for r in query(f"SELECT * FROM {ELECTION_STATE_SQL[state]} ORDER BY start_ts DESC, id DESC",
+                                             {'now': now})]
+            for state in ('ongoing', 'scheduled'))
+        counts = query("SELECT COUNT(*) AS total, COALESCE(SUM(status = 'cancelled'), 0) AS cancelled FROM elections",
+                       one=True)
+        categories = [r['category'] for r in query(
+            "SELECT DISTINCT category FROM elections WHERE category IS NOT NULL AND category != '' ORDER BY category")]
+        return ElectionSnapshot(ongoing, scheduled, counts['total'], counts['cancelled'], categories, version)
+
+    def lookup(self, election_id):
+        """One election by id: from the snapshot when it is ongoing or scheduled, else from the DB."""
+        e = self.get().by_id.get(election_id)
+        if e is None:
+            row = query("SELECT * FROM elections WHERE id=?", (election_id,), one=True)
+            e = catalog_entry(row) if row else None
+        return e
+
+
+def recent_ended(limit, clauses=()):
+    """The `limit` ended elections that started last, as catalog entries."""
+    rows, _ = election_page('ended', list(clauses), {}, limit=limit)
+    return [catalog_entry(r) for r in rows]
+
+
+def catalog_entry(row):
+    e = dict(row)
+    e['start_dt'] = parse_iso(e['start_time'])
+    e['end_dt'] = parse_iso(e['end_time'])
+    e['start_ist'] = istfmt(e['start_time'])
+    e['end_ist'] = istfmt(e['end_time'])
+    return e
+
+
+election_catalog = ElectionCatalog()
+
+
+def listing_state(args):
+    """The ELECTION_LISTING_SQL state named by ?state=, or '' for every election."""
+    state = (args.get('state') or '').strip().lower()
+    state = ELECTION_STATE_ALIASES.get(state, state)
+    return state if state in ELECTION_LISTING_SQL and state != 'all' else ''
+
+
+def election_listing(args, limit=ELECTION_LIST_PAGE):
+    """One page of the election listing for the request args.
+
+    Returns (filters, elections, next_cursor); each election carries its state and counts.
+    """
+    filters, clauses, params = parse_election_filters(args)
+    filters['state'] = listing_state(args)
+    now = now_ts()
+    rows, next_before = election_page(filters['state'] or 'all', clauses, params,
+                                      parse_keyset(args.get('before')), limit, now)
+    elections = []
+    for r in rows:
+        e = catalog_entry(r)
+        e['state'] = election_state(e, now)
+        elections.append(e)
+    return filters, elections, next_before
+
+
 @app.route("/results_excel/<int:eid>")
 @login_required(role="admin")
 def results_excel(eid):
-    import io
-    from openpyxl import Workbook
     e = query("SELECT * FROM elections WHERE id=?", (eid,), one=True)
     if not e:
         flash("Election not found", "error"); return redirect(url_for("admin"))
-    rows = query("""
-        SELECT c.name, COUNT(v.id) as votes
-        FROM candidates c
-        LEFT JOIN votes v ON v.candidate_id=c.id AND v.election_id=?
-        WHERE c.election_id=?
-        GROUP BY c.id
-        ORDER BY votes DESC, c.name ASC
-    """, (eid, eid))
-    wb = Workbook()
-    ws = wb.active; ws.title = "Results"
-    ws.append(["Election", e["title"] or e["category"]])
-    ws.append(["Start", e["start_time"], "End", e["end_time"]])
-    ws.append([]); ws.append(["Candidate", "Votes"])
-    for r in rows: ws.append([r["name"], r["votes"]])
-    stream = io.BytesIO(); wb.save(stream); stream.seek(0)
-    return (stream.read(), 200, {
-        "Content-Type": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        "Content-Disposition": f"attachment; filename=results_{eid}.xlsx",
-    })
+    snap = election_snapshot(eid)
+    if snap:
+        not_modified = frozen_not_modified(f"{snap['etag']}-xlsx")
+        if not_modified:
+            return not_modified
+        resp = send_file(BytesIO(snap['results_xlsx']), as_attachment=True, download_name=f"results_{eid}.xlsx",
+                         mimetype=XLSX_MIMETYPE)
+        return frozen(resp, f"{snap['etag']}-xlsx")
+    return xlsx_response([("Results", results_sheet(e, election_tallies(eid)))], f"results_{eid}.xlsx")
+
+
+CANDIDATE_CACHE_TTL = int(os.environ.get('CANDIDATE_CACHE_TTL', 60))
+
+
+class CandidateCache:
+    """Per-process cache of each election's candidate list.
+
+    Misses are loaded together in one query. add_candidate and approvals
+    invalidate the elections they touch; the ttl bounds how long a candidate
+    added through another gunicorn worker can go unseen.
+    """
+
+    def __init__(self, ttl=60, max_entries=1000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, election_ids):
+        """{election_id: [candidate rows]} for every id asked for."""
+        now = time.monotonic()
+        found, missing = {}, []
+        for eid in election_ids:
+            hit = self._entries.get(eid)
+            if hit and hit[0] > now:
+                found[eid] = hit[1]
+            else:
+                missing.append(eid)
+        if missing:
+            loaded = {eid: [] for eid in missing}
+            for c in query('SELECT * FROM candidates WHERE election_id IN (SELECT value FROM json_each(?)) '
+                           'ORDER BY election_id, id', (json.dumps(missing),)):
+                loaded[c['election_id']].append(c)
+            with self._lock:
+                if len(self._entries) + len(loaded) > self.max_entries:
+                    self._entries = {k: v for k, v in self._entries.items() if v[0] > now}
+                for eid, rows in loaded.items():
+                    self._entries[eid] = (now + self.ttl, rows)
+            found.update(loaded)
+        return found
+
+    def invalidate(self, election_ids):
+        with self._lock:
+            for eid in election_ids:
+                self._entries.pop(eid, None)
+
+
+candidate_cache = CandidateCache(CANDIDATE_CACHE_TTL)
 
 
 @app.route("/voter")
 @login_required(role="voter")
 def voter_panel():
-    rows = query("SELECT * FROM elections WHERE status != 'cancelled' OR status IS NULL ORDER BY start_time ASC")
-    ongoing, scheduled, ended = classify_elections(rows)
-
-    cand_map = {}
-    for e in ongoing:
-        cand_map[e["id"]] = query(
-            "SELECT * FROM candidates WHERE election_id=?", (e["id"],)
-        )
+    catalog = election_catalog.get()
+    ongoing = catalog.ongoing[::-1]
+    scheduled = catalog.scheduled[::-1]
+    ended = recent_ended(8, [NOT_CANCELLED])
+    ended_count = catalog.counts['ended'] - catalog.counts['cancelled']
+
+    ongoing_ids = [e["id"] for e in ongoing]
+    cand_map = candidate_cache.get_many(ongoing_ids)
+    voted = set()
+    if ongoing_ids:
+        voted = {r["election_id"] for r in query(
+            "SELECT election_id FROM votes WHERE user_id=? AND election_id IN (SELECT value FROM json_each(?))",
+            (session["user_id"], json.dumps(ongoing_ids)))}
 
     return render_template(
         "voter.html",
         ongoing=ongoing,
         scheduled=scheduled,
         ended=ended,
+        ended_count=ended_count,
         cand_map=cand_map,
+        voted=voted,
     )
 
 
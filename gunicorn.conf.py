@@ -0,0 +1,25 @@
+# Gunicorn reads this file from the working directory; the Procfile / render.yaml
+# command line still sets bind, workers, threads and timeout.
+import os
+
+import migrations
+from passwords import password_hasher_from_env
+
+
+def on_starting(server):
+    """Apply schema migrations once, in the master, before any worker is forked.
+
+    Only migrations.py is needed for this, not the app: importing app.py here would
+    hand its SQLite connections and background pools to every forked worker.
+    """
+    # the workers inherit this; each sizes its password hashing pool to its share of the CPUs
+    os.environ['WEB_CONCURRENCY'] = str(server.cfg.workers)
+    if os.environ.get('DATABASE_URL'):
+        return      # PostgreSQL is migrated by db_pg (RUN_MIGRATE)
+    conn = migrations.connect()
+    try:
+        applied = migrations.migrate(conn, password_hasher_from_env().hash_inline)
+    finally:
+        conn.close()
+    if applied:
+        server.log.info('Database migrated to version %d: %s', len(migrations.MIGRATIONS), ', '.join(applied))
@@ -0,0 +1,500 @@
+"""Versioned SQLite schema for the voting app.
+
+Kept apart from app.py so the schema can be brought up to date with nothing but a
+database connection: by `flask migrate`, by the gunicorn on_starting hook before any
+worker is forked, or by tests.
+
+Each step in MIGRATIONS runs once, in order, and is recorded in schema_version.
+Databases created before versioning start at version 0 and run every step, so all of
+them are written to be no-ops on a schema that already has their changes. Append new
+steps at the end; never edit or reorder ones that have shipped.
+"""
+import os
+import sqlite3
+from datetime import datetime, timezone
+
+DB_PATH = os.environ.get('SQLITE_PATH', 'voting.db')
+DEFAULT_ADMIN = ('Administrator', 'admin', 'admin123')
+
+
+def iso_epoch(s):
+    """UTC epoch seconds for a stored start_time/end_time; naive values are UTC (as app.parse_iso)."""
+    try:
+        dt = datetime.fromisoformat((s or "").replace("Z", ""))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+def table_exists(db, name):
+    return db.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (name,)).fetchone() is not None
+
+
+def add_column(db, table, column, decl):
+    """ALTER TABLE ... ADD COLUMN unless the column is already there."""
+    if column not in {r[1] for r in db.execute(f'PRAGMA table_info({table})')}:
+        db.execute(f'ALTER TABLE {table} ADD COLUMN {column} {decl}')
+
+
+def migrate_core_tables(db):
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            email TEXT UNIQUE,
+            username TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            role TEXT NOT NULL DEFAULT 'voter',
+            id_number TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS elections (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT,
+            category TEXT,
+            start_time TEXT NOT NULL,
+            end_time TEXT NOT NULL,
+            created_by INTEGER,
+            candidate_limit INTEGER DEFAULT 10,
+            status TEXT DEFAULT 'active',
+            cancelled_at TEXT,
+            cancelled_by INTEGER,
+            paused_at TEXT,
+            paused_by INTEGER,
+            resumed_at TEXT,
+            resumed_by INTEGER,
+            start_ts INTEGER,
+            end_ts INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (created_by) REFERENCES users (id)
+        )
+    ''')
+    # pause/resume columns, for elections tables created before they existed
+    add_column(db, 'elections', 'paused_at', 'TEXT')
+    add_column(db, 'elections', 'paused_by', 'INTEGER')
+    add_column(db, 'elections', 'resumed_at', 'TEXT')
+    add_column(db, 'elections', 'resumed_by', 'INTEGER')
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS candidates (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            election_id INTEGER NOT NULL,
+            category TEXT DEFAULT 'General',
+            photo TEXT,
+            user_id INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (election_id) REFERENCES elections (id),
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS votes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            candidate_id INTEGER NOT NULL,
+            election_id INTEGER NOT NULL,
+            voted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id),
+            FOREIGN KEY (candidate_id) REFERENCES candidates (id),
+            FOREIGN KEY (election_id) REFERENCES elections (id),
+            UNIQUE(user_id, election_id)
+        )
+    ''')
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS candidate_applications (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            election_id INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            category TEXT DEFAULT 'General',
+            photo TEXT,
+            status TEXT DEFAULT 'pending',
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            reviewed_at TIMESTAMP,
+            reviewed_by INTEGER,
+            FOREIGN KEY (user_id) REFERENCES users (id),
+            FOREIGN KEY (election_id) REFERENCES elections (id),
+            FOREIGN KEY (reviewed_by) REFERENCES users (id)
+        )
+    ''')
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS notifications (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            message TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            read INTEGER DEFAULT 0,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+
+
+def migrate_election_timestamps(db):
+    """UTC epoch copies of start_time/end_time so state lookups are indexed range queries."""
+    add_column(db, 'elections', 'start_ts', 'INTEGER')
+    add_column(db, 'elections', 'end_ts', 'INTEGER')
+    missing = db.execute('SELECT id, start_time, end_time FROM elections WHERE start_ts IS NULL OR end_ts IS NULL').fetchall()
+    if missing:
+        db.executemany('UPDATE elections SET start_ts=?, end_ts=? WHERE id=?',
+                       [(iso_epoch(r['start_time']), iso_epoch(r['end_time']), r['id']) for r in missing])
+
+
+def migrate_vote_counters(db):
+    """Materialized per-candidate vote counts, plus a per-election vote total and a version
+    bumped on every ballot or new candidate (results ETag), kept in step by triggers."""
+    rebuild = not table_exists(db, 'candidate_tallies') or not table_exists(db, 'election_totals')
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS candidate_tallies (
+            candidate_id INTEGER PRIMARY KEY,
+            election_id INTEGER NOT NULL,
+            votes INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY (candidate_id) REFERENCES candidates (id),
+            FOREIGN KEY (election_id) REFERENCES elections (id)
+        )
+    ''')
+    db.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_votes_tally_insert AFTER INSERT ON votes
+        BEGIN
+            INSERT INTO candidate_tallies (candidate_id, election_id, votes)
+            VALUES (NEW.candidate_id, NEW.election_id, 1)
+            ON CONFLICT(candidate_id) DO UPDATE SET votes = votes + 1;
+        END
+    ''')
+    db.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_votes_tally_delete AFTER DELETE ON votes
+        BEGIN
+            UPDATE candidate_tallies SET votes = votes - 1 WHERE candidate_id = OLD.candidate_id;
+        END
+    ''')
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS election_totals (
+            election_id INTEGER PRIMARY KEY,
+            votes INTEGER NOT NULL DEFAULT 0,
+            version INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY (election_id) REFERENCES elections (id)
+        )
+    ''')
+    db.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_votes_totals_insert AFTER INSERT ON votes
+        BEGIN
+            INSERT INTO election_totals (election_id, votes, version)
+            VALUES (NEW.election_id, 1, 1)
+            ON CONFLICT(election_id) DO UPDATE SET votes = votes + 1, version = version + 1;
+        END
+    ''')
+    db.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_votes_totals_delete AFTER DELETE ON votes
+        BEGIN
+            UPDATE election_totals SET votes = votes - 1, version = version + 1 WHERE election_id = OLD.election_id;
+        END
+    ''')
+    db.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_candidates_totals_insert AFTER INSERT ON candidates
+        BEGIN
+            INSERT OR IGNORE INTO candidate_tallies (candidate_id, election_id, votes) VALUES (NEW.id, NEW.election_id, 0);
+            INSERT INTO election_totals (election_id, votes, version)
+            VALUES (NEW.election_id, 0, 1)
+            ON CONFLICT(election_id) DO UPDATE SET version = version + 1;
+        END
+    ''')
+    if rebuild:
+        rebuild_tallies(db)
+
+
+def migrate_notification_counts(db):
+    """Unread notifications per user, kept in step with notifications by triggers."""
+    rebuild = not table_exists(db, 'notification_counts')
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS notification_counts (
+            user_id INTEGER PRIMARY KEY,
+            unread INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+    db.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_notifications_unread_insert AFTER INSERT ON notifications
+        WHEN NEW.read = 0
+        BEGIN
+            INSERT INTO notification_counts (user_id, unread) VALUES (NEW.user_id, 1)
+            ON CONFLICT(user_id) DO UPDATE SET unread = unread + 1;
+        END
+    ''')
+    db.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_notifications_unread_update AFTER UPDATE OF read ON notifications
+        WHEN (OLD.read = 0) != (NEW.read = 0)
+        BEGIN
+            INSERT INTO notification_counts (user_id, unread) VALUES (NEW.user_id, CASE WHEN NEW.read = 0 THEN 1 ELSE -1 END)
+            ON CONFLICT(user_id) DO UPDATE SET unread = unread + excluded.unread;
+        END
+    ''')
+    db.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_notifications_unread_delete AFTER DELETE ON notifications
+        WHEN OLD.read = 0
+        BEGIN
+            UPDATE notification_counts SET unread = unread - 1 WHERE user_id = OLD.user_id;
+        END
+    ''')
+    if rebuild:
+        rebuild_notification_counts(db)
+
+
+def migrate_profile_version(db):
+    """Bumped whenever something shown on a user's profile changes; ProfileCache entries
+    are only reused while it is unchanged."""
+    add_column(db, 'users', 'profile_version', 'INTEGER NOT NULL DEFAULT 0')
+    for trigger, event, table, user_ref in (
+        ('trg_votes_profile', 'INSERT', 'votes', 'NEW.user_id'),
+        ('trg_applications_profile_insert', 'INSERT', 'candidate_applications', 'NEW.user_id'),
+        ('trg_applications_profile_update', 'UPDATE OF status', 'candidate_applications', 'NEW.user_id'),
+        ('trg_candidates_profile', 'INSERT', 'candidates', 'NEW.user_id'),
+        ('trg_users_profile', 'UPDATE OF name, email, id_number, role', 'users', 'NEW.id'),
+    ):
+        db.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {trigger} AFTER {event} ON {table}
+            BEGIN
+                UPDATE users SET profile_version = profile_version + 1 WHERE id = {user_ref};
+            END
+        ''')
+
+
+def migrate_rate_limits_and_outbox(db):
+    # Shared rate limiter buckets (RATE_LIMIT_BACKEND=sqlite)
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS rate_limits (
+            key TEXT PRIMARY KEY,
+            window_start INTEGER NOT NULL,
+            window_seconds INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            prev_count INTEGER NOT NULL
+        )
+    ''')
+    # Outgoing mail, delivered by the OutboxDispatcher thread
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS email_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            to_addr TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            body TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at INTEGER NOT NULL,
+            last_error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            sent_at TEXT
+        )
+    ''')
+
+
+def migrate_election_results(db):
+    """Results of closed elections, frozen once by finalize_election."""
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS election_results (
+            election_id INTEGER PRIMARY KEY,
+            state TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            total_votes INTEGER NOT NULL,
+            voters INTEGER NOT NULL,
+            eligible_voters INTEGER NOT NULL,
+            tallies TEXT NOT NULL,
+            results_json TEXT NOT NULL,
+            results_xlsx BLOB NOT NULL,
+            finalized_at TEXT NOT NULL,
+            FOREIGN KEY (election_id) REFERENCES elections (id)
+        )
+    ''')
+
+
+def migrate_indexes(db):
+    """Performance indexes for common queries."""
+    db.execute('CREATE INDEX IF NOT EXISTS idx_elections_status ON elections(status)')
+    db.execute('CREATE INDEX IF NOT EXISTS idx_elections_start_time ON elections(start_time)')
+    db.execute('CREATE INDEX IF NOT EXISTS idx_elections_start_ts ON elections(start_ts)')
+    db.execute('CREATE INDEX IF NOT EXISTS idx_elections_end_ts ON elections(end_ts, start_ts)')
+    db.execute('CREATE INDEX IF NOT EXISTS idx_elections_category_start ON elections(category, start_ts)')
+    db.execute('CREATE INDEX IF NOT EXISTS idx_elections_status_start ON elections(status, start_ts)')
+    db.execute('CREATE INDEX IF NOT EXISTS idx_candidates_election ON candidates(election_id)')
+    db.execute('CREATE INDEX IF NOT EXISTS idx_votes_election ON votes(election_id)')
+    db.execute('CREATE INDEX IF NOT EXISTS idx_votes_user_election ON votes(user_id, election_id)')
+    db.execute('CREATE INDEX IF NOT EXISTS idx_applications_election ON candidate_applications(election_id)')
+    db.execute('CREATE INDEX IF NOT EXISTS idx_applications_status ON candidate_applications(status)')
+    db.execute('CREATE INDEX IF NOT EXISTS idx_applications_user ON candidate_applications(user_id)')
+    db.execute('CREATE INDEX IF NOT EXISTS idx_candidates_user ON candidates(user_id)')
+    db.execute('CREATE INDEX IF NOT EXISTS idx_notifications_user ON notifications(user_id)')
+    db.execute('CREATE INDEX IF NOT EXISTS idx_notifications_unread ON notifications(user_id, id) WHERE read = 0')
+    db.execute('CREATE INDEX IF NOT EXISTS idx_tallies_election ON candidate_tallies(election_id)')
+    db.execute('CREATE INDEX IF NOT EXISTS idx_outbox_due ON email_outbox(status, next_attempt_at)')
+
+
+def migrate_unique_votes(db):
+    """One ballot per user and election. votes tables created with UNIQUE(user_id, election_id)
+    already enforce this; older ones get a unique index, after dropping all but the first
+    ballot of any voter who voted twice (the tally triggers take those votes back off)."""
+    for index in db.execute('PRAGMA index_list(votes)').fetchall():
+        if index[2] and [c[2] for c in db.execute(f'PRAGMA index_info("{index[1]}")')] == ['user_id', 'election_id']:
+            return
+    removed = db.execute('''
+        DELETE FROM votes WHERE id NOT IN (SELECT MIN(id) FROM votes GROUP BY user_id, election_id)
+    ''').rowcount
+    if removed:
+        print(f"⚠️ Removed {removed} duplicate vote(s) before adding the one-ballot-per-election index")
+    db.execute('CREATE UNIQUE INDEX idx_votes_unique ON votes(user_id, election_id)')
+
+
+def migrate_vote_counter_updates(db):
+    """Keep the vote counters right when a ballot is moved to another candidate or a
+    candidate is deleted, not only on INSERT/DELETE of votes. A deleted candidate's
+    ballots stay in votes and in election_totals, as rebuild_tallies counts them."""
+    db.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_votes_counters_update AFTER UPDATE OF candidate_id, election_id ON votes
+        WHEN OLD.candidate_id != NEW.candidate_id OR OLD.election_id != NEW.election_id
+        BEGIN
+            UPDATE candidate_tallies SET votes = votes - 1 WHERE candidate_id = OLD.candidate_id;
+            INSERT INTO candidate_tallies (candidate_id, election_id, votes)
+            VALUES (NEW.candidate_id, NEW.election_id, 1)
+            ON CONFLICT(candidate_id) DO UPDATE SET votes = votes + 1;
+            UPDATE election_totals SET votes = votes - 1, version = version + 1 WHERE election_id = OLD.election_id;
+            INSERT INTO election_totals (election_id, votes, version)
+            VALUES (NEW.election_id, 1, 1)
+            ON CONFLICT(election_id) DO UPDATE SET votes = votes + 1, version = version + 1;
+        END
+    ''')
+    db.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_candidates_counters_delete AFTER DELETE ON candidates
+        BEGIN
+            DELETE FROM candidate_tallies WHERE candidate_id = OLD.id;
+            UPDATE election_totals SET version = version + 1 WHERE election_id = OLD.election_id;
+        END
+    ''')
+    # counters that drifted before these triggers existed
+    rebuild_tallies(db)
+
+
+def migrate_cache_versions(db):
+    """Version counters for data that workers cache in process. Triggers bump the
+    'elections' row on every write to elections, so each worker's ElectionCatalog can
+    tell its snapshot is stale with one primary-key read."""
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS cache_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    db.execute("INSERT OR IGNORE INTO cache_versions (name, version) VALUES ('elections', 0)")
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        db.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_elections_version_{event.lower()} AFTER {event} ON elections
+            BEGIN
+                UPDATE cache_versions SET version = version + 1 WHERE name = 'elections';
+            END
+        ''')
+
+
+def migrate_drop_vote_profile_trigger(db):
+    """Ballots no longer bump users.profile_version: that put a users UPDATE in every vote
+    transaction. The profile page keys its cached vote stats on the user's ballot count and
+    latest ballot id instead, read from the votes(user_id, election_id) index."""
+    db.execute('DROP TRIGGER IF EXISTS trg_votes_profile')
+
+
+def rebuild_notification_counts(db):
+    """Recompute notification_counts from the notifications table. Caller commits."""
+    db.execute('DELETE FROM notification_counts')
+    db.execute('''
+        INSERT INTO notification_counts (user_id, unread)
+        SELECT user_id, COUNT(*) FROM notifications WHERE read = 0 GROUP BY user_id
+    ''')
+
+
+def rebuild_tallies(db):
+    """Recompute candidate_tallies and election_totals from the votes table. Caller commits."""
+    db.execute('DELETE FROM candidate_tallies')
+    db.execute('''
+        INSERT INTO candidate_tallies (candidate_id, election_id, votes)
+        SELECT c.id, c.election_id, COUNT(v.id)
+        FROM candidates c
+        LEFT JOIN votes v ON v.candidate_id = c.id
+        GROUP BY c.id
+    ''')
+    # versions only ever move forward so cached ETags cannot match a rebuilt total
+    db.execute('''
+        INSERT INTO election_totals (election_id, votes, version)
+        SELECT e.id, (SELECT COUNT(*) FROM votes v WHERE v.election_id = e.id), 1
+        FROM elections e
+        WHERE true
+        ON CONFLICT(election_id) DO UPDATE SET votes = excluded.votes, version = version + 1
+    ''')
+
+
+MIGRATIONS = (
+    migrate_core_tables,
+    migrate_election_timestamps,
+    migrate_vote_counters,
+    migrate_notification_counts,
+    migrate_profile_version,
+    migrate_rate_limits_and_outbox,
+    migrate_election_results,
+    migrate_indexes,
+    migrate_unique_votes,
+    migrate_vote_counter_updates,
+    migrate_cache_versions,
+    migrate_drop_vote_profile_trigger,
+)
+
+
+def schema_version(db):
+    """Number of MIGRATIONS applied to the database; 0 before versioning."""
+    if not table_exists(db, 'schema_version'):
+        return 0
+    return db.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version').fetchone()[0]
+
+
+def seed_default_admin(db, hash_password):
+    """Create the default admin account in a database that has no users yet."""
+    if db.execute('SELECT 1 FROM users LIMIT 1').fetchone():
+        return False
+    name, username, password = DEFAULT_ADMIN
+    db.execute('INSERT INTO users (name, username, password, role) VALUES (?, ?, ?, ?)',
+               (name, username, hash_password(password), 'admin'))
+    return True
+
+
+def migrate(db, hash_password):
+    """Apply pending MIGRATIONS in one transaction and return the names of those run.
+
+    ``hash_password`` hashes the default admin's password when the database has no
+    users yet; pass the app's PasswordHasher.hash so it gets the configured KDF.
+    BEGIN IMMEDIATE takes the write lock before the version is read, so a second
+    process migrating at the same time waits and then finds nothing left to do.
+    """
+    db.execute('BEGIN IMMEDIATE')
+    try:
+        db.execute('''
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        current = schema_version(db)
+        applied = []
+        for version, step in enumerate(MIGRATIONS[current:], current + 1):
+            step(db)
+            db.execute('INSERT INTO schema_version (version, name) VALUES (?, ?)', (version, step.__name__))
+            applied.append(step.__name__)
+        if seed_default_admin(db, hash_password):
+            print(f"✅ Default admin user created (username: {DEFAULT_ADMIN[1]}, password: {DEFAULT_ADMIN[2]})")
+        db.commit()
+    except BaseException:
+        db.rollback()
+        raise
+    return applied
+
+
+def connect(path=DB_PATH):
+    conn = sqlite3.connect(path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    return conn
@@ -0,0 +1,134 @@
+"""Password hashing off the request threads, shared by app.py and the gunicorn hooks."""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+HASH_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+
+class PasswordHasher:
+    """Runs werkzeug's password KDF in a process pool, off the request threads.
+
+    A request thread only waits on a future while a worker process burns the
+    CPU, so the worker's other threads keep serving. The pool starts on first
+    use. Workers come from a forkserver (spawn where that is unavailable) rather
+    than a fork of this multi-threaded process, so they inherit none of its
+    threads, locks or sqlite handles.
+
+    ``method``/``salt_length`` are passed to generate_password_hash; hashes made
+    with other parameters are upgraded by verify() on the next successful login.
+    """
+
+    def __init__(self, workers=None, method='scrypt', salt_length=16):
+        self.workers = workers or os.cpu_count() or 1
+        self.method = method
+        self.salt_length = salt_length
+        self._prefix = None
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context(HASH_START_METHOD))
+            return self._executor
+
+    def _call(self, fn, *args):
+        """Run fn in the pool, replacing the pool once if a worker has died (e.g. OOM-killed)."""
+        for attempt in range(2):
+            executor = self.executor()
+            try:
+                return executor.submit(fn, *args).result()
+            except BrokenProcessPool:
+                self._discard(executor)
+                if attempt:
+                    raise
+
+    def _map(self, fn, items, chunksize):
+        """Submit fn over items to the pool, replacing a broken pool once."""
+        for attempt in range(2):
+            executor = self.executor()
+            try:
+                return executor, executor.map(fn, items, chunksize=chunksize)
+            except BrokenProcessPool:
+                self._discard(executor)
+                if attempt:
+                    raise
+
+    def _discard(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+
+    def hash(self, password):
+        return self._call(generate_password_hash, password, self.method, self.salt_length)
+
+    def hash_inline(self, password):
+        """hash() in the calling process, for callers that must not start the pool: the
+        gunicorn master would otherwise leave its forkserver to the workers it forks."""
+        return generate_password_hash(password, self.method, self.salt_length)
+
+    def hash_many(self, passwords):
+        """Hash passwords in parallel; returns an iterator of hashes in input order.
+
+        All of them are submitted before this returns. If a worker dies, the hashes
+        not yet returned are resubmitted once to a fresh pool, as in _call().
+        """
+        passwords = list(passwords)
+        chunksize = max(1, len(passwords) // (self.workers * 4))
+        hash_one = partial(generate_password_hash, method=self.method, salt_length=self.salt_length)
+        executor, results = self._map(hash_one, passwords, chunksize)
+
+        def in_order():
+            done = 0
+            try:
+                for pwhash in results:
+                    yield pwhash
+                    done += 1
+            except BrokenProcessPool:
+                self._discard(executor)
+                yield from self._map(hash_one, passwords[done:], chunksize)[1]
+        return in_order()
+
+    def method_prefix(self):
+        """The 'method:params' part of hashes made with the current settings, e.g. 'scrypt:32768:8:1'."""
+        if self._prefix is None:
+            self._prefix = self.hash('').split('$', 1)[0]
+        return self._prefix
+
+    def verify(self, pwhash, password):
+        """Check a password; returns (ok, new_hash).
+
+        new_hash is set when the stored hash used other parameters and should be
+        replaced with one made under the current settings.
+        """
+        if not pwhash or not self._call(check_password_hash, pwhash, password):
+            return False, None
+        if pwhash.split('$', 1)[0] != self.method_prefix():
+            return True, self.hash(password)
+        return True, None
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(cancel_futures=True)
+                self._executor = None
+
+
+def default_hash_workers():
+    """This process's share of the CPUs: every gunicorn worker gets its own hashing pool,
+    so the CPU count is divided by WEB_CONCURRENCY (set by the gunicorn on_starting hook)."""
+    return max(1, (os.cpu_count() or 1) // max(1, int(os.environ.get('WEB_CONCURRENCY', 1))))
+
+
+def password_hasher_from_env():
+    """PasswordHasher configured by PASSWORD_HASH_WORKERS/_METHOD and PASSWORD_SALT_LENGTH.
+    Without PASSWORD_HASH_WORKERS the pool gets default_hash_workers() processes."""
+    return PasswordHasher(int(os.environ.get('PASSWORD_HASH_WORKERS', 0)) or default_hash_workers(),
+                          method=os.environ.get('PASSWORD_HASH_METHOD', 'scrypt'),
+                          salt_length=int(os.environ.get('PASSWORD_SALT_LENGTH', 16)))
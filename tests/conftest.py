@@ -0,0 +1,58 @@
+import os
+import tempfile
+
+import pytest
+
+# app.py reads these at import: a throwaway database, fast password hashes
+_tmp = tempfile.mkdtemp(prefix='voting-tests-')
+os.environ['SQLITE_PATH'] = os.path.join(_tmp, 'import.db')
+os.environ['SECRET_KEY'] = 'test'
+os.environ.setdefault('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:1000')
+os.environ.setdefault('PASSWORD_HASH_WORKERS', '1')
+os.environ.setdefault('JINJA_CACHE_DIR', os.path.join(_tmp, 'jinja'))
+
+import app as app_module  # noqa: E402
+import migrations  # noqa: E402
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """A freshly migrated database file."""
+    path = str(tmp_path / 'voting.db')
+    conn = migrations.connect(path)
+    migrations.migrate(conn, app_module.password_hasher.hash_inline)
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def voting(db_path, monkeypatch):
+    """The app module pointed at db_path, with empty per-process caches. The outbox
+    thread is not started; tests drive it directly."""
+    A = app_module
+    pool = A.SQLitePool(db_path, size=4)
+    monkeypatch.setattr(A, 'db_pool', pool)
+    outbox = A.OutboxDispatcher(pool)
+    monkeypatch.setattr(outbox, 'ensure_started', lambda: None)
+    monkeypatch.setattr(A, 'outbox', outbox)
+    monkeypatch.setattr(A, 'rate_limiter', A.RateLimiter())
+    monkeypatch.setattr(A, 'unread_counts', A.UnreadCounts())
+    monkeypatch.setattr(A, 'profile_cache', A.ProfileCache(A.PROFILE_CACHE_TTL))
+    monkeypatch.setattr(A, 'page_cache', A.PageCache(A.PAGE_CACHE_TTL))
+    monkeypatch.setattr(A, 'election_catalog', A.ElectionCatalog())
+    monkeypatch.setattr(A, 'candidate_cache', A.CandidateCache(A.CANDIDATE_CACHE_TTL))
+    monkeypatch.setattr(A, 'vote_batcher', None)
+    A.app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    yield A
+
+
+@pytest.fixture
+def db(voting):
+    """A pooled connection inside an app context."""
+    with voting.app.app_context():
+        yield voting.get_db()
+
+
+@pytest.fixture
+def client(voting):
+    return voting.app.test_client()
@@ -0,0 +1,51 @@
+import pytest
+
+
+@pytest.fixture
+def pending(db):
+    db.executescript('''
+        INSERT INTO users (id, name, username, password, email) VALUES (10, 'Ann', 'ann', 'x', 'ann@example.com'),
+                                                                      (11, 'Bob', 'bob', 'x', NULL);
+        INSERT INTO elections (id, title, start_time, end_time, candidate_limit) VALUES (1, 'e', 'x', 'y', 1);
+        INSERT INTO candidate_applications (id, user_id, election_id, name, applied_at) VALUES
+            (1, 10, 1, 'Ann', '2026-01-01'), (2, 11, 1, 'Bob', '2026-01-02'), (3, 12, 1, 'Gone', '2026-01-03'),
+            (4, 10, 9, 'Ann elsewhere', '2026-01-04');
+    ''')
+    db.commit()
+    return db
+
+
+def statuses(db):
+    return dict(db.execute('SELECT id, status FROM candidate_applications'))
+
+
+def test_approval_stops_at_the_candidate_limit(voting, pending):
+    assert voting.review_applications({1, 2}, 'approved', 1) == (1, 1, 0)
+    assert statuses(pending) == {1: 'approved', 2: 'pending', 3: 'pending', 4: 'pending'}
+    assert [r[0] for r in pending.execute('SELECT name FROM candidates')] == ['Ann']
+
+
+def test_orphaned_applications_are_rejected_quietly(voting, pending):
+    # 3 belongs to a deleted user, 4 to a deleted election
+    assert voting.review_applications({3, 4}, 'approved', 1) == (0, 0, 2)
+    assert statuses(pending) == {1: 'pending', 2: 'pending', 3: 'rejected', 4: 'rejected'}
+    assert pending.execute('SELECT COUNT(*) FROM candidates').fetchone()[0] == 0
+    assert pending.execute('SELECT COUNT(*) FROM notifications').fetchone()[0] == 0
+    assert pending.execute('SELECT COUNT(*) FROM email_outbox').fetchone()[0] == 0
+
+
+def test_bulk_review_reports_orphans(voting, pending, client):
+    with client.session_transaction() as sess:
+        sess.update(user_id=1, role='admin')
+    client.post('/admin/candidate_applications/bulk', data={'application_id': ['2', '3'], 'action': 'reject'})
+    with client.session_transaction() as sess:
+        messages = [m for _, m in sess['_flashes']]
+    assert messages == ['1 application(s) rejected.', voting.ORPHANED_APPLICATIONS.format(count=1)]
+    assert statuses(pending)[2] == statuses(pending)[3] == 'rejected'
+
+
+def test_orphans_are_listed_for_review(pending, client):
+    with client.session_transaction() as sess:
+        sess.update(user_id=1, role='admin')
+    page = client.get('/admin/candidate_applications').get_data(as_text=True)
+    assert 'Gone' in page and 'deleted account' in page
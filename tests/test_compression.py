@@ -0,0 +1,48 @@
+import gzip
+
+import pytest
+
+
+@pytest.fixture
+def admin(voting, db, client, monkeypatch):
+    monkeypatch.setattr(voting, 'COMPRESS_MIN_SIZE', 0)
+    db.executescript('''
+        INSERT INTO elections (id, title, start_time, end_time, start_ts, end_ts) VALUES (1, 'e', 'x', 'y', 0, 4000000000);
+        INSERT INTO candidates (id, name, election_id) VALUES (1, 'a', 1);
+    ''')
+    db.commit()
+    with client.session_transaction() as sess:
+        sess.update(user_id=1, role='admin')
+    return client
+
+
+URL = '/api/elections/1/results'
+
+
+def test_gzip_body_has_its_own_strong_etag(admin):
+    plain = admin.get(URL, headers={'Accept-Encoding': 'identity'})
+    zipped = admin.get(URL, headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in plain.headers
+    assert zipped.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(zipped.data) == plain.data
+    tag, weak = zipped.get_etag()
+    assert tag == plain.get_etag()[0] + '-gzip' and not weak
+    assert 'Accept-Encoding' in zipped.vary
+
+
+def test_both_tags_revalidate(admin):
+    plain_tag = admin.get(URL, headers={'Accept-Encoding': 'identity'}).headers['ETag']
+    gzip_tag = admin.get(URL, headers={'Accept-Encoding': 'gzip'}).headers['ETag']
+    resp = admin.get(URL, headers={'Accept-Encoding': 'gzip', 'If-None-Match': gzip_tag})
+    assert resp.status_code == 304 and resp.headers['ETag'] == gzip_tag
+    resp = admin.get(URL, headers={'Accept-Encoding': 'identity', 'If-None-Match': plain_tag})
+    assert resp.status_code == 304 and resp.headers['ETag'] == plain_tag
+
+
+def test_assets_are_fingerprinted_per_encoding(voting, client):
+    with voting.app.test_request_context():
+        url = voting.static_url('css/base.css')
+    resp = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert resp.headers['Content-Encoding'] == 'gzip'
+    assert resp.get_etag()[0].endswith('-gzip')
+    assert 'immutable' in resp.headers['Cache-Control']
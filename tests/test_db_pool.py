@@ -0,0 +1,89 @@
+import sqlite3
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def pool(voting, db_path):
+    return voting.SQLitePool(db_path, size=2, timeout=0.2)
+
+
+def test_connections_are_opened_lazily_and_reused(pool):
+    assert pool.stats()['open'] == 0
+    conn = pool.acquire()
+    pool.release(conn)
+    assert pool.acquire() is conn
+    assert pool.stats()['open'] == 1
+    assert pool.stats()['checkouts'] == 2
+
+
+def test_connections_get_the_pragmas(pool):
+    conn = pool.acquire()
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    assert conn.execute('PRAGMA synchronous').fetchone()[0] == 1   # NORMAL
+    assert isinstance(conn.execute('SELECT 1 AS x').fetchone(), sqlite3.Row)
+
+
+def test_exhausted_pool_times_out(pool):
+    held = [pool.acquire(), pool.acquire()]
+    with pytest.raises(sqlite3.OperationalError, match='pool exhausted'):
+        pool.acquire()
+    stats = pool.stats()
+    assert (stats['open'], stats['in_use'], stats['waits'], stats['timeouts']) == (2, 2, 1, 1)
+    for conn in held:
+        pool.release(conn)
+
+
+def test_waiter_gets_the_released_connection(pool):
+    held = [pool.acquire(), pool.acquire()]
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.acquire()))
+    waiter.start()
+    pool.release(held[0])
+    waiter.join(1)
+    assert got == [held[0]]
+
+
+def test_release_rolls_back_an_open_transaction(pool):
+    conn = pool.acquire()
+    conn.execute("INSERT INTO notifications (user_id, message) VALUES (1, 'uncommitted')")
+    assert conn.in_transaction
+    pool.release(conn)
+    conn = pool.acquire()
+    assert not conn.in_transaction
+    assert conn.execute('SELECT COUNT(*) FROM notifications').fetchone()[0] == 0
+
+
+def test_broken_connection_is_dropped(pool):
+    conn = pool.acquire()
+    conn.close()
+    pool.release(conn)
+    assert pool.stats()['open'] == 0
+    assert pool.acquire() is not conn
+
+
+def test_request_connection_is_returned_at_teardown(voting, client):
+    assert client.get('/').status_code == 200
+    stats = voting.db_pool.stats()
+    assert stats['in_use'] == 0
+    assert stats['checkouts'] >= 1
+
+
+def test_fresh_database_is_migrated_on_first_connect(voting, tmp_path, monkeypatch):
+    runs = []
+    migrate = voting.migrations.migrate
+    monkeypatch.setattr(voting.migrations, 'migrate', lambda *args: runs.append(1) or migrate(*args))
+    pool = voting.SQLitePool(str(tmp_path / 'fresh.db'), size=2, prepare=voting.migrate_if_behind)
+    first, second = pool.acquire(), pool.acquire()
+    assert voting.migrations.schema_version(second) == len(voting.migrations.MIGRATIONS)
+    assert second.execute('SELECT username FROM users').fetchall()[0][0] == 'admin'
+    assert runs == [1]
+    for conn in (first, second):
+        pool.release(conn)
+
+
+def test_migrated_database_is_only_checked(voting, db_path, monkeypatch):
+    monkeypatch.setattr(voting.migrations, 'migrate', lambda *args: pytest.fail('migrated twice'))
+    pool = voting.SQLitePool(db_path, size=1, prepare=voting.migrate_if_behind)
+    pool.release(pool.acquire())
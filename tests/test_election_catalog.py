@@ -0,0 +1,71 @@
+import pytest
+
+import migrations
+
+NOW = 1_800_000_000
+
+
+def add_election(conn, title, start, end, status='active', category='General'):
+    cur = conn.execute('INSERT INTO elections (title, category, start_time, end_time, start_ts, end_ts, status) '
+                       'VALUES (?, ?, ?, ?, ?, ?, ?)', (title, category, 'x', 'y', NOW + start, NOW + end, status))
+    conn.commit()
+    return cur.lastrowid
+
+
+@pytest.fixture
+def other_worker(db_path):
+    conn = migrations.connect(db_path)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def catalog(voting, db, monkeypatch):
+    monkeypatch.setattr(voting, 'now_ts', lambda: NOW)
+    return voting.election_catalog
+
+
+def test_snapshot_holds_only_the_open_window(catalog, db):
+    live = add_election(db, 'live', -60, 60, category='City')
+    soon = add_election(db, 'soon', 600, 900)
+    add_election(db, 'old', -900, -600)
+    add_election(db, 'dropped', 300, 600, status='cancelled')
+    snap = catalog.get()
+    assert [e['id'] for e in snap.ongoing] == [live]
+    assert [e['id'] for e in snap.scheduled] == [soon]
+    assert set(snap.by_id) == {live, soon}
+    assert snap.counts == {'ongoing': 1, 'scheduled': 1, 'ended': 2, 'cancelled': 1, 'total': 4}
+    assert snap.categories == ['City', 'General']
+    assert snap.next_boundary == NOW + 60
+
+
+def test_writes_from_another_worker_are_seen(catalog, db, other_worker):
+    eid = add_election(db, 'live', -60, 60)
+    first = catalog.get()
+    assert catalog.get() is first
+    other_worker.execute("UPDATE elections SET status='cancelled' WHERE id=?", (eid,))
+    other_worker.commit()
+    snap = catalog.get()
+    assert snap is not first
+    assert snap.ongoing == []
+
+
+def test_snapshot_is_reloaded_at_the_next_boundary(voting, catalog, db, monkeypatch):
+    add_election(db, 'soon', 60, 120)
+    assert catalog.get().ongoing == []
+    monkeypatch.setattr(voting, 'now_ts', lambda: NOW + 60)
+    assert [e['title'] for e in catalog.get().ongoing] == ['soon']
+
+
+def test_lookup_falls_back_to_the_database(catalog, db):
+    old = add_election(db, 'old', -900, -600)
+    assert catalog.lookup(old)['title'] == 'old'
+    assert catalog.lookup(old + 1) is None
+
+
+def test_recent_ended_elections_come_from_the_database(voting, catalog, db):
+    for i in range(10):
+        add_election(db, f'old{i}', -9000 + i, -600)
+    add_election(db, 'dropped', -100, -50, status='cancelled')
+    with voting.app.test_request_context():
+        assert [e['title'] for e in voting.recent_ended(3, [voting.NOT_CANCELLED])] == ['old9', 'old8', 'old7']
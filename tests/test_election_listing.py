@@ -0,0 +1,129 @@
+import pytest
+
+NOW = 1_800_000_000
+
+
+@pytest.fixture
+def listing(voting, db, monkeypatch):
+    monkeypatch.setattr(voting, 'now_ts', lambda: NOW)
+    db.executescript(f'''
+        INSERT INTO elections (id, title, category, start_time, end_time, start_ts, end_ts, status) VALUES
+            (1, 'e1', 'City', 'x', 'y', {NOW - 900}, {NOW - 600}, 'active'),
+            (2, 'e2', 'City', 'x', 'y', {NOW - 800}, {NOW - 600}, 'active'),
+            (3, 'e3', 'School', 'x', 'y', {NOW - 800}, {NOW - 600}, 'active'),
+            (4, 'e4', 'City', 'x', 'y', {NOW - 800}, {NOW - 600}, 'active'),
+            (5, 'e5', 'School', 'x', 'y', {NOW - 700}, {NOW - 600}, 'cancelled'),
+            (6, 'live', 'City', 'x', 'y', {NOW - 60}, {NOW + 60}, 'active'),
+            (7, 'soon', 'School', 'x', 'y', {NOW + 600}, {NOW + 900}, 'active'),
+            (8, 'undated', 'City', 'garbled', 'garbled', NULL, NULL, 'cancelled');
+        INSERT INTO candidates (id, name, election_id) VALUES (1, 'c1', 2), (2, 'c2', 2);
+        INSERT INTO votes (user_id, candidate_id, election_id) VALUES (10, 1, 2), (11, 2, 2), (12, 2, 2);
+    ''')
+
+
+def walk(client, **args):
+    """Follow `next` from the first page to the last; returns the ids of each page."""
+    pages = []
+    while True:
+        body = client.get('/api/elections', query_string=args).get_json()
+        pages.append([e['id'] for e in body['elections']])
+        if body['next'] is None:
+            return pages
+        args['before'] = body['next']
+        assert len(pages) < 10
+
+
+def test_pages_walk_ties_on_start_ts_in_id_order(listing, client):
+    assert walk(client, limit=2) == [[7, 6], [5, 4], [3, 2], [1]]
+
+
+def test_listing_json_shape(listing, client):
+    body = client.get('/api/elections?limit=2&category=City').get_json()
+    assert set(body) == {'elections', 'next', 'filters'}
+    assert body['filters'] == {'category': 'City'}
+    assert body['next'] == f'{NOW - 800}:4'
+    live, ended = body['elections']
+    assert set(live) == {'id', 'title', 'category', 'state', 'start_time', 'end_time', 'candidate_limit',
+                         'candidate_count', 'vote_count'}
+    assert (live['id'], live['state']) == (6, 'ongoing')
+    assert (ended['id'], ended['state']) == (4, 'ended')
+
+    e2 = client.get('/api/elections', query_string={'before': body['next']}).get_json()['elections'][1]
+    assert (e2['id'], e2['candidate_count'], e2['vote_count']) == (2, 2, 3)
+
+
+@pytest.mark.parametrize('before', ['abc', 'None:8', '1:2:3', ':', f'{NOW}:'])
+def test_malformed_cursor_falls_back_to_the_first_page(listing, client, before):
+    first = client.get('/api/elections?limit=2').get_json()
+    resp = client.get('/api/elections', query_string={'limit': 2, 'before': before})
+    assert resp.status_code == 200
+    assert resp.get_json() == first
+
+
+def test_undated_elections_do_not_break_paging(listing, client):
+    # a NULL start_ts used to become a 'None:<id>' cursor, which parses as no cursor at all
+    pages = walk(client, limit=1, state='cancelled')
+    assert pages == [[5]]
+    assert all(8 not in page for page in walk(client, limit=3))
+
+
+def test_past_elections_pages_with_a_bad_cursor(listing, client):
+    with client.session_transaction() as sess:
+        sess.update(user_id=1, role='admin')
+    assert client.get('/admin/past-elections?before=not-a-cursor').status_code == 200
+    resp = client.get(f'/admin/past-elections?before={NOW - 800}:3')
+    assert resp.status_code == 200
+    assert b'e1' in resp.data and b'e4' not in resp.data
+
+
+@pytest.mark.parametrize('state, pages', [
+    ('ended', [[5, 4], [3, 2], [1]]),
+    ('completed', [[5, 4], [3, 2], [1]]),
+    ('active', [[6]]),
+    ('ongoing', [[6]]),
+    ('scheduled', [[7]]),
+    ('cancelled', [[5]]),
+    ('bogus', [[7, 6], [5, 4], [3, 2], [1]]),
+])
+def test_state_filter_pages(listing, client, state, pages):
+    assert walk(client, limit=2, state=state) == pages
+
+
+def test_state_aliases_echo_the_canonical_state(listing, client):
+    assert client.get('/api/elections?state=Completed').get_json()['filters'] == {'state': 'ended'}
+    assert client.get('/api/elections?state=bogus').get_json()['filters'] == {}
+    assert b'<option value="ended" selected>' in client.get('/all_elections?state=completed').data
+
+
+def test_category_filter_pages(listing, client):
+    assert walk(client, limit=1, category='City') == [[6], [4], [2], [1]]
+    assert walk(client, limit=1, category='School', state='ended') == [[5], [3]]
+    assert walk(client, category='Nowhere') == [[]]
+
+
+def test_date_range_filter_pages(listing, client, db):
+    # NOW is 2027-01-15 13:30 IST; election 9 started three days earlier
+    db.execute("INSERT INTO elections (id, title, category, start_time, end_time, start_ts, end_ts) "
+               "VALUES (9, 'e9', 'City', 'x', 'y', ?, ?)", (NOW - 3 * 86400, NOW - 3 * 86400 + 60))
+    db.commit()
+    assert walk(client, limit=2, date_from='2027-01-15', state='ended') == [[5, 4], [3, 2], [1]]
+    assert walk(client, limit=2, date_to='2027-01-14') == [[9]]
+    assert walk(client, limit=2, date_from='2027-01-12', date_to='2027-01-12', category='City') == [[9]]
+    assert walk(client, limit=3, date_from='not-a-date') == [[7, 6, 5], [4, 3, 2], [1, 9]]
+    body = client.get('/api/elections?date_from=2027-01-15&date_to=2027-01-15&category=School').get_json()
+    assert body['filters'] == {'category': 'School', 'date_from': '2027-01-15', 'date_to': '2027-01-15'}
+
+
+@pytest.mark.parametrize('state, clause, index', [
+    ('all', 'category = :category', 'idx_elections_category_start'),
+    ('ended', 'category = :category', 'idx_elections_category_start'),
+    ('cancelled', None, 'idx_elections_status_start'),
+])
+def test_filtered_pages_read_the_composite_index(voting, db, state, clause, index):
+    sql = (f"SELECT * FROM {voting.ELECTION_LISTING_SQL[state]} AND {voting.DATED}"
+           + (f' AND {clause}' if clause else '')
+           + ' AND (start_ts, id) < (:before_ts, :before_id) ORDER BY start_ts DESC, id DESC LIMIT 5')
+    plan = ' '.join(r[3] for r in db.execute('EXPLAIN QUERY PLAN ' + sql, dict(
+        now=NOW, category='City', before_ts=NOW, before_id=1)))
+    assert f'USING INDEX {index}' in plan
+    assert 'TEMP B-TREE' not in plan
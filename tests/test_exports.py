@@ -0,0 +1,87 @@
+import csv
+import io
+import json
+
+import pytest
+from openpyxl import load_workbook
+
+BALLOTS = 30
+
+
+@pytest.fixture
+def admin(voting, db, client):
+    db.executescript('''
+        INSERT INTO elections (id, title, category, start_time, end_time, start_ts, end_ts) VALUES
+            (1, 'Mayor', 'City', '2026-01-01T00:00', '2026-01-02T00:00', 1767225600, 1767312000);
+        INSERT INTO candidates (id, name, category, election_id) VALUES (1, 'Alice', 'A', 1), (2, 'Bert', 'B', 1);
+    ''')
+    db.executemany('INSERT INTO users (id, name, username, password) VALUES (?, ?, ?, ?)',
+                   [(100 + i, f'v{i}', f'v{i}', 'x') for i in range(BALLOTS)])
+    db.executemany('INSERT INTO votes (user_id, candidate_id, election_id) VALUES (?, ?, 1)',
+                   [(100 + i, 1 + i % 3 // 2) for i in range(BALLOTS)])
+    db.commit()
+    with client.session_transaction() as sess:
+        sess.update(user_id=1, role='admin')
+    return client
+
+
+def test_votes_csv(voting, admin, monkeypatch):
+    monkeypatch.setattr(voting, 'EXPORT_FLUSH_SIZE', 256)
+    resp = admin.get('/admin/election/1/votes.csv')
+    assert resp.status_code == 200 and resp.is_streamed
+    assert resp.headers['Content-Disposition'] == 'attachment; filename=votes_1.csv'
+    chunks = list(resp.response)
+    assert len(chunks) > 1
+    rows = list(csv.reader(io.StringIO(b''.join(chunks).decode())))
+    assert rows[0] == voting.VOTE_AUDIT_HEADER
+    assert len(rows) == BALLOTS + 1
+    assert [r[3] for r in rows[1:4]] == ['v0', 'v1', 'v2']
+    assert sum(r[5] == 'Alice' for r in rows[1:]) == 20
+
+
+def test_votes_ndjson(voting, admin):
+    resp = admin.get('/admin/election/1/votes.ndjson')
+    assert resp.status_code == 200 and resp.is_streamed
+    assert resp.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+    assert len(lines) == BALLOTS
+    assert set(lines[0]) == {'vote_id', 'voted_at', 'voter_id', 'username', 'candidate_id', 'candidate'}
+    assert (lines[0]['voter_id'], lines[0]['username'], lines[0]['candidate']) == (100, 'v0', 'Alice')
+    assert sum(line['candidate_id'] == 2 for line in lines) == 10
+
+
+def test_votes_xlsx_opens(voting, admin):
+    resp = admin.get('/admin/election/1/votes.xlsx')
+    assert resp.status_code == 200 and resp.is_streamed
+    assert resp.mimetype == voting.XLSX_MIMETYPE
+    wb = load_workbook(io.BytesIO(resp.get_data()), read_only=True)
+    rows = list(wb['Votes'].values)
+    assert list(rows[0]) == voting.VOTE_AUDIT_HEADER
+    assert len(rows) == BALLOTS + 1
+    assert rows[-1][2:] == (100 + BALLOTS - 1, f'v{BALLOTS - 1}', 2, 'Bert')
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'ndjson'])
+def test_results_totals(voting, admin, fmt):
+    resp = admin.get(f'/admin/election/1/results.{fmt}')
+    assert resp.status_code == 200 and resp.is_streamed
+    body = resp.get_data(as_text=True)
+    if fmt == 'csv':
+        header, *rows = csv.reader(io.StringIO(body))
+        assert header == ['Candidate ID', 'Candidate', 'Category', 'Votes']
+        totals = {r[1]: int(r[3]) for r in rows}
+    else:
+        totals = {r['candidate']: r['votes'] for r in map(json.loads, body.splitlines())}
+    assert totals == {'Alice': 20, 'Bert': 10}
+
+
+def test_election_exports(voting, admin, monkeypatch):
+    monkeypatch.setattr(voting, 'now_ts', lambda: 1767312000 + 60)
+    header, *rows = csv.reader(io.StringIO(admin.get('/export.csv').get_data(as_text=True)))
+    assert header == ['State'] + voting.ELECTION_EXPORT_HEADER
+    assert rows == [['Ended', '1', 'Mayor', 'City', '2026-01-01T00:00', '2026-01-02T00:00', '10']]
+
+    wb = load_workbook(io.BytesIO(admin.get('/export.xlsx').get_data()), read_only=True)
+    assert wb.sheetnames == ['Ongoing', 'Scheduled', 'Ended']
+    assert [r[1] for r in wb['Ended'].values] == ['Title', 'Mayor']
+    assert len(list(wb['Ongoing'].values)) == 1
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+
+@pytest.fixture
+def election(db):
+    db.executescript('''
+        INSERT INTO elections (id, title, start_time, end_time, start_ts, end_ts) VALUES (1, 'e', 'x', 'y', 0, 4000000000);
+        INSERT INTO candidates (id, name, election_id) VALUES (1, 'a', 1), (2, 'b', 1);
+        INSERT INTO votes (user_id, candidate_id, election_id) VALUES (10, 1, 1);
+    ''')
+    db.commit()
+    return 1
+
+
+@pytest.fixture
+def admin_client(client):
+    with client.session_transaction() as sess:
+        sess.update(user_id=1, role='admin')
+    return client
+
+
+def test_hub_reads_once_for_all_streams(voting, election):
+    hub = voting.LiveResultsHub(2, min_interval=60)
+    held = voting.db_pool.stats()['in_use']     # the test's own connection
+    first = hub.read(election)
+    assert first == {'state': 'ongoing', 'version': first['version'], 'counts': {1: 1, 2: 0}}
+    checkouts = voting.db_pool.stats()['checkouts']
+    assert hub.read(election) is first
+    assert voting.db_pool.stats()['checkouts'] == checkouts
+    hub.publish(election)
+    assert hub.read(election) is not first
+    assert voting.db_pool.stats()['in_use'] == held
+
+
+def test_hub_read_of_a_missing_election(voting):
+    assert voting.LiveResultsHub(1).read(99) is None
+
+
+def test_stream_holds_no_connection_between_pushes(voting, admin_client, election, monkeypatch):
+    monkeypatch.setattr(voting, 'live_results', voting.LiveResultsHub(1))
+    held = voting.db_pool.stats()['in_use']     # the test's own connection
+    resp = admin_client.get(f'/admin/election/{election}/stream', buffered=False)
+    assert resp.status_code == 200
+    body = (chunk.decode() for chunk in resp.response)
+    assert next(body).startswith('retry:')
+    snapshot = next(body)
+    assert snapshot.startswith('event: snapshot')
+    assert json.loads(snapshot.split('data: ', 1)[1])['candidates'] == {'1': 1, '2': 0}
+    assert voting.db_pool.stats()['in_use'] == held
+
+    # the one stream slot is taken
+    assert admin_client.get(f'/admin/election/{election}/stream').status_code == 503
+    resp.close()
+    assert voting.live_results.open_stream()
+
+
+def test_first_event_is_a_full_snapshot(voting, admin_client, election, monkeypatch):
+    monkeypatch.setattr(voting, 'live_results', voting.LiveResultsHub(1))
+    resp = admin_client.get(f'/admin/election/{election}/stream', buffered=False)
+    body = (chunk.decode() for chunk in resp.response)
+    next(body)                                  # retry:
+    event, data = next(body).split('\n')[:2]
+    resp.close()
+    assert event == 'event: snapshot'
+    # every candidate, including those without votes, so a reconnect overwrites stale counts
+    assert json.loads(data[len('data: '):]) == {'state': 'ongoing', 'version': json.loads(data[6:])['version'],
+                                                'total_votes': 1, 'candidates': {'1': 1, '2': 0}}
+
+
+def test_dashboard_applies_snapshots(admin_client, election):
+    page = admin_client.get(f'/admin/election/{election}').get_data(as_text=True)
+    assert "addEventListener('snapshot'" in page
+    assert "const renderedState = 'ongoing';" in page
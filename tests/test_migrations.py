@@ -0,0 +1,101 @@
+import os
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+from werkzeug.security import check_password_hash
+
+import migrations
+
+LEGACY_SCHEMA = '''
+CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, email TEXT UNIQUE,
+    username TEXT UNIQUE NOT NULL, password TEXT NOT NULL, role TEXT NOT NULL DEFAULT 'voter',
+    id_number TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+CREATE TABLE elections (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT, category TEXT,
+    start_time TEXT NOT NULL, end_time TEXT NOT NULL, created_by INTEGER, candidate_limit INTEGER DEFAULT 10,
+    status TEXT DEFAULT 'active', cancelled_at TEXT, cancelled_by INTEGER, created_at TIMESTAMP);
+CREATE TABLE candidates (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, election_id INTEGER NOT NULL,
+    category TEXT DEFAULT 'General', photo TEXT, user_id INTEGER, created_at TIMESTAMP);
+CREATE TABLE votes (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL, candidate_id INTEGER NOT NULL,
+    election_id INTEGER NOT NULL, voted_at TIMESTAMP);
+INSERT INTO users (name, username, password, role) VALUES ('Old Admin', 'root', 'x', 'admin');
+INSERT INTO elections (title, start_time, end_time) VALUES ('e', '2026-01-01T10:00:00+05:30', '2026-01-02T10:00:00');
+INSERT INTO candidates (name, election_id) VALUES ('a', 1), ('b', 1);
+INSERT INTO votes (user_id, candidate_id, election_id) VALUES (7, 1, 1), (7, 2, 1), (8, 2, 1);
+'''
+
+
+def hash_fast(password):
+    return 'plain$' + password
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = migrations.connect(str(tmp_path / 'voting.db'))
+    yield conn
+    conn.close()
+
+
+def test_fresh_database_is_migrated_and_seeded(conn):
+    applied = migrations.migrate(conn, hash_fast)
+    assert applied == [step.__name__ for step in migrations.MIGRATIONS]
+    assert migrations.schema_version(conn) == len(migrations.MIGRATIONS)
+    admin = conn.execute("SELECT role, password FROM users WHERE username='admin'").fetchone()
+    assert tuple(admin) == ('admin', 'plain$admin123')
+
+
+def test_admin_is_seeded_with_the_configured_hasher(conn):
+    from passwords import PasswordHasher
+    hasher = PasswordHasher(1, method='pbkdf2:sha256:1000')
+    migrations.migrate(conn, hasher.hash_inline)
+    pwhash = conn.execute("SELECT password FROM users WHERE username='admin'").fetchone()[0]
+    assert pwhash.startswith('pbkdf2:sha256:1000$')
+    assert check_password_hash(pwhash, 'admin123')
+
+
+def test_migrate_is_a_noop_when_current(conn):
+    migrations.migrate(conn, hash_fast)
+    conn.execute("DELETE FROM users")
+    conn.commit()
+    assert migrations.migrate(conn, hash_fast) == []
+    # seeding follows the migration run, not only a fresh schema
+    assert conn.execute('SELECT COUNT(*) FROM users').fetchone()[0] == 1
+
+
+def test_legacy_database_is_brought_forward(conn):
+    conn.executescript(LEGACY_SCHEMA)
+    migrations.migrate(conn, hash_fast)
+
+    start_ts, end_ts = conn.execute('SELECT start_ts, end_ts FROM elections').fetchone()
+    assert start_ts == 1767241800      # +05:30 offset honoured
+    assert end_ts == 1767348000        # naive times are UTC
+
+    # voter 7's second ballot is dropped, and the tallies follow
+    assert [r[0] for r in conn.execute('SELECT id FROM votes ORDER BY id')] == [1, 3]
+    assert dict(conn.execute('SELECT candidate_id, votes FROM candidate_tallies')) == {1: 1, 2: 1}
+    assert conn.execute('SELECT votes FROM election_totals WHERE election_id=1').fetchone()[0] == 2
+    with pytest.raises(sqlite3.IntegrityError):
+        conn.execute('INSERT INTO votes (user_id, candidate_id, election_id) VALUES (8, 1, 1)')
+
+    # an existing admin means no default one
+    assert conn.execute("SELECT COUNT(*) FROM users WHERE username='admin'").fetchone()[0] == 0
+
+
+def test_failed_step_leaves_the_schema_untouched(conn, monkeypatch):
+    def broken(db):
+        db.execute('CREATE TABLE half_done (id INTEGER)')
+        raise RuntimeError('boom')
+    monkeypatch.setattr(migrations, 'MIGRATIONS', migrations.MIGRATIONS + (broken,))
+    with pytest.raises(RuntimeError):
+        migrations.migrate(conn, hash_fast)
+    assert migrations.schema_version(conn) == 0
+    assert not migrations.table_exists(conn, 'users')
+    assert not migrations.table_exists(conn, 'half_done')
+
+
+def test_importing_the_app_does_not_touch_the_database(tmp_path):
+    path = tmp_path / 'untouched.db'
+    env = dict(os.environ, SQLITE_PATH=str(path))
+    subprocess.run([sys.executable, '-c', 'import app'], cwd=os.path.dirname(migrations.__file__), env=env, check=True)
+    assert not path.exists() or not sqlite3.connect(path).execute('SELECT * FROM sqlite_master').fetchall()
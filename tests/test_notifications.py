@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+
+def ago(days):
+    return (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+
+
+@pytest.fixture
+def inbox(db):
+    db.executescript('''
+        INSERT INTO users (id, name, username, password) VALUES (10, 'Ann', 'ann', 'x'), (11, 'Bob', 'bob', 'x');
+    ''')
+    db.executemany('INSERT INTO notifications (user_id, message, created_at, read) VALUES (?, ?, ?, 0)',
+                   [(10, f'note {i}', ago(30.5 - i)) for i in range(25)] + [(11, 'other', ago(1))])
+    db.commit()
+    return db
+
+
+def login(client, user_id):
+    with client.session_transaction() as sess:
+        sess.update(user_id=user_id, role='voter')
+
+
+def unread(db, user_id):
+    return db.execute('SELECT unread FROM notification_counts WHERE user_id=?', (user_id,)).fetchone()[0]
+
+
+def test_pages_walk_newest_first(voting, inbox):
+    pages, before = [], None
+    with voting.app.test_request_context():
+        while True:
+            rows, before = voting.notification_page(10, before, limit=10)
+            pages.append([r['message'] for r in rows])
+            if before is None:
+                break
+    assert [len(p) for p in pages] == [10, 10, 5]
+    assert pages[0][0] == 'note 24' and pages[-1][-1] == 'note 0'
+    assert len(set(sum(pages, []))) == 25
+
+
+def test_reading_a_page_marks_only_that_page(voting, inbox, client):
+    login(client, 10)
+    with voting.app.test_request_context():
+        assert voting.unread_counts.get(10) == 25
+    page = client.get('/notifications').get_data(as_text=True)
+    assert 'note 24' in page and 'note 4' not in page
+    assert unread(inbox, 10) == 5 and unread(inbox, 11) == 1
+    with voting.app.test_request_context():
+        assert voting.unread_counts.get(10) == 5
+
+    with voting.app.test_request_context():
+        _, next_before = voting.notification_page(10, limit=voting.NOTIFICATION_PAGE_SIZE)
+    page = client.get(f'/notifications?before={next_before}').get_data(as_text=True)
+    assert 'note 4' in page and 'note 5' not in page
+    assert unread(inbox, 10) == 0
+
+
+def test_marking_read_rows_does_not_write(voting, inbox, monkeypatch):
+    with voting.app.test_request_context():
+        rows, _ = voting.notification_page(10, limit=3)
+        voting.mark_notifications_read(10, rows)
+        assert voting.unread_counts.get(10) == 22
+        writes = []
+        monkeypatch.setattr(voting, 'execute', lambda *args: writes.append(args))
+        voting.mark_notifications_read(10, voting.notification_page(10, limit=3)[0])
+    assert writes == []
+
+
+def test_prune_keeps_unread_and_recent(voting, inbox, monkeypatch):
+    # notes 0-4 are 26.5-30.5 days old; mark them and two recent ones read
+    inbox.execute("UPDATE notifications SET read = 1 WHERE message IN "
+                  "('note 0', 'note 1', 'note 2', 'note 3', 'note 4', 'note 23', 'note 24')")
+    inbox.execute("UPDATE notifications SET created_at = ? WHERE message = 'note 5'", (ago(400),))
+    inbox.commit()
+    monkeypatch.setattr(voting, 'NOTIFICATION_PRUNE_BATCH', 2)
+    assert voting.prune_notifications(inbox, ttl_days=25) == 5
+    left = {r[0] for r in inbox.execute('SELECT message FROM notifications WHERE user_id = 10')}
+    assert left == {f'note {i}' for i in range(5, 25)}
+    assert unread(inbox, 10) == 18
+
+
+def test_prune_command(voting, inbox):
+    inbox.execute('UPDATE notifications SET read = 1')
+    inbox.commit()
+    result = voting.app.test_cli_runner().invoke(args=['prune-notifications', '--days', '20'])
+    assert result.exit_code == 0, result.output
+    assert 'Pruned 11 notifications' in result.output
+    assert inbox.execute('SELECT COUNT(*) FROM notifications').fetchone()[0] == 15
@@ -0,0 +1,133 @@
+import smtplib
+
+import pytest
+
+
+@pytest.fixture
+def applications(db):
+    db.executescript('''
+        INSERT INTO users (id, name, username, password, email) VALUES (10, 'Ann', 'ann', 'x', 'ann@example.com');
+        INSERT INTO elections (id, title, start_time, end_time) VALUES (1, 'e', 'x', 'y');
+        INSERT INTO candidate_applications (id, user_id, election_id, name) VALUES (1, 10, 1, 'Ann');
+    ''')
+    db.commit()
+    return [1]
+
+
+def notifications(db):
+    return [tuple(r) for r in db.execute('SELECT user_id, message FROM notifications')]
+
+
+def test_notifications_are_committed_with_the_request(voting, db):
+    voting.send_notifications([(10, 'hello'), (11, 'hi')])
+    assert not db.in_transaction
+    assert notifications(db) == [(10, 'hello'), (11, 'hi')]
+    assert voting.unread_counts.get(10) == 1
+
+
+def test_notifications_roll_back_with_the_callers_transaction(voting, db):
+    db.execute('BEGIN IMMEDIATE')
+    voting.send_notifications([(10, 'hello')], db=db)
+    db.rollback()
+    assert notifications(db) == []
+
+
+def test_review_writes_email_and_notification_in_one_transaction(voting, db, applications):
+    assert voting.review_applications(applications, 'approved', 1) == (1, 0, 0)
+    assert len(notifications(db)) == 1
+    assert db.execute('SELECT to_addr FROM email_outbox').fetchone()[0] == 'ann@example.com'
+
+
+def test_unconfigured_smtp_skips_messages(voting, db, monkeypatch):
+    monkeypatch.delenv('SMTP_HOST', raising=False)
+    voting.queue_email('a@example.com', 's', 'b')
+    assert voting.outbox.deliver_due() == 1
+    assert db.execute('SELECT status FROM email_outbox').fetchone()[0] == 'skipped'
+
+
+class FakeSMTP:
+    instances = []
+
+    def __init__(self, host, port, timeout):
+        self.closed = False
+        self.sent = []
+        FakeSMTP.instances.append(self)
+
+    def starttls(self):
+        pass
+
+    def login(self, user, password):
+        if password != 'right':
+            raise smtplib.SMTPAuthenticationError(535, b'bad credentials')
+
+    def send_message(self, msg):
+        self.sent.append(msg)
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    FakeSMTP.instances = []
+    monkeypatch.setattr(smtplib, 'SMTP', FakeSMTP)
+    for name, value in {'SMTP_HOST': 'localhost', 'SMTP_PORT': '25', 'SMTP_USER': 'u'}.items():
+        monkeypatch.setenv(name, value)
+    return FakeSMTP
+
+
+def test_failed_login_closes_the_connection_and_backs_off(voting, db, smtp, monkeypatch):
+    monkeypatch.setenv('SMTP_PASS', 'wrong')
+    voting.queue_email('a@example.com', 's', 'b')
+    assert voting.outbox.deliver_due() == 1
+    assert [s.closed for s in smtp.instances] == [True]
+    assert voting.outbox._smtp is None
+    status, attempts, error = db.execute('SELECT status, attempts, last_error FROM email_outbox').fetchone()
+    assert (status, attempts) == ('pending', 1) and 'bad credentials' in error
+
+
+def test_connection_is_reused_between_messages(voting, db, smtp, monkeypatch):
+    monkeypatch.setenv('SMTP_PASS', 'right')
+    voting.queue_emails([('a@example.com', 's', 'b'), ('b@example.com', 's', 'b')])
+    assert voting.outbox.deliver_due() == 2
+    assert len(smtp.instances) == 1 and len(smtp.instances[0].sent) == 2
+    assert [r[0] for r in db.execute('SELECT status FROM email_outbox')] == ['sent', 'sent']
+
+
+def test_cached_unread_count_changes_only_after_commit(voting, db, applications, monkeypatch):
+    assert voting.unread_counts.get(10) == 0
+    seen = []
+    monkeypatch.setattr(voting.unread_counts, 'invalidate',
+                        lambda *ids: seen.append((ids, db.in_transaction)))
+    voting.review_applications(applications, 'rejected', 1)
+    # invalidated once, for the applicant, after the review transaction committed
+    assert seen == [((10,), False)]
+
+
+def test_unread_count_is_reread_after_a_send(voting, db):
+    assert voting.unread_counts.get(10) == 0
+    voting.send_notifications([(10, 'a'), (10, 'b')])
+    assert voting.unread_counts.get(10) == 2
+    voting.mark_notifications_read(10, voting.notification_page(10)[0])
+    assert voting.unread_counts.get(10) == 0
+
+
+def test_idle_tick_takes_no_write_lock(voting, db, db_path):
+    import migrations
+    writer = migrations.connect(db_path)
+    writer.execute('BEGIN IMMEDIATE')     # e.g. a ballot batch holding the write lock
+    try:
+        outbox = voting.OutboxDispatcher(voting.SQLitePool(db_path, size=1, timeout=0.1))
+        assert outbox.deliver_due() == 0
+    finally:
+        writer.rollback()
+        writer.close()
+
+
+def test_leased_messages_are_not_due(voting, db, monkeypatch):
+    monkeypatch.delenv('SMTP_HOST', raising=False)
+    voting.queue_email('a@example.com', 's', 'b')
+    db.execute('UPDATE email_outbox SET next_attempt_at = ?', (voting.now_ts() + voting.OutboxDispatcher.LEASE,))
+    db.commit()
+    assert voting.outbox.deliver_due() == 0
+    assert db.execute('SELECT status FROM email_outbox').fetchone()[0] == 'pending'
@@ -0,0 +1,59 @@
+import gzip
+
+import pytest
+
+
+@pytest.fixture
+def compressions(voting, monkeypatch):
+    calls = []
+    compress = gzip.compress
+    monkeypatch.setattr(voting.gzip, 'compress', lambda data, *args, **kw: calls.append(len(data)) or compress(data, *args, **kw))
+    return calls
+
+
+def test_cached_page_is_compressed_once(voting, client, compressions):
+    first = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert first.headers['Content-Encoding'] == 'gzip'
+    assert len(compressions) == 1
+    again = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert again.data == first.data and again.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in again.vary
+    assert len(compressions) == 1
+
+
+def test_identity_clients_get_the_same_page_uncompressed(voting, client, compressions):
+    zipped = client.get('/', headers={'Accept-Encoding': 'gzip'}).data
+    plain = client.get('/', headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.data == gzip.decompress(zipped)
+    assert len(compressions) == 1
+
+
+def test_small_pages_are_stored_uncompressed(voting, monkeypatch):
+    monkeypatch.setattr(voting, 'COMPRESS_MIN_SIZE', 100)
+    assert voting.page_bodies(b'x' * 10) == {'identity': b'x' * 10}
+    assert gzip.decompress(voting.page_bodies(b'x' * 100)['gzip']) == b'x' * 100
+
+
+def test_query_strings_the_page_ignores_share_one_entry(voting, client, compressions):
+    for i in range(5):
+        client.get(f'/?utm_source={i}', headers={'Accept-Encoding': 'gzip'})
+    assert list(voting.page_cache._entries) == [('/',)]
+    assert len(compressions) == 1
+
+
+def test_listing_is_keyed_by_its_cleaned_filters(voting, client, db):
+    db.execute("INSERT INTO elections (title, category, start_time, end_time, start_ts, end_ts) "
+               "VALUES ('e', 'City', 'x', 'y', 1, 2)")
+    db.commit()
+    for url in ('/all_elections?state=completed', '/all_elections?state=Ended&date_from=garbage',
+                '/all_elections?category=City', '/all_elections?category=City&before=junk'):
+        assert client.get(url).status_code == 200
+    assert set(voting.page_cache._entries) == {('/all_elections', 'ended', '', '', '', None),
+                                               ('/all_elections', '', 'City', '', '', None)}
+
+
+@pytest.mark.parametrize('url', ['/all_elections?utm_source=x', '/all_elections?category=Nowhere'])
+def test_unknown_listing_args_skip_the_cache(voting, client, url):
+    assert client.get(url).status_code == 200
+    assert voting.page_cache._entries == {}
@@ -0,0 +1,93 @@
+import os
+import runpy
+import signal
+import types
+
+import pytest
+from werkzeug.security import check_password_hash
+
+import passwords
+from passwords import PasswordHasher
+
+GUNICORN_CONF = os.path.join(os.path.dirname(passwords.__file__), 'gunicorn.conf.py')
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(1, method='pbkdf2:sha256:1000')
+    yield hasher
+    hasher.shutdown()
+
+
+def kill_workers(hasher):
+    executor = hasher.executor()
+    executor.submit(int).result()       # make sure a worker is running
+    for proc in list(executor._processes.values()):
+        os.kill(proc.pid, signal.SIGKILL)
+        proc.join()
+
+
+def test_hash_and_verify(hasher):
+    pwhash = hasher.hash('secret')
+    assert hasher.verify(pwhash, 'secret') == (True, None)
+    assert hasher.verify(pwhash, 'wrong') == (False, None)
+
+
+def test_verify_upgrades_old_parameters(hasher):
+    old = PasswordHasher(1, method='pbkdf2:sha256:999').hash_inline('secret')
+    ok, new_hash = hasher.verify(old, 'secret')
+    assert ok and new_hash.startswith('pbkdf2:sha256:1000$')
+
+
+def test_hash_many_keeps_input_order(hasher):
+    words = [f'pw{i}' for i in range(10)]
+    assert all(check_password_hash(h, w) for h, w in zip(hasher.hash_many(words), words, strict=True))
+
+
+def test_dead_worker_is_replaced(hasher):
+    kill_workers(hasher)
+    assert check_password_hash(hasher.hash('secret'), 'secret')
+
+
+def test_hash_many_survives_a_dead_worker(hasher):
+    kill_workers(hasher)
+    words = ['a', 'b', 'c']
+    assert all(check_password_hash(h, w) for h, w in zip(hasher.hash_many(words), words, strict=True))
+
+
+def test_hash_many_resubmits_what_was_left_when_a_worker_dies(hasher, monkeypatch):
+    submitted = []
+    real_map = hasher._map
+
+    def first_map_breaks(fn, items, chunksize):
+        submitted.append(list(items))
+        executor, results = real_map(fn, items, chunksize)
+        if len(submitted) == 1:
+            def breaks_after_one():
+                yield next(results)
+                raise passwords.BrokenProcessPool('worker died')
+            return executor, breaks_after_one()
+        return executor, results
+    monkeypatch.setattr(hasher, '_map', first_map_breaks)
+    hashes = list(hasher.hash_many(['a', 'b', 'c']))
+    assert submitted == [['a', 'b', 'c'], ['b', 'c']]
+    assert all(check_password_hash(h, w) for h, w in zip(hashes, 'abc', strict=True))
+
+
+@pytest.mark.parametrize('env, expected', [({}, 8), ({'WEB_CONCURRENCY': '2'}, 4), ({'WEB_CONCURRENCY': '16'}, 1),
+                                           ({'WEB_CONCURRENCY': '2', 'PASSWORD_HASH_WORKERS': '3'}, 3)])
+def test_pool_size_is_the_workers_share_of_the_cpus(monkeypatch, env, expected):
+    monkeypatch.setattr(os, 'cpu_count', lambda: 8)
+    monkeypatch.delenv('WEB_CONCURRENCY', raising=False)
+    monkeypatch.delenv('PASSWORD_HASH_WORKERS', raising=False)
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    assert passwords.password_hasher_from_env().workers == expected
+
+
+def test_gunicorn_hook_exports_the_worker_count(monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', 'postgres://unused')     # skip the SQLite migration
+    monkeypatch.setenv('WEB_CONCURRENCY', '1')      # restored after the hook overwrites it
+    hooks = runpy.run_path(GUNICORN_CONF)
+    hooks['on_starting'](types.SimpleNamespace(cfg=types.SimpleNamespace(workers=3)))
+    assert os.environ['WEB_CONCURRENCY'] == '3'
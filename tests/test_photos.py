@@ -0,0 +1,62 @@
+import io
+import os
+
+import pytest
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+
+
+class NoWorker:
+    def submit(self, fn, *args):
+        pass
+
+
+@pytest.fixture
+def uploads(voting, tmp_path, monkeypatch):
+    monkeypatch.setattr(voting, 'UPLOADS_DIR', str(tmp_path / 'uploads'))
+    monkeypatch.setattr(voting, 'photo_worker', NoWorker())
+    return tmp_path / 'uploads'
+
+
+def upload(voting, fmt='PNG', size=(600, 300)):
+    data = io.BytesIO()
+    Image.new('RGB', size, 'red').save(data, format=fmt)
+    data.seek(0)
+    return voting.save_photo(FileStorage(data, filename='me.png'))
+
+
+def test_photo_url_does_not_touch_the_filesystem(voting, uploads, monkeypatch):
+    stored = upload(voting)
+    name = stored.split('/')[1]
+    monkeypatch.setattr(os.path, 'exists', lambda path: pytest.fail('stat in photo_url'))
+    with voting.app.test_request_context():
+        assert voting.photo_url(stored) == f"/media/photos/{name.replace('.png', '_thumb.png')}"
+        assert voting.photo_url(stored, 'medium').endswith('_medium.png')
+        assert voting.photo_url('uploads/old-photo.png') == '/static/uploads/old-photo.png'
+
+
+def test_missing_variant_is_made_on_request(voting, uploads, client):
+    stored = upload(voting)
+    with voting.app.test_request_context():
+        url = voting.photo_url(stored, 'medium')
+    resp = client.get(url)
+    assert resp.status_code == 200
+    assert Image.open(io.BytesIO(resp.data)).size == (480, 240)
+    assert 'immutable' in resp.headers['Cache-Control']
+    assert sorted(os.listdir(uploads)) == sorted([stored.split('/')[1], url.rsplit('/', 1)[1],
+                                                  url.rsplit('/', 1)[1].replace('medium', 'thumb')])
+
+
+def test_variant_that_cannot_be_made_falls_back_to_the_original(voting, uploads, client, monkeypatch):
+    stored = upload(voting)
+    monkeypatch.setattr(voting, 'make_photo_variants', lambda name: None)
+    with voting.app.test_request_context():
+        url = voting.photo_url(stored)
+    resp = client.get(url)
+    assert resp.status_code == 200
+    assert Image.open(io.BytesIO(resp.data)).size == (600, 300)
+
+
+def test_unknown_photos_are_not_found(voting, uploads, client):
+    assert client.get('/media/photos/' + 'a' * 64 + '_thumb.png').status_code == 404
+    assert client.get('/media/photos/..%2Fapp.py').status_code == 404
@@ -0,0 +1,53 @@
+import pytest
+
+import migrations
+
+
+@pytest.fixture
+def voter(db, client):
+    db.executescript('''
+        INSERT INTO users (id, name, username, password) VALUES (10, 'Ann', 'ann', 'x');
+        INSERT INTO elections (id, title, start_time, end_time) VALUES (1, 'e1', 'x', 'y'), (2, 'e2', 'x', 'y');
+        INSERT INTO candidates (id, name, election_id) VALUES (1, 'a', 1), (2, 'b', 2);
+        INSERT INTO votes (user_id, candidate_id, election_id) VALUES (10, 1, 1);
+    ''')
+    db.commit()
+    with client.session_transaction() as sess:
+        sess.update(user_id=10, role='voter')
+    return client
+
+
+@pytest.fixture
+def loads(voting, monkeypatch):
+    calls = []
+    load = voting.load_profile
+    monkeypatch.setattr(voting, 'load_profile', lambda user_id: calls.append(user_id) or load(user_id))
+    return calls
+
+
+def test_ballots_do_not_write_to_users(db, voter):
+    version = db.execute('SELECT profile_version FROM users WHERE id=10').fetchone()[0]
+    db.execute('INSERT INTO votes (user_id, candidate_id, election_id) VALUES (10, 2, 2)')
+    assert db.execute('SELECT profile_version FROM users WHERE id=10').fetchone()[0] == version
+
+
+def test_profile_is_cached_until_the_user_votes(voting, db_path, voter, loads):
+    assert voter.get('/profile').status_code == 200
+    assert voter.get('/profile').status_code == 200
+    assert loads == [10]
+
+    other_worker = migrations.connect(db_path)
+    other_worker.execute('INSERT INTO votes (user_id, candidate_id, election_id) VALUES (10, 2, 2)')
+    other_worker.commit()
+    other_worker.close()
+    page = voter.get('/profile').get_data(as_text=True)
+    assert loads == [10, 10]
+    assert 'e2' in page
+
+
+def test_profile_edits_still_bump_the_version(db, voter, loads):
+    voter.get('/profile')
+    db.execute("UPDATE users SET name='Ann B' WHERE id=10")
+    db.commit()
+    assert 'Ann B' in voter.get('/profile').get_data(as_text=True)
+    assert loads == [10, 10]
@@ -0,0 +1,72 @@
+import sqlite3
+
+import pytest
+
+NOW = 1_800_000_000     # a multiple of 60: the start of a window
+
+
+@pytest.fixture
+def clock(voting, monkeypatch):
+    now = [NOW]
+    monkeypatch.setattr(voting.time, 'time', lambda: now[0])
+    return now
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def limiter(request, voting, clock):
+    if request.param == 'memory':
+        return voting.RateLimiter()
+    return voting.SQLiteRateLimiter(voting.db_pool)
+
+
+def test_limit_holds_within_a_window(limiter):
+    assert [limiter.is_allowed('k', limit=3, window=60) for _ in range(4)] == [True, True, True, False]
+    assert limiter.is_allowed('other', limit=3, window=60)
+
+
+def test_previous_window_is_weighted_by_its_overlap(limiter, clock):
+    for _ in range(4):
+        limiter.is_allowed('k', limit=4, window=60)
+    clock[0] = NOW + 60 + 15       # 3/4 of the last window still counts: 3 of 4 used
+    assert limiter.is_allowed('k', limit=4, window=60)
+    assert not limiter.is_allowed('k', limit=4, window=60)
+    clock[0] = NOW + 180           # two windows on, nothing carries over
+    assert limiter.is_allowed('k', limit=1, window=60)
+
+
+def test_idle_keys_are_swept(voting, clock):
+    limiter = voting.RateLimiter(sweep_interval=60)
+    limiter.is_allowed('old', window=60)
+    clock[0] = NOW + 60
+    limiter.is_allowed('recent', window=60)
+    clock[0] = NOW + 120           # 'old' has been idle for two full windows
+    limiter.is_allowed('new', window=60)
+    assert set(limiter._buckets) == {'recent', 'new'}
+
+
+def test_sqlite_buckets_are_shared_between_workers(voting, db_path, clock):
+    first = voting.SQLiteRateLimiter(voting.SQLitePool(db_path, size=1))
+    second = voting.SQLiteRateLimiter(voting.SQLitePool(db_path, size=1))
+    assert first.is_allowed('k', limit=2, window=60)
+    assert second.is_allowed('k', limit=2, window=60)
+    assert not first.is_allowed('k', limit=2, window=60)
+
+
+def test_sqlite_limiter_fails_open(voting, db_path, clock, monkeypatch):
+    pool = voting.SQLitePool(db_path, size=1)
+    limiter = voting.SQLiteRateLimiter(pool)
+
+    def unavailable():
+        raise sqlite3.OperationalError('database is locked')
+    monkeypatch.setattr(pool, 'acquire', unavailable)
+    assert all(limiter.is_allowed('k', limit=1, window=60) for _ in range(3))
+
+
+def test_memory_is_the_default_backend(voting):
+    assert voting.RATE_LIMIT_BACKEND == 'memory'
+
+
+def test_bench_rate_limit_command(voting):
+    result = voting.app.test_cli_runner().invoke(args=['bench-rate-limit', '--keys', '50'])
+    assert result.exit_code == 0, result.output
+    assert 'RateLimiter:' in result.output and 'SQLiteRateLimiter:' in result.output
@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+NOW = 1_800_000_000
+
+
+@pytest.fixture
+def ended(voting, db, monkeypatch):
+    monkeypatch.setattr(voting, 'now_ts', lambda: NOW)
+    db.executescript(f'''
+        INSERT INTO users (id, name, username, password, role, created_at) VALUES
+            (10, 'a', 'a', 'x', 'voter', datetime({NOW - 7200}, 'unixepoch')),
+            (11, 'b', 'b', 'x', 'voter', datetime({NOW - 7200}, 'unixepoch')),
+            (12, 'late', 'late', 'x', 'voter', datetime({NOW - 60}, 'unixepoch'));
+        INSERT INTO elections (id, title, start_time, end_time, start_ts, end_ts) VALUES (1, 'e', 'x', 'y', {NOW - 3600}, {NOW - 600});
+        INSERT INTO candidates (id, name, election_id) VALUES (1, 'c1', 1), (2, 'c2', 1);
+        INSERT INTO votes (user_id, candidate_id, election_id) VALUES (10, 1, 1);
+    ''')
+    db.commit()
+    return 1
+
+
+@pytest.fixture
+def admin(client):
+    with client.session_transaction() as sess:
+        sess.update(user_id=1, role='admin')
+    return client
+
+
+def test_reading_results_does_not_finalize(voting, db, admin, ended):
+    resp = admin.get(f'/api/elections/{ended}/results')
+    assert resp.json['total_votes'] == 1
+    assert resp.headers['Cache-Control'] == 'private, no-cache'
+    assert db.execute('SELECT COUNT(*) FROM election_results').fetchone()[0] == 0
+
+
+def test_finalized_results_are_served_with_a_bounded_max_age(voting, db, admin, ended):
+    assert voting.finalize_closed_elections(db) == 1
+    assert voting.finalize_closed_elections(db) == 0
+    resp = admin.get(f'/api/elections/{ended}/results')
+    assert resp.headers['Cache-Control'] == f'private, max-age={voting.RESULTS_MAX_AGE}, must-revalidate'
+    assert resp.json['total_votes'] == 1
+    again = admin.get(f'/api/elections/{ended}/results', headers={'If-None-Match': resp.headers['ETag']})
+    assert again.status_code == 304
+
+
+def test_a_snapshot_is_dropped_and_refreshed_when_ballots_change(voting, db, admin, ended):
+    voting.finalize_closed_elections(db)
+    db.execute('INSERT INTO votes (user_id, candidate_id, election_id) VALUES (11, 2, 1)')
+    db.commit()
+    with voting.app.test_request_context():
+        assert voting.election_snapshot(ended) is None
+    resp = admin.get(f'/api/elections/{ended}/results')
+    assert resp.json['total_votes'] == 2 and resp.headers['Cache-Control'] == 'private, no-cache'
+    assert voting.finalize_closed_elections(db) == 1
+    with voting.app.test_request_context():
+        assert voting.election_snapshot(ended)['total_votes'] == 2
+
+
+def test_a_reopened_election_is_read_live(voting, db, ended):
+    voting.finalize_closed_elections(db)
+    db.execute('UPDATE elections SET end_ts=? WHERE id=1', (NOW + 600,))
+    db.commit()
+    with voting.app.test_request_context():
+        assert voting.election_snapshot(ended) is None
+
+
+def test_eligible_voters_are_those_registered_by_the_close(voting, db, ended):
+    voting.finalize_closed_elections(db)
+    row = db.execute('SELECT voters, eligible_voters, tallies FROM election_results').fetchone()
+    assert (row[0], row[1]) == (1, 2)
+    assert [t['votes'] for t in json.loads(row[2])] == [1, 0]
+
+
+@pytest.mark.parametrize('url, suffix', [('/results_excel/1', 'xlsx'), ('/admin/election/1/results.csv', 'csv'),
+                                         ('/admin/election/1/results.ndjson', 'ndjson')])
+def test_snapshot_downloads_revalidate(voting, db, admin, ended, url, suffix):
+    voting.finalize_closed_elections(db)
+    first = admin.get(url)
+    assert first.status_code == 200 and first.data
+    etag = first.headers['ETag']
+    assert etag.endswith(f'-{suffix}"')
+    again = admin.get(url, headers={'If-None-Match': etag})
+    assert again.status_code == 304 and not again.data
+    assert again.headers['ETag'] == etag
+    assert again.headers['Cache-Control'] == f'private, max-age={voting.RESULTS_MAX_AGE}, must-revalidate'
+    # a new ballot retires the snapshot, and the old tag no longer matches
+    db.execute('INSERT INTO votes (user_id, candidate_id, election_id) VALUES (11, 2, 1)')
+    db.commit()
+    assert admin.get(url, headers={'If-None-Match': etag}).status_code == 200
@@ -0,0 +1,115 @@
+import pytest
+
+import migrations
+
+
+@pytest.fixture
+def conn(db_path):
+    conn = migrations.connect(db_path)
+    conn.executescript('''
+        INSERT INTO elections (id, title, start_time, end_time) VALUES (1, 'a', 'x', 'y'), (2, 'b', 'x', 'y');
+        INSERT INTO candidates (id, name, election_id) VALUES (1, 'c1', 1), (2, 'c2', 1), (3, 'c3', 2);
+    ''')
+    yield conn
+    conn.close()
+
+
+def tallies(conn):
+    return {r[0]: r[1] for r in conn.execute('SELECT candidate_id, votes FROM candidate_tallies')}
+
+
+def totals(conn):
+    return {r[0]: (r[1], r[2]) for r in conn.execute('SELECT election_id, votes, version FROM election_totals')}
+
+
+def vote(conn, user_id, candidate_id, election_id=1):
+    return conn.execute('INSERT INTO votes (user_id, candidate_id, election_id) VALUES (?, ?, ?)',
+                        (user_id, candidate_id, election_id)).lastrowid
+
+
+def test_new_candidates_start_at_zero(conn):
+    assert tallies(conn) == {1: 0, 2: 0, 3: 0}
+    assert totals(conn) == {1: (0, 2), 2: (0, 1)}
+
+
+def test_insert_and_delete_move_the_counters(conn):
+    v = vote(conn, 10, 1)
+    vote(conn, 11, 1)
+    vote(conn, 12, 3, election_id=2)
+    assert tallies(conn) == {1: 2, 2: 0, 3: 1}
+    assert totals(conn)[1] == (2, 4)
+    conn.execute('DELETE FROM votes WHERE id=?', (v,))
+    assert tallies(conn)[1] == 1
+    assert totals(conn)[1] == (1, 5)
+
+
+def test_moving_a_ballot_moves_the_tally(conn):
+    v = vote(conn, 10, 1)
+    conn.execute('UPDATE votes SET candidate_id=2 WHERE id=?', (v,))
+    assert tallies(conn) == {1: 0, 2: 1, 3: 0}
+    assert totals(conn)[1][0] == 1
+
+    conn.execute('UPDATE votes SET candidate_id=3, election_id=2 WHERE id=?', (v,))
+    assert tallies(conn) == {1: 0, 2: 0, 3: 1}
+    assert totals(conn)[1][0] == 0 and totals(conn)[2][0] == 1
+
+
+def test_unrelated_updates_leave_the_counters_alone(conn):
+    v = vote(conn, 10, 1)
+    before = totals(conn)
+    conn.execute("UPDATE votes SET voted_at='2026-01-01' WHERE id=?", (v,))
+    conn.execute('UPDATE votes SET candidate_id=1 WHERE id=?', (v,))
+    assert totals(conn) == before
+    assert tallies(conn)[1] == 1
+
+
+def test_deleting_a_candidate_drops_its_tally_and_bumps_the_version(conn):
+    vote(conn, 10, 2)
+    version = totals(conn)[1][1]
+    conn.execute('DELETE FROM candidates WHERE id=2')
+    assert 2 not in tallies(conn)
+    assert totals(conn)[1] == (1, version + 1)
+
+
+def test_counters_agree_with_a_rebuild(conn):
+    ids = [vote(conn, u, 1 + u % 2) for u in range(20)]
+    conn.execute('UPDATE votes SET candidate_id=1 WHERE id IN (?, ?)', ids[:2])
+    conn.execute('DELETE FROM votes WHERE id=?', (ids[5],))
+    conn.execute('DELETE FROM candidates WHERE id=3')
+    live = tallies(conn), {e: v for e, (v, _) in totals(conn).items()}
+    migrations.rebuild_tallies(conn)
+    assert (tallies(conn), {e: v for e, (v, _) in totals(conn).items()}) == live
+
+
+def test_reconcile_finds_no_mismatch(voting, db):
+    db.executescript('''
+        INSERT INTO elections (id, title, start_time, end_time) VALUES (1, 'a', 'x', 'y');
+        INSERT INTO candidates (id, name, election_id) VALUES (1, 'c1', 1), (2, 'c2', 1);
+        INSERT INTO votes (user_id, candidate_id, election_id) VALUES (10, 1, 1), (11, 1, 1);
+        UPDATE votes SET candidate_id = 2 WHERE user_id = 11;
+    ''')
+    assert voting.tally_mismatches() == []
+
+
+def test_reconcile_repairs_election_totals(voting, db):
+    db.executescript('''
+        INSERT INTO elections (id, title, start_time, end_time) VALUES (1, 'a', 'x', 'y'), (2, 'b', 'x', 'y');
+        INSERT INTO candidates (id, name, election_id) VALUES (1, 'c1', 1), (2, 'c2', 2);
+        INSERT INTO votes (user_id, candidate_id, election_id) VALUES (10, 1, 1), (11, 1, 1), (12, 2, 2);
+        UPDATE election_totals SET votes = 7 WHERE election_id = 1;
+        DELETE FROM election_totals WHERE election_id = 2;
+    ''')
+    version = db.execute('SELECT version FROM election_totals WHERE election_id = 1').fetchone()[0]
+    assert voting.tally_mismatches() == []
+    assert {r['election_id']: (r['tallied'], r['counted']) for r in voting.total_mismatches()} == {1: (7, 2), 2: (0, 1)}
+
+    runner = voting.app.test_cli_runner()
+    result = runner.invoke(args=['reconcile-tallies'])
+    assert result.exit_code == 1
+    assert 'election 1: total 7, counted 2' in result.output
+
+    result = runner.invoke(args=['reconcile-tallies', '--fix'])
+    assert result.exit_code == 0, result.output
+    assert voting.total_mismatches() == []
+    rows = {r[0]: (r[1], r[2]) for r in db.execute('SELECT election_id, votes, version FROM election_totals')}
+    assert rows[1] == (2, version + 1) and rows[2][0] == 1
@@ -0,0 +1,102 @@
+import io
+import json
+
+import pytest
+from openpyxl import Workbook
+
+HEADER = 'name,username,email,password,id_number\n'
+
+
+@pytest.fixture
+def admin(voting, db, client):
+    db.execute("INSERT INTO users (name, username, password, email, role) VALUES ('Old', 'old', 'x', 'taken@example.com', 'candidate')")
+    db.commit()
+    with client.session_transaction() as sess:
+        sess.update(user_id=1, role='admin')
+    return client
+
+
+def post(client, body, filename='voters.csv'):
+    resp = client.post('/admin/voters/import', data={'voters_file': (io.BytesIO(body), filename)},
+                       content_type='multipart/form-data')
+    return resp
+
+
+def reports(resp):
+    return [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+
+
+def usernames(db):
+    db.rollback()
+    return [r[0] for r in db.execute("SELECT username FROM users WHERE role='voter' ORDER BY id")]
+
+
+def test_good_csv_creates_voters(voting, db, admin):
+    body = HEADER + 'Ann,Ann,ann@example.com,password1,1\nBob,bob,,password2,2\n'
+    final = reports(post(admin, body.encode()))[-1]
+    assert (final['rows'], final['created'], final['rejected'], final['done']) == (2, 2, 0, True)
+    assert usernames(db) == ['ann', 'bob']
+    pwhash = db.execute("SELECT password FROM users WHERE username='ann'").fetchone()[0]
+    assert voting.password_hasher.verify(pwhash, 'password1')[0]
+
+
+def test_rejected_rows_are_reported_by_line(db, admin):
+    body = HEADER + ('Ann,ann,dup@example.com,password1,1\n'
+                     'Ann2,ann2,dup@example.com,password1,2\n'     # email earlier in the file
+                     'Tom,tom,taken@example.com,password1,3\n'     # email already in the database
+                     'Old,OLD,,password1,4\n'                      # username already in the database
+                     'Weak,weak,,short,5\n'
+                     ',,,,\n'                                      # blank lines are skipped
+                     'Nid,nid,,password1,\n')
+    final = reports(post(admin, body.encode()))[-1]
+    assert (final['rows'], final['created'], final['rejected']) == (6, 1, 5)
+    assert final['errors'] == [
+        {'line': 3, 'error': 'Email already registered.'},
+        {'line': 4, 'error': 'Email already registered.'},
+        {'line': 5, 'error': 'Username already taken.'},
+        {'line': 6, 'error': 'Password must be at least 8 characters long.'},
+        {'line': 8, 'error': 'All fields except email are required.'},
+    ]
+    assert usernames(db) == ['ann']
+
+
+def test_chunks_are_committed_as_they_go(voting, db):
+    rows = ((i + 2, {'name': f'v{i}', 'username': f'v{i}', 'password': 'password1', 'id_number': str(i)})
+            for i in range(5))
+    progress = []
+    for report in voting.import_voters(rows, chunk_size=2):
+        progress.append((report['created'], len(usernames(db))))
+    # each report follows a commit; the last chunks land in the final report
+    assert progress == [(2, 2), (5, 5)]
+
+
+def test_missing_columns_and_bad_files_are_rejected_up_front(admin):
+    resp = post(admin, b'name,username\nAnn,ann\n')
+    assert resp.status_code == 400 and 'Missing column' in resp.json['error']
+    resp = post(admin, b'not a zip file', filename='voters.xlsx')
+    assert resp.status_code == 400 and 'xlsx' in resp.json['error']
+    assert post(admin, b'x', filename='voters.txt').status_code == 400
+
+
+def test_xlsx_upload(db, admin):
+    wb = Workbook()
+    wb.active.append(['Name', 'Username', 'Email', 'Password', 'ID Number'])
+    wb.active.append(['Ann', 'ann', None, 'password1', 7])
+    out = io.BytesIO()
+    wb.save(out)
+    assert reports(post(admin, out.getvalue(), filename='voters.xlsx'))[-1]['created'] == 1
+    assert usernames(db) == ['ann']
+
+
+def test_cli_import(voting, db, tmp_path):
+    good = tmp_path / 'voters.csv'
+    good.write_text(HEADER + 'Ann,ann,,password1,1\nWeak,weak,,short,2\n')
+    result = voting.app.test_cli_runner().invoke(args=['import-voters', str(good)])
+    assert result.exit_code == 0, result.output
+    assert '2 rows read, 1 created, 1 rejected' in result.output
+    assert 'line 3: Password must be at least 8 characters long.' in result.output
+
+    bad = tmp_path / 'voters.xlsx'
+    bad.write_bytes(b'not a zip file')
+    result = voting.app.test_cli_runner().invoke(args=['import-voters', str(bad)])
+    assert result.exit_code == 2 and 'xlsx' in result.output
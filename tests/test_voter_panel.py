@@ -0,0 +1,83 @@
+import time
+
+import pytest
+
+NOW = 1_800_000_000
+
+
+@pytest.fixture
+def panel(voting, db, monkeypatch):
+    monkeypatch.setattr(voting, 'now_ts', lambda: NOW)
+    db.executescript(f'''
+        INSERT INTO users (id, name, username, password, role) VALUES (20, 'Vic', 'vic', 'x', 'voter'),
+                                                                      (21, 'Cal', 'cal', 'x', 'candidate');
+        INSERT INTO elections (id, title, start_time, end_time, start_ts, end_ts) VALUES
+            (1, 'Mayor', 'x', 'y', {NOW - 60}, {NOW + 600}),
+            (2, 'Council', 'x', 'y', {NOW - 60}, {NOW + 600});
+        INSERT INTO candidates (id, name, election_id) VALUES (1, 'Alice', 1), (2, 'Bert', 2);
+        INSERT INTO candidate_applications (id, user_id, election_id, name, applied_at) VALUES
+            (1, 21, 2, 'Cleo', '2026-01-01');
+    ''')
+    db.commit()
+
+
+def login(client, user_id, role):
+    with client.session_transaction() as sess:
+        sess.clear()
+        sess.update(user_id=user_id, role=role)
+
+
+def voter_page(client):
+    login(client, 20, 'voter')
+    resp = client.get('/voter')
+    assert resp.status_code == 200
+    return resp.get_data(as_text=True)
+
+
+def test_candidate_lists_are_cached(voting, panel):
+    with voting.app.test_request_context():
+        first = voting.candidate_cache.get_many([1, 2])
+        assert {eid: [c['name'] for c in rows] for eid, rows in first.items()} == {1: ['Alice'], 2: ['Bert']}
+        assert voting.candidate_cache.get_many([1])[1] is first[1]
+        voting.candidate_cache.invalidate([1])
+        assert voting.candidate_cache.get_many([1, 2])[1] is not first[1]
+
+
+def test_added_candidate_shows_on_the_next_request(panel, client):
+    assert 'Zed' not in voter_page(client)
+    login(client, 1, 'admin')
+    client.post('/add_candidate', data={'name': 'Zed', 'election_id': '1'})
+    assert 'Zed' in voter_page(client)
+
+
+def test_approved_candidate_shows_on_the_next_request(panel, client, db):
+    assert 'Cleo' not in voter_page(client)
+    login(client, 1, 'admin')
+    client.post('/admin/approve_candidate', data={'application_id': '1'})
+    assert db.execute('SELECT election_id FROM candidates WHERE name = ?', ('Cleo',)).fetchone()[0] == 2
+    assert 'Cleo' in voter_page(client)
+
+
+def test_changes_from_another_worker_show_after_the_ttl(voting, panel, client, db, monkeypatch):
+    # there is no admin route that edits or removes a candidate; a direct write is only
+    # picked up once the cached list expires
+    assert 'Alice' in voter_page(client)
+    db.execute("UPDATE candidates SET name = 'Alicia' WHERE id = 1")
+    db.execute('DELETE FROM candidates WHERE id = 2')
+    db.commit()
+    stale = voter_page(client)
+    assert 'Alicia' not in stale and 'Bert' in stale
+    later = time.monotonic() + voting.candidate_cache.ttl + 1
+    monkeypatch.setattr(voting.time, 'monotonic', lambda: later)
+    page = voter_page(client)
+    assert 'Alicia' in page and 'Bert' not in page
+
+
+def test_voted_marks_only_this_voters_ballots(panel, client, db):
+    db.executescript('''
+        INSERT INTO votes (user_id, candidate_id, election_id) VALUES (20, 1, 1), (99, 2, 2);
+    ''')
+    page = voter_page(client)
+    assert page.count('You have voted') == 1
+    assert page.count('name="election_id" value="2"') == 1
+    assert 'name="election_id" value="1"' not in page
@@ -0,0 +1,91 @@
+import pytest
+
+NOW = 1_800_000_000
+
+
+@pytest.fixture
+def election(voting, db):
+    db.executescript(f'''
+        INSERT INTO elections (id, title, start_time, end_time, start_ts, end_ts) VALUES (1, 'e', 'x', 'y', {NOW - 60}, {NOW + 60});
+        INSERT INTO candidates (id, name, election_id) VALUES (1, 'a', 1), (2, 'b', 1);
+    ''')
+    db.commit()
+    return 1
+
+
+def at(voting):
+    return voting.datetime.fromtimestamp(NOW, voting.timezone.utc)
+
+
+def test_ballot_outcomes(voting, db, election):
+    assert voting.insert_ballot(db, 10, election, 1, at(voting)) == 'ok'
+    assert voting.insert_ballot(db, 10, election, 2, at(voting)) == 'duplicate'
+    assert voting.insert_ballot(db, 11, election, 9, at(voting)) == 'bad_candidate'
+    assert voting.insert_ballot(db, 11, 99, 1, at(voting)) == 'no_election'
+    db.execute("UPDATE elections SET status='paused' WHERE id=1")
+    assert voting.insert_ballot(db, 11, election, 1, at(voting)) == 'paused'
+
+
+def test_legacy_baseline_agrees(voting, db_path, election):
+    assert voting.legacy_ballot(db_path, 10, election, 1, at(voting)) == 'ok'
+    assert voting.legacy_ballot(db_path, 10, election, 1, at(voting)) == 'duplicate'
+
+
+def test_bench_votes_command(voting):
+    result = voting.app.test_cli_runner().invoke(args=['bench-votes', '--ballots', '20'])
+    assert result.exit_code == 0, result.output
+    assert 'fresh connection:' in result.output and 'pooled connection:' in result.output
+
+
+@pytest.fixture
+def batcher(voting, db_path):
+    return voting.VoteBatcher(voting.SQLitePool(db_path, size=1))
+
+
+def ballots(db):
+    db.rollback()
+    return [tuple(r) for r in db.execute('SELECT user_id, candidate_id FROM votes')]
+
+
+def test_batcher_records_and_rejects(voting, db, batcher, election):
+    assert batcher.submit(10, election, 1, at(voting)) == 'ok'
+    assert batcher.submit(10, election, 2, at(voting)) == 'duplicate'
+    assert ballots(db) == [(10, 1)]
+    assert batcher.stats()['ballots'] == 2
+
+
+def test_ballot_timed_out_before_the_writer_claims_it_is_cancelled(voting, db, batcher, election, monkeypatch):
+    stall = voting.threading.Event()
+    acquire = batcher.pool.acquire
+    monkeypatch.setattr(batcher.pool, 'acquire', lambda: stall.wait(5) and acquire())
+    assert batcher.submit(10, election, 1, at(voting), timeout=0.05) == 'busy'
+    stall.set()
+    # the writer skips the cancelled ballot, so the retry goes through
+    assert batcher.submit(10, election, 2, at(voting)) == 'ok'
+    assert ballots(db) == [(10, 2)]
+
+
+def test_ballot_timed_out_after_the_writer_claims_it_is_pending(voting, db, batcher, election, monkeypatch):
+    stall = voting.threading.Event()
+    insert = voting.insert_ballot
+    monkeypatch.setattr(voting, 'insert_ballot', lambda *args: stall.wait(5) and insert(*args))
+    assert batcher.submit(10, election, 1, at(voting), timeout=0.05) == 'pending'
+    stall.set()
+    assert batcher.submit(10, election, 2, at(voting)) == 'duplicate'
+    assert ballots(db) == [(10, 1)]
+
+
+def test_vote_route(voting, db, client, monkeypatch):
+    db.executescript('''
+        INSERT INTO elections (id, title, start_time, end_time, start_ts, end_ts) VALUES (1, 'e', 'x', 'y', 0, 4000000000);
+        INSERT INTO candidates (id, name, election_id) VALUES (1, 'a', 1);
+    ''')
+    db.commit()
+    with client.session_transaction() as sess:
+        sess.update(user_id=10, role='voter')
+    resp = client.post('/vote', data={'election_id': '1', 'candidate_id': '1'})
+    assert resp.status_code == 302
+    assert ballots(db) == [(10, 1)]
+    client.post('/vote', data={'election_id': '1', 'candidate_id': '1'})
+    with client.session_transaction() as sess:
+        assert sess['_flashes'][-1][1] == voting.VOTE_REJECTIONS['duplicate'][0]